@@ -11,7 +11,7 @@ export async function POST(req: Request) {
 
   console.log("Sending message to FastAPI backend...")
 
-  const { messages, userId } = await req.json()
+  const { messages, userId, threadId } = await req.json()
   const lastMessage = messages[messages.length - 1]
 
   // Use userId from body if provided, otherwise use session
@@ -24,6 +24,7 @@ export async function POST(req: Request) {
       body: JSON.stringify({
         user_input: lastMessage.parts[0].text, // Extract text from parts
         user_id: effectiveUserId,
+        thread_id: threadId, // Optional; the backend resumes this conversation
       }),
     })
 
@@ -46,14 +47,17 @@ export async function POST(req: Request) {
     const stream = new ReadableStream({
       async start(controller) {
         const reader = fastapiResponse.body!.getReader()
+        // A frame can be split across reads; keep the unfinished line
+        let pending = ""
 
         try {
           while (true) {
             const { done, value } = await reader.read()
             if (done) break
 
-            const chunk = decoder.decode(value, { stream: true })
-            const lines = chunk.split("\n")
+            pending += decoder.decode(value, { stream: true })
+            const lines = pending.split("\n")
+            pending = lines.pop() ?? ""
 
             for (const line of lines) {
               if (line.startsWith("data: ")) {
@@ -1,12 +1,89 @@
+"""
+Append-only JSON-Lines log of tool results (SerpAPI payloads and the like).
+
+log_tool_result() never touches the disk: it records the entry in a bounded
+in-memory ring buffer (what get_logs() returns) and hands it to a background
+writer thread through a bounded queue. When the queue is full the entry is
+dropped from the file and counted, instead of blocking the tool. The writer
+appends one JSON object per line and rotates the file by size and age.
+
+Large payloads can be truncated (TOOL_LOG_MAX_RESULT_CHARS) and full payloads
+sampled (TOOL_LOG_SAMPLE_RATE); sampled-out entries keep their metadata and
+result keys.
+"""
+
+import atexit
 import json
+import logging
 import os
+import queue
+import random
+import threading
+import time
+from collections import deque
 from datetime import datetime
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TOOL_LOG_FILE = os.getenv("TOOL_LOG_FILE", "tool_results.jsonl")
+TOOL_LOG_QUEUE_SIZE = int(os.getenv("TOOL_LOG_QUEUE_SIZE", "1000"))
+TOOL_LOG_MAX_BYTES = int(os.getenv("TOOL_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+TOOL_LOG_ROTATE_SECONDS = float(os.getenv("TOOL_LOG_ROTATE_SECONDS", "86400"))
+TOOL_LOG_BACKUP_COUNT = int(os.getenv("TOOL_LOG_BACKUP_COUNT", "5"))
+TOOL_LOG_MAX_RESULT_CHARS = int(os.getenv("TOOL_LOG_MAX_RESULT_CHARS", "20000"))
+TOOL_LOG_SAMPLE_RATE = float(os.getenv("TOOL_LOG_SAMPLE_RATE", "1.0"))
+TOOL_LOG_MEMORY_ENTRIES = int(os.getenv("TOOL_LOG_MEMORY_ENTRIES", "200"))
+
+_STOP = object()
 
 
 class ToolLogger:
-    def __init__(self, log_file="tool_results.json"):
+    """Non-blocking JSON-Lines tool logger with rotation.
+
+    Args:
+        log_file: Path of the active log file; rotated files get .1, .2, ...
+        max_bytes: Rotate once the file reaches this size (0 disables)
+        rotate_seconds: Rotate once the file is this old (0 disables)
+        backup_count: Rotated files to keep
+        max_result_chars: Truncate serialized results above this size
+            (0 disables)
+        sample_rate: Fraction of entries whose full result is written
+        memory_entries: Size of the ring buffer returned by get_logs()
+        queue_size: Entries that may wait for the writer before new ones
+            are dropped
+    """
+
+    def __init__(
+        self,
+        log_file: str = TOOL_LOG_FILE,
+        max_bytes: int = TOOL_LOG_MAX_BYTES,
+        rotate_seconds: float = TOOL_LOG_ROTATE_SECONDS,
+        backup_count: int = TOOL_LOG_BACKUP_COUNT,
+        max_result_chars: int = TOOL_LOG_MAX_RESULT_CHARS,
+        sample_rate: float = TOOL_LOG_SAMPLE_RATE,
+        memory_entries: int = TOOL_LOG_MEMORY_ENTRIES,
+        queue_size: int = TOOL_LOG_QUEUE_SIZE,
+    ):
         self.log_file = log_file
-        self.logs = []
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.max_result_chars = max_result_chars
+        self.sample_rate = sample_rate
+        self.logs = deque(maxlen=memory_entries)
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._file = None
+        self._opened_at = 0.0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.errors = 0
 
     def log_tool_result(self, tool_name: str, query: str, result: dict, success: bool):
         log_entry = {
@@ -20,14 +97,146 @@ class ToolLogger:
             ),
         }
         self.logs.append(log_entry)
-
-        # Save to file immediately
-        with open(self.log_file, "w") as f:
-            json.dump(self.logs, f, indent=2)
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(log_entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
 
     def get_logs(self):
-        return self.logs
+        """Most recent entries (bounded by memory_entries), oldest first."""
+        return list(self.logs)
+
+    def stats(self) -> dict:
+        """Writer counters and current queue depth."""
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped": self.dropped,
+                "rotations": self.rotations,
+                "errors": self.errors,
+                "queued": self._queue.qsize(),
+            }
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued entry has been written.
+
+        Returns:
+            True if the queue drained before the timeout
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Drain the queue, stop the writer thread and close the file."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._queue.put(_STOP)
+        writer.join(timeout)
+
+    def _ensure_writer(self):
+        # Started on first use, so forked server workers each get their own
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name="tool-logger", daemon=True
+                )
+                self._writer.start()
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is _STOP:
+                    break
+                self._write(self._format(entry))
+                # Flush once the burst is written rather than per entry
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                logger.exception("ToolLogger write failed")
+            finally:
+                self._queue.task_done()
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _format(self, entry: dict) -> str:
+        entry = dict(entry)
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            entry["result"] = None
+            entry["sampled_out"] = True
+            return json.dumps(entry, default=str)
+
+        line = json.dumps(entry, default=str)
+        if self.max_result_chars and len(line) > self.max_result_chars:
+            result = json.dumps(entry["result"], default=str)
+            entry["result"] = result[: self.max_result_chars]
+            entry["truncated_from"] = len(result)
+            line = json.dumps(entry, default=str)
+        return line
+
+    def _write(self, line: str):
+        if self._file is None:
+            self._open()
+        if self._should_rotate():
+            self._rotate()
+        self._file.write(line + "\n")
+        with self._lock:
+            self.written += 1
+
+    def _open(self):
+        directory = os.path.dirname(self.log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.log_file, "a", encoding="utf-8")
+        self._opened_at = self._first_entry_time() or time.time()
+
+    def _first_entry_time(self) -> Optional[float]:
+        # Age of an existing file counts from its first entry, so time-based
+        # rotation still happens when the server restarts more often
+        try:
+            with open(self.log_file, encoding="utf-8") as f:
+                first = f.readline()
+            return datetime.fromisoformat(json.loads(first)["timestamp"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        return bool(
+            self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds
+        )
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.log_file}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.log_file}.{i + 1}")
+            os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+        self._file = open(self.log_file, "a", encoding="utf-8")
+        self._opened_at = time.time()
+        with self._lock:
+            self.rotations += 1
 
 
 # Global logger instance
 tool_logger = ToolLogger()
+atexit.register(tool_logger.close)
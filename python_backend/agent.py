@@ -1,21 +1,27 @@
+import contextvars
+import logging
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from langchain_openai import ChatOpenAI
 from langchain.schema import (
     HumanMessage,
-    SystemMessage,
     AIMessage,
     BaseMessage,
 )
 
+from langchain_core.callbacks.manager import dispatch_custom_event
 from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
 # from langgraph.prebuilt import ToolNode  # Using custom tool node instead
 from dotenv import load_dotenv
 from langchain_core.tools import tool
-from typing import TypedDict, Annotated, Sequence, Optional
-from serpapi import GoogleSearch
+from typing import TypedDict, Annotated, Sequence, Optional, Dict
+from search_cache import search_cache
 import json
 from pprint import pprint
 from ToolLogger import tool_logger
@@ -24,6 +30,9 @@ from trip_tools import (
     create_trip,
     add_destination_to_trip,
     get_trip_details,
+    get_trip_weather,
+    optimize_trip_route,
+    find_nearby_locations,
     get_travel_recommendations,
     get_llm_context,
 )
@@ -33,14 +42,36 @@ from trip_utils import (
     extract_locations_from_text,
     create_locations_json,
 )
+from services import TripService, TripSnapshot, use_trip_snapshot
+from conversation_analyzer import ConversationAnalyzer
+from checkpointer import SQLiteCheckpointSaver, thread_key
+from history_compactor import (
+    HistoryCompactor,
+    HistorySummary,
+    compact_history,
+    preload_encoding,
+)
+from prompt_assembler import PromptAssembler
+from intent_router import IntentRouter
+from metrics import (
+    GRAPH_NODE_SECONDS,
+    LLM_CALL_SECONDS,
+    TOOL_CALL_SECONDS,
+    TOOL_TIMEOUTS,
+)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
     user_id: str
     user_trips: Optional[str]  # Trip data passed in context
+    trip_snapshot: Optional[TripSnapshot]  # Trips fetched once per request
+    conversation: Optional[ConversationAnalyzer]  # Per-message analysis cache
+    history_summary: Optional[HistorySummary]  # Rolling summary of folded turns
 
 
 @tool
@@ -57,21 +88,17 @@ def search_places(query: str) -> str:
 
     Returns: Up to 5 top results with ratings and descriptions.
     """
-    print(
-        f"========================= USING TOOL: Searching for places in {query} =========================\n"
-    )
+    logger.info("Tool search_places", extra={"query": query})
     params = {
         "q": query,
         "engine": "google_maps",
         "api_key": os.getenv("SERPAPI_API_KEY"),
     }
-    search = GoogleSearch(params)
-    results = search.get_dict()
+    results = search_cache.search("search_places", params)
 
     tool_logger.log_tool_result(
         tool_name="search_places", query=query, result=results, success=True
     )
-    print("Full search results saved to tool_results.json")
 
     places = []
     for result in results.get("local_results", [])[:5]:
@@ -90,9 +117,13 @@ def search_places(query: str) -> str:
 @tool
 def search_trip_planning(destination: str, start_date: str, end_date: str) -> str:
     """Search the web for trip planning information for the given destination, start date, and end date. If the user asks you for something else, say that you are trying to find trip planning information and ask them to rephrase their query."""
-    # add debuggin
-    print(
-        f" ========================= USING TOOL: Searching for trip planning in {destination} from {start_date} to {end_date} ========================= \n"
+    logger.info(
+        "Tool search_trip_planning",
+        extra={
+            "destination": destination,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
     )
     query = f"trip planning for {destination} from {start_date} to {end_date}"
     params = {
@@ -100,19 +131,15 @@ def search_trip_planning(destination: str, start_date: str, end_date: str) -> st
         "engine": "google",
         "api_key": os.getenv("SERPAPI_API_KEY"),
     }
-    search = GoogleSearch(params)
-    results = search.get_dict()
+    results = search_cache.search("search_trip_planning", params)
 
-    # Log the complete results to JSON file for debugging
+    # Log the (cached, projected) results to JSON file for debugging
     tool_logger.log_tool_result(
         tool_name="search_trip_planning", query=query, result=results, success=True
     )
-    print(f"📝 Full search results saved to tool_results.json")
 
     trip_planning_info = results.get("trip_planning", [])
-    print(
-        f"The trip planning information is {trip_planning_info} for the given destination, start date, and end date."
-    )
+    logger.debug("Trip planning info: %s", trip_planning_info)
     return trip_planning_info
 
 
@@ -131,9 +158,7 @@ def search_weather(locations: str) -> str:
     Args:
         locations: Comma-separated list of location names. Accept ANY format the user provides.
     """
-    print(
-        f"========================= USING TOOL: Searching weather for {locations} =========================\n"
-    )
+    logger.info("Tool search_weather", extra={"locations": locations})
 
     # Parse the comma-separated locations
     location_list = [loc.strip() for loc in locations.split(",")]
@@ -141,29 +166,29 @@ def search_weather(locations: str) -> str:
     # Call the search_weather function
     weather_data = search_weather_function(location_list)
 
-    if "error" in weather_data:
-        return f"Could not fetch weather data: {weather_data['error']}"
+    if weather_data.error:
+        return f"Could not fetch weather data: {weather_data.error}"
 
     # Format the response
     result = ""
-    for i, loc_weather in enumerate(weather_data.get("locations", [])):
-        location_name = location_list[i] if i < len(location_list) else "Unknown"
-        current = loc_weather.get("current", {})
+    for loc_weather in weather_data.locations:
+        current = loc_weather.current
 
-        result += f"\n📍 **{location_name}**\n"
-        result += f"Current: {current.get('condition', 'N/A')}, {current.get('temperature_f', 'N/A')}°F ({current.get('temperature_c', 'N/A')}°C)\n"
-        result += f"Humidity: {current.get('humidity', 'N/A')}, Wind: {current.get('wind', 'N/A')}\n"
+        result += f"\n📍 **{current.location}**\n"
+        result += f"Current: {current.condition}, {current.temperature_f}°F ({current.temperature_c}°C)\n"
+        result += f"Humidity: {current.humidity}, Wind: {current.wind}\n"
 
-        forecast = loc_weather.get("forecast", [])
+        forecast = loc_weather.forecast
         if forecast:
             result += "Forecast:\n"
             for day in forecast[:3]:  # Show 3-day forecast
-                result += (
-                    f"  - {day.get('day', 'N/A')}: {day.get('condition', 'N/A')}, "
-                )
-                result += f"High: {day.get('high_f', 'N/A')}°F, Low: {day.get('low_f', 'N/A')}°F\n"
+                result += f"  - {day.day}: {day.condition}, "
+                result += f"High: {day.high_f}°F, Low: {day.low_f}°F\n"
         result += "\n"
 
+    if weather_data.timed_out:
+        result += f"Weather lookup timed out for: {', '.join(weather_data.timed_out)}\n"
+
     return result if result else "Could not fetch weather data."
 
 
@@ -174,140 +199,177 @@ tools = [
     create_trip,
     add_destination_to_trip,
     get_trip_details,
+    get_trip_weather,
+    optimize_trip_route,
+    find_nearby_locations,
     get_travel_recommendations,
     get_llm_context,
 ]
 
 
 # Custom tool node that can access state
-class CustomToolNode:
-    def __init__(self, tools):
-        self.tools = {tool.name: tool for tool in tools}
-
-    def __call__(self, state: AgentState) -> AgentState:
-        messages = state["messages"]
-        user_id = state.get("user_id", "unknown")
-
-        last_message = messages[-1]
-        tool_calls = last_message.tool_calls
-
-        tool_messages = []
-        for tool_call in tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            # Add user_id to tool arguments for tools that need it
-            if tool_name in [
-                "create_trip",
-                "add_destination_to_trip",
-                "get_trip_details",
-                "get_travel_recommendations",
-                "get_llm_context",
-            ]:
-                tool_args["user_id"] = user_id
-
-            print(f"🔧 EXECUTING TOOL: {tool_name} with args: {tool_args}")
-
-            try:
-                tool = self.tools[tool_name]
-                result = tool.invoke(tool_args)
-                tool_messages.append(
-                    ToolMessage(content=str(result), tool_call_id=tool_call["id"])
-                )
-            except Exception as e:
-                print(f"❌ TOOL ERROR: {e}")
-                tool_messages.append(
-                    ToolMessage(
-                        content=f"Error: {str(e)}", tool_call_id=tool_call["id"]
-                    )
-                )
-
-        return {"messages": tool_messages}
-
+# Tool execution settings. Independent tool calls of one model turn (e.g.
+# search_places + search_weather) run concurrently on a bounded pool.
+TOOL_PARALLEL = os.getenv("TOOL_PARALLEL", "true").lower() in ("1", "true", "yes")
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+
+# Per-tool timeouts in seconds (TOOL_TIMEOUT_SECONDS for everything else).
+# Not TOOL_TIMEOUTS: that is the timeout counter imported from metrics
+DEFAULT_TOOL_TIMEOUTS = {
+    "search_weather": 15.0,
+    "get_trip_weather": 15.0,
+}
+
+# Tools that need the caller's user_id injected into their arguments
+USER_SCOPED_TOOLS = {
+    "create_trip",
+    "add_destination_to_trip",
+    "get_trip_details",
+    "get_trip_weather",
+    "optimize_trip_route",
+    "find_nearby_locations",
+    "get_travel_recommendations",
+    "get_llm_context",
+}
+
+# Tools that change the user's trips. Each runs alone: calls issued before it
+# finish first, and calls issued after it start once it is done. They have no
+# timeout: an abandoned call keeps running, and the model would retry it and
+# create a duplicate trip.
+MUTATING_TOOLS = {"create_trip", "add_destination_to_trip"}
+
+_tool_executor = ThreadPoolExecutor(
+    max_workers=TOOL_MAX_WORKERS, thread_name_prefix="agent-tool"
+)
 
-tool_node = CustomToolNode(tools)
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.8).bind_tools(tools)
 
+class CustomToolNode:
+    """Executes the tool calls of the last AI message.
 
-def should_use_tools(state: AgentState) -> str:
-    last_message = state["messages"][-1]
-    print(f"\nDECISION NODE - Should use tools?")
-    print(
-        f"Last message has tool_calls: {hasattr(last_message, 'tool_calls') and bool(last_message.tool_calls)}"
-    )
+    Read-only calls run on the pool under their timeout, one at a time or
+    concurrently; tools in MUTATING_TOOLS run inline without one.
 
-    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-        print(f"ROUTING TO TOOLS - {len(last_message.tool_calls)} tool(s) to execute")
-        return "tools"
-    else:
-        print(f"ENDING CONVERSATION - No tools needed")
-        return "end"
+    Args:
+        tools: Tools the model may call
+        parallel: Run independent tool calls concurrently (defaults to
+            TOOL_PARALLEL)
+        timeouts: Per-tool timeout overrides in seconds
+        executor: Pool the read-only calls run on (defaults to the shared pool)
+    """
 
+    def __init__(
+        self,
+        tools,
+        parallel: Optional[bool] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        self.tools = {tool.name: tool for tool in tools}
+        self.parallel = TOOL_PARALLEL if parallel is None else parallel
+        self.timeouts = {**DEFAULT_TOOL_TIMEOUTS, **(timeouts or {})}
+        self.executor = executor or _tool_executor
 
-def extract_conversation_info(messages: list) -> dict:
-    """Extract trip information from conversation history"""
-    info = {
-        "destinations": [],
-        "start_date": "",
-        "end_date": "",
-        "has_destination": False,
-        "has_dates": False,
-    }
+    def _timeout(self, tool_name: str) -> float:
+        return self.timeouts.get(tool_name, TOOL_TIMEOUT_SECONDS)
 
-    # Only extract from user messages (HumanMessage), not AI responses or tool messages
-    user_text = ""
-    for message in messages:
-        if (
-            isinstance(message, HumanMessage)
-            and hasattr(message, "content")
-            and message.content
-        ):
-            user_text += " " + message.content
-
-    print(f"🔍 EXTRACTING FROM USER TEXT: '{user_text.strip()}'")
-
-    # Extract destinations
-    destinations = extract_locations_from_text(user_text)
-    if destinations:
-        info["destinations"] = destinations
-        info["has_destination"] = True
-        print(f"📍 FOUND DESTINATIONS: {destinations}")
-
-    # Extract dates
-    parsed_trip = parse_trip_request(user_text)
-    if parsed_trip["start_date"] and parsed_trip["end_date"]:
-        info["start_date"] = parsed_trip["start_date"]
-        info["end_date"] = parsed_trip["end_date"]
-        info["has_dates"] = True
-        print(
-            f"📅 FOUND DATES: {parsed_trip['start_date']} to {parsed_trip['end_date']}"
-        )
+    def _invoke(self, tool_call: dict, state: AgentState) -> ToolMessage:
+        tool_name = tool_call["name"]
+        tool_args = tool_call["args"]
 
-    return info
+        # Add user_id to tool arguments for tools that need it
+        if tool_name in USER_SCOPED_TOOLS:
+            tool_args["user_id"] = state.get("user_id", "unknown")
 
+        logger.info("Executing tool %s", tool_name, extra={"args": tool_args})
 
-def chat(state: AgentState) -> AgentState:
-    # Build dynamic system prompt with user's trip data
-    print(f"\n{'='*80}")
-    print(f"🤖 CHAT NODE - Processing user input")
-    print(f"User ID: {state.get('user_id', 'Unknown')}")
-    print(f"Messages count: {len(state.get('messages', []))}")
-    print(f"User trips available: {bool(state.get('user_trips'))}")
+        start = time.perf_counter()
+        try:
+            tool = self.tools[tool_name]
+            # Tools read the user's trips from the request's snapshot. The
+            # context variable is set here so it is visible in pool threads.
+            with use_trip_snapshot(state.get("trip_snapshot")):
+                result = tool.invoke(tool_args)
+            TOOL_CALL_SECONDS.observe(time.perf_counter() - start, tool_name, "ok")
+            return ToolMessage(content=str(result), tool_call_id=tool_call["id"])
+        except Exception as e:
+            TOOL_CALL_SECONDS.observe(time.perf_counter() - start, tool_name, "error")
+            logger.exception("Tool %s failed", tool_name)
+            return ToolMessage(content=f"Error: {str(e)}", tool_call_id=tool_call["id"])
+
+    def _run_timed(self, tool_calls: list, state: AgentState) -> Dict[str, ToolMessage]:
+        """Run read-only calls concurrently on the pool, each under its timeout."""
+        start = time.monotonic()
+        futures = {
+            # Each call runs in a copy of this context (request id for logs)
+            tool_call["id"]: self.executor.submit(
+                contextvars.copy_context().run, self._invoke, tool_call, state
+            )
+            for tool_call in tool_calls
+        }
+
+        results = {}
+        for tool_call in tool_calls:
+            future = futures[tool_call["id"]]
+            timeout = self._timeout(tool_call["name"])
+            # Deadlines count from submission, so a call stuck in the pool's
+            # queue cannot outlive its timeout either
+            remaining = max(0.0, start + timeout - time.monotonic())
+            try:
+                results[tool_call["id"]] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                # Drops the call if it has not started; a running call cannot
+                # be interrupted and its late result is discarded
+                future.cancel()
+                TOOL_TIMEOUTS.inc(tool_call["name"])
+                logger.warning(
+                    "Tool %s timed out after %gs", tool_call["name"], timeout
+                )
+                results[tool_call["id"]] = ToolMessage(
+                    content=f"Error: {tool_call['name']} timed out after {timeout:g}s",
+                    tool_call_id=tool_call["id"],
+                )
+        return results
 
-    # Extract conversation info
-    conv_info = extract_conversation_info(state.get("messages", []))
-    print(f"Conversation info: {conv_info}")
-    print(f"{'='*80}")
+    @GRAPH_NODE_SECONDS.time("tools")
+    def __call__(self, state: AgentState) -> AgentState:
+        messages = state["messages"]
+        last_message = messages[-1]
+        tool_calls = last_message.tool_calls
 
-    base_prompt = """You are Max, a helpful travel assistant with personality. You can:
+        results = {}
+        # Read-only calls between two mutating ones run concurrently (one per
+        # batch when not parallel); a read issued after create_trip must see
+        # the trip it created
+        batch = []
+        for tool_call in tool_calls + [None]:
+            if tool_call is not None and tool_call["name"] not in MUTATING_TOOLS:
+                batch.append(tool_call)
+                if self.parallel:
+                    continue
+            if batch:
+                results.update(self._run_timed(batch, state))
+            batch = []
+            if tool_call is not None and tool_call["name"] in MUTATING_TOOLS:
+                results[tool_call["id"]] = self._invoke(tool_call, state)
+
+        # ToolMessages go back in the order the model issued the calls
+        return {"messages": [results[call["id"]] for call in tool_calls]}
+
+
+# Static instructions only: anything per user or per turn goes in the trailing
+# context message (see chat), so the prompt prefix stays byte-identical
+SYSTEM_PROMPT = """You are Max, a helpful travel assistant with personality. You can:
     1. **Create trips** for users (use create_trip tool)
-    2. **Check weather** for ANY location (use search_weather tool)
+    2. **Check weather** for ANY location (use search_weather tool), or for the user's trips (use get_trip_weather tool)
     3. **Search for places**, restaurants, and attractions (use search_places tool)
     4. **Search for trip planning** information (use search_trip_planning tool)
     5. **Add destinations** to existing trips (use add_destination_to_trip tool)
     6. **Get trip details** and information (use get_trip_details tool)
     7. **Get personalized recommendations** (use get_travel_recommendations tool)
     8. **Get context and debugging information** (use get_llm_context tool)
+    9. **Suggest the best visiting order** for a trip's locations (use optimize_trip_route tool)
+    10. **Find places near a location** among the user's trips (use find_nearby_locations tool)
     
     ## How to Use Tools:
     
@@ -431,8 +493,108 @@ def chat(state: AgentState) -> AgentState:
     - You have access to real-time data through your tools. Use them!
     - Handle ALL types of travel queries - creation, modification, information, recommendations"""
 
-    # Add conversation context
-    conv_context = f"\n\nCONVERSATION ANALYSIS:\n"
+# The tiktoken encoding may need a download; count with the estimate until then
+preload_encoding()
+tool_node = CustomToolNode(tools)
+llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.8).bind_tools(tools)
+prompt_assembler = PromptAssembler(SYSTEM_PROMPT, tools)
+# Writes the rolling summary of old turns, off the request path
+history_compactor = HistoryCompactor(ChatOpenAI(model="gpt-4o-mini", temperature=0))
+intent_router = IntentRouter()
+
+# Custom stream event carrying a fast-path answer (see route_intent)
+FAST_PATH_EVENT = "fast_path_answer"
+
+
+def should_use_tools(state: AgentState) -> str:
+    last_message = state["messages"][-1]
+    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+        logger.debug("Routing to tools: %d call(s)", len(last_message.tool_calls))
+        return "tools"
+    else:
+        logger.debug("No tool calls, ending turn")
+        return "end"
+
+
+def extract_conversation_info(messages: list) -> dict:
+    """Extract trip information from conversation history"""
+    return ConversationAnalyzer().update(messages).info()
+
+
+@GRAPH_NODE_SECONDS.time("router")
+def route_intent(state: AgentState, config: RunnableConfig) -> Optional[AgentState]:
+    """Answer simple lookups from a tool and a template, without the model.
+
+    Returns None (no update, the turn goes to chat) unless the message
+    matches an intent and its tool returned a usable result.
+    """
+    message = state["messages"][-1]
+    if not isinstance(message, HumanMessage) or not isinstance(message.content, str):
+        return None
+    intent = intent_router.match(message.content)
+    if intent is None:
+        intent_router.record(None, "no_match")
+        return None
+
+    start = time.perf_counter()
+    tool_call = {
+        "name": intent.tool,
+        "args": dict(intent.args),
+        "id": f"fastpath_{uuid.uuid4().hex[:12]}",
+    }
+    result = tool_node._run_timed([tool_call], state)[tool_call["id"]]
+    answer = intent_router.answer(intent, result.content)
+    if answer is None:
+        intent_router.record(intent.name, "tool_failed")
+        return None
+
+    # The tool call and result stay in the history, as if the model had made
+    # them, so later turns can build on the data
+    dispatch_custom_event(FAST_PATH_EVENT, {"text": answer}, config=config)
+    intent_router.record(intent.name, "hit", time.perf_counter() - start)
+    logger.info("Intent fast path", extra={"intent": intent.name})
+    return {
+        "messages": [
+            AIMessage(content="", tool_calls=[tool_call]),
+            result,
+            AIMessage(content=answer),
+        ]
+    }
+
+
+def after_router(state: AgentState) -> str:
+    last_message = state["messages"][-1]
+    return "end" if isinstance(last_message, AIMessage) else "chat"
+
+
+@GRAPH_NODE_SECONDS.time("chat")
+def chat(state: AgentState, config: RunnableConfig) -> AgentState:
+    # Static instructions, then the conversation, then this turn's context
+    logger.debug(
+        "Chat node",
+        extra={
+            "user_id": state.get("user_id", "Unknown"),
+            "messages": len(state.get("messages", [])),
+        },
+    )
+
+    # Prefer the request's trip snapshot: it reflects trips created or changed
+    # by tools earlier in this turn
+    snapshot = state.get("trip_snapshot")
+    if snapshot is not None:
+        user_trips = TripService.format_trips_context(snapshot.get_trips())
+    else:
+        user_trips = state.get("user_trips")
+
+    # Analyze only the user messages this conversation hasn't seen yet
+    analyzer = state.get("conversation") or ConversationAnalyzer()
+    analyzer = analyzer.update(state.get("messages", []))
+    conv_info = analyzer.info()
+    logger.debug("Conversation info: %s", conv_info)
+
+    # Per-turn data goes after the conversation, so the instructions and the
+    # turns already sent stay a cacheable prefix
+    conv_context = f"CONVERSATION ANALYSIS:\n"
     conv_context += f"- Has destination: {conv_info['has_destination']} ({conv_info['destinations']})\n"
     conv_context += f"- Has dates: {conv_info['has_dates']} ({conv_info['start_date']} to {conv_info['end_date']})\n"
     conv_context += f"- Ready to create trip: {conv_info['has_destination'] and conv_info['has_dates']}\n"
@@ -443,73 +605,90 @@ def chat(state: AgentState) -> AgentState:
         conv_context += f"Dates: {conv_info['start_date']} to {conv_info['end_date']}\n"
         conv_context += f"Action: Research destinations and create trip immediately!\n"
 
-    # Add explicit conversation summary for better context
-    user_messages = [
-        msg.content for msg in state["messages"] if isinstance(msg, HumanMessage)
-    ]
-    if len(user_messages) > 1:
-        conv_context += f"\n\nCONVERSATION HISTORY:\n"
-        for i, msg in enumerate(user_messages, 1):
-            conv_context += f"User message {i}: {msg}\n"
-        conv_context += f"\nIMPORTANT: Use ALL the information from the conversation history above. Do not ask for information the user has already provided!\n"
+    # Recent turns go in verbatim, older ones through the rolling summary.
+    # The messages are already in the prompt, so they are not repeated here.
+    history = compact_history(state["messages"], state.get("history_summary"))
+    if len(history.messages) > 1:
+        conv_context += f"\nIMPORTANT: Use ALL the information from the conversation so far. Do not ask for information the user has already provided!\n"
 
     # Add user's trip data to context if available
-    if state.get("user_trips"):
-        trips_context = f"\n\nUSER'S TRIPS:\n{state['user_trips']}\n\nUse this information to answer questions about the user's trips. You don't need to call any tools to access this data - it's already here."
-        system_content = base_prompt + conv_context + trips_context
+    if user_trips:
+        trips_context = f"\n\nUSER'S TRIPS:\n{user_trips}\n\nUse this information to answer questions about the user's trips. You don't need to call any tools to access this data - it's already here."
+        context = conv_context + trips_context
     else:
-        system_content = (
-            base_prompt + conv_context + "\n\nThe user doesn't have any trips yet."
-        )
-
-    system_prompt = SystemMessage(content=system_content)
-    messages = [system_prompt, *state["messages"]]
+        context = conv_context + "\n\nThe user doesn't have any trips yet."
 
-    print(f"\n📝 SYSTEM PROMPT LENGTH: {len(system_content)} characters")
-    print(f"📝 TOTAL MESSAGES: {len(messages)}")
-    print(
-        f"📝 LAST USER MESSAGE: {state['messages'][-1].content if state['messages'] else 'None'}"
+    prompt = prompt_assembler.assemble(
+        history.messages,
+        context,
+        thread_id=config.get("configurable", {}).get("thread_id"),
     )
+    messages = prompt.messages
 
-    print(f"\n🔄 CALLING LLM...")
-    response = llm.invoke(messages)
+    history_compactor.record(prompt.total_tokens - history.tokens_after, history)
 
-    print(f"\n✅ LLM RESPONSE RECEIVED:")
-    print(f"Content: {response.content[:200]}...")
-    print(
-        f"Tool calls: {len(response.tool_calls) if hasattr(response, 'tool_calls') and response.tool_calls else 0}"
+    start = time.perf_counter()
+    response = llm.invoke(messages)
+    elapsed = time.perf_counter() - start
+    LLM_CALL_SECONDS.observe(elapsed)
+    intent_router.record_llm_call(elapsed)
+    logger.info(
+        "LLM call",
+        extra={
+            "messages": len(messages),
+            "context_chars": len(context),
+            "seconds": round(elapsed, 3),
+            "tool_calls": [
+                tool_call["name"] for tool_call in response.tool_calls or []
+            ],
+        },
     )
 
-    if hasattr(response, "tool_calls") and response.tool_calls:
-        for i, tool_call in enumerate(response.tool_calls):
-            print(f"  Tool {i+1}: {tool_call['name']} with args: {tool_call['args']}")
-
-    return {"messages": [response]}
+    return {"messages": [response], "conversation": analyzer}
 
 
 graph = StateGraph(AgentState)
+graph.add_node("router", route_intent)
 graph.add_node("chat", chat)
 graph.add_node("tools", tool_node)
 
-graph.add_edge(START, "chat")
+graph.add_edge(START, "router")
+graph.add_conditional_edges("router", after_router, {"chat": "chat", "end": END})
 graph.add_conditional_edges("chat", should_use_tools, {"tools": "tools", "end": END})
 graph.add_edge("tools", "chat")
 
-app = graph.compile()
+# Conversations persist per user/thread; channels that only make sense for the
+# current request are never written to disk
+checkpointer = SQLiteCheckpointSaver(request_scoped=("trip_snapshot", "user_trips"))
+app = graph.compile(checkpointer=checkpointer)
 
 
 async def generate_ai_response_stream_async(
     user_input: str,
     user_id: str,
     user_trips: Optional[str] = None,
+    trip_snapshot: Optional[TripSnapshot] = None,
+    thread_id: Optional[str] = None,
 ):
-    print(f"\n{'='*80}")
-    print(f"🚀 STARTING AI RESPONSE GENERATION")
-    print(f"User input: '{user_input}'")
-    print(f"User ID: {user_id}")
-    print(f"User trips context: {bool(user_trips)}")
-    print(f"{'='*80}")
+    logger.info(
+        "Generating response",
+        extra={
+            "user_id": user_id,
+            "thread_id": thread_id or user_id,
+            "input_chars": len(user_input),
+            "has_trips": bool(user_trips),
+        },
+    )
+    # Checked once: per-token logging costs nothing when DEBUG is off
+    debug = logger.isEnabledFor(logging.DEBUG)
 
+    # Earlier turns of the thread are restored from the checkpointer;
+    # only the new message is sent in
+    config = {"configurable": {"thread_id": thread_key(user_id, thread_id)}}
+    lock = history_compactor.lock(config["configurable"]["thread_id"])
+
+    # One turn at a time per thread, and never during a summary update
+    await lock.acquire()
     try:
         # Use astream_events for token-by-token streaming
         async for event in app.astream_events(
@@ -517,37 +696,34 @@ async def generate_ai_response_stream_async(
                 "messages": [HumanMessage(content=user_input)],
                 "user_id": user_id,
                 "user_trips": user_trips,  # Pass trip data in context
+                "trip_snapshot": trip_snapshot,
             },
+            config=config,
             version="v2",
         ):
             kind = event["event"]
-            print(f"\nEVENT: {kind}")
 
             # Stream tokens from the LLM
             if kind == "on_chat_model_stream":
                 content = event["data"]["chunk"].content
                 if content:
-                    print(f"YIELDING TOKEN: '{content}'")
+                    if debug:
+                        logger.debug("Token %r", content)
                     yield content
 
-            # Handle tool calls if needed
-            elif kind == "on_tool_start":
-                tool_name = event.get("name", "Unknown")
-                print(f"TOOL STARTED: {tool_name}")
-
-            elif kind == "on_tool_end":
-                tool_name = event.get("name", "Unknown")
-                print(f"TOOL COMPLETED: {tool_name}")
-
-            elif kind == "on_chat_model_start":
-                print(f"CHAT MODEL STARTED")
+            # Templated answer of the intent fast path
+            elif kind == "on_custom_event" and event["name"] == FAST_PATH_EVENT:
+                yield event["data"]["text"]
 
-            elif kind == "on_chat_model_end":
-                print(f"CHAT MODEL ENDED")
+            elif debug:
+                logger.debug("Event %s %s", kind, event.get("name", ""))
 
     except Exception as e:
-        print(f"\n❌ ERROR IN AI PROCESSING: {e}")
-        import traceback
-
-        traceback.print_exc()
+        logger.exception("AI processing failed")
         yield f"Error in AI processing: {str(e)}"
+
+    finally:
+        lock.release()
+
+    # Fold old turns into the summary after the response has been streamed
+    history_compactor.schedule(app, config)
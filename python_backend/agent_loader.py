@@ -0,0 +1,105 @@
+"""
+Deferred loading of the AI agent.
+
+Importing `agent` pulls in langchain, langgraph and the OpenAI client, builds
+the tool-bound chat model and compiles the graph, which takes most of a
+worker's boot time. The API imports it through AgentLoader instead, so the
+server accepts connections (and answers /health) before the agent exists.
+
+AGENT_WARMUP chooses when the agent is built, once per worker:
+    background  right after startup, without delaying it (default)
+    startup     before the worker accepts requests
+    lazy        on the first request that needs it
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from types import ModuleType
+from typing import Optional
+from dotenv import load_dotenv
+from services import run_blocking
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "background").lower()
+
+
+class AgentLoader:
+    """Imports a module on first use, once, from whichever caller gets there first.
+
+    Args:
+        module_name: Module to import (the agent)
+    """
+
+    def __init__(self, module_name: str = "agent"):
+        self.module_name = module_name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self.error: Optional[BaseException] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """cold, loading, ready or failed."""
+        if self._module is not None:
+            return "ready"
+        if self._loading:
+            return "loading"
+        return "failed" if self.error is not None else "cold"
+
+    def load(self) -> ModuleType:
+        """Import the module, blocking until it is ready.
+
+        A failed import is raised to the caller and retried on the next call.
+        """
+        if self._module is not None:
+            return self._module
+        with self._lock:
+            if self._module is None:
+                self._loading = True
+                start = time.perf_counter()
+                try:
+                    module = importlib.import_module(self.module_name)
+                except Exception as e:
+                    self.error = e
+                    logger.exception("Agent load failed")
+                    raise
+                finally:
+                    self._loading = False
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                self.error = None
+                self._module = module
+                logger.info("Agent loaded", extra={"seconds": self.load_seconds})
+        return self._module
+
+    async def get(self) -> ModuleType:
+        """The loaded module; imports it off the event loop if needed."""
+        if self._module is not None:
+            return self._module
+        return await run_blocking(self.load)
+
+    def warm(self, mode: str = AGENT_WARMUP) -> Optional[asyncio.Future]:
+        """Start loading according to the warmup mode.
+
+        Returns:
+            Awaitable that completes when the agent is loaded, or None for
+            lazy loading
+        """
+        if mode == "lazy":
+            return None
+        task = asyncio.ensure_future(self.get())
+        if mode == "background":
+            # Failures are logged in load() and retried by the next request
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+
+# Shared loader for the API
+agent_loader = AgentLoader()
@@ -0,0 +1,176 @@
+"""
+Per-turn latency of a growing conversation: checkpointed threads vs the
+caller resending the whole history every turn.
+
+The LLM is replaced by an instant fake, so the numbers are pure graph
+overhead (state restore, conversation analysis, checkpoint writes). With the
+checkpointer only the new message goes in and the thread is resumed from the
+hot-thread LRU; "cold" is the same turn after the LRU has been cleared, i.e.
+a resume from SQLite. "checkpointer only" is the CPU time the saver itself
+spends per turn (restore plus checkpoint writes), which must stay flat; the
+rest of a turn walks the whole message list in LangGraph's add_messages and
+in prompt building, in both modes.
+
+Usage (from python_backend/):
+    python benchmarks/bench_checkpointer.py [--turns 200]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import stub_server  # noqa: F401  (puts the backend on sys.path)
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import agent
+from checkpointer import SQLiteCheckpointSaver
+from services import TripSnapshot
+
+MESSAGES = [
+    "I want to plan a trip to Rome and Florence",
+    "We would go from October 18 to October 28 2026",
+    "What's the weather like there in autumn?",
+    "Can you add Venice as well?",
+    "Any good restaurants near the Pantheon?",
+]
+
+
+class FakeLLM:
+    def invoke(self, messages):
+        return AIMessage(content=f"Sure! ({len(messages)} messages in context)")
+
+
+class TimedSaver(SQLiteCheckpointSaver):
+    """Saver adding up the CPU time of its own calls (they run on threads)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seconds = 0.0
+        self._timer_lock = threading.Lock()
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.thread_time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            with self._timer_lock:
+                self.seconds += time.thread_time() - start
+
+    def get_tuple(self, config):
+        return self._timed(super().get_tuple, config)
+
+    def put(self, *args, **kwargs):
+        return self._timed(super().put, *args, **kwargs)
+
+    def put_writes(self, *args, **kwargs):
+        return self._timed(super().put_writes, *args, **kwargs)
+
+
+def window_ms(samples, start, end):
+    return statistics.median(samples[start:end]) * 1000
+
+
+async def run_checkpointed(turns, db_path):
+    saver = TimedSaver(path=db_path, request_scoped=("trip_snapshot", "user_trips"))
+    app = agent.graph.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "bench-user:bench"}}
+    latencies = []
+    saver_time = []
+    for turn in range(turns):
+        saver.seconds = 0.0
+        start = time.perf_counter()
+        await app.ainvoke(
+            {
+                "messages": [HumanMessage(content=MESSAGES[turn % len(MESSAGES)])],
+                "user_id": "bench-user",
+                "trip_snapshot": TripSnapshot("bench-user", trips=[]),
+            },
+            config,
+        )
+        latencies.append(time.perf_counter() - start)
+        saver_time.append(saver.seconds)
+
+    # Resume from disk: forget the hot thread before each turn
+    cold = []
+    for turn in range(10):
+        saver._hot.clear()
+        start = time.perf_counter()
+        await app.ainvoke(
+            {"messages": [HumanMessage(content="And one more thing")]}, config
+        )
+        cold.append(time.perf_counter() - start)
+    return latencies, saver_time, cold, saver.stats()
+
+
+async def run_resend_history(turns):
+    app = agent.graph.compile()
+    history = []
+    latencies = []
+    for turn in range(turns):
+        history.append(HumanMessage(content=MESSAGES[turn % len(MESSAGES)]))
+        start = time.perf_counter()
+        result = await app.ainvoke(
+            {
+                "messages": list(history),
+                "user_id": "bench-user",
+                "trip_snapshot": TripSnapshot("bench-user", trips=[]),
+            }
+        )
+        latencies.append(time.perf_counter() - start)
+        history.append(result["messages"][-1])
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+    agent.llm = FakeLLM()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(
+        io.StringIO()
+    ):
+        checkpointed, saver_time, cold, stats = asyncio.run(
+            run_checkpointed(args.turns, os.path.join(tmp, "checkpoints.sqlite3"))
+        )
+        resend = asyncio.run(run_resend_history(args.turns))
+
+    last = args.turns
+    mid = args.turns // 2
+    print(f"turns={args.turns} (median per-turn latency, fake LLM)")
+    print(
+        f"{'':<22}{'turns 1-10':>12}{f'turns {mid + 1}-{mid + 10}':>16}{f'last 10':>12}"
+    )
+    for name, samples in (
+        ("checkpointed (hot)", checkpointed),
+        ("checkpointer only", saver_time),
+        ("resend history", resend),
+    ):
+        print(
+            f"{name:<22}{window_ms(samples, 0, 10):>10.2f}ms"
+            f"{window_ms(samples, mid, mid + 10):>14.2f}ms"
+            f"{window_ms(samples, last - 10, last):>10.2f}ms"
+        )
+    print(
+        f"checkpointed (cold)   {statistics.median(cold) * 1000:.2f}ms at turn {last}"
+    )
+    print(f"saver stats           {stats}")
+
+    # What a write costs must not depend on how long the thread is
+    first, final = window_ms(saver_time, 0, 10), window_ms(saver_time, last - 10, last)
+    assert (
+        final < first * 2
+    ), f"checkpointer time grew from {first:.2f} to {final:.2f}ms"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Accuracy and throughput of trip date parsing: date_parser vs the old
+regex/strptime code (legacy_date_parsing.py).
+
+Every corpus entry is a realistic trip request with the expected start and
+end date for a fixed "today" of 2025-10-01. Throughput is measured cold (the
+memoization cache cleared before every pass) and warm (the same texts again,
+like the agent re-parsing the conversation on every step).
+
+Usage (from python_backend/):
+    python benchmarks/bench_date_parser.py [--passes 200]
+"""
+
+import argparse
+import time
+from datetime import date, datetime
+
+import stub_server  # noqa: F401  (puts the backend on sys.path)
+import legacy_date_parsing
+import date_parser
+
+TODAY = date(2025, 10, 1)
+
+# (text, expected start, expected end); a single date means a 7-day trip
+CORPUS = [
+    ("I want to go to Paris from July 1 to July 10", "2025-07-01", "2025-07-10"),
+    ("Create a trip to Paris from July 1-10", "2025-07-01", "2025-07-10"),
+    (
+        "I'd like to go to New York and Boston from October 17th 2025 to October 28th 2025",
+        "2025-10-17",
+        "2025-10-28",
+    ),
+    (
+        "I would like to go to Rome and Milan. October 18 to October 28 2025",
+        "2025-10-18",
+        "2025-10-28",
+    ),
+    ("from October 25th to November 2nd 2025", "2025-10-25", "2025-11-02"),
+    ("Trip to Tokyo 2025-11-03 to 2025-11-12", "2025-11-03", "2025-11-12"),
+    ("Lisbon, 11/20/2025 - 11/27/2025", "2025-11-20", "2025-11-27"),
+    ("Barcelona from 20/12/2025 to 27/12/2025", "2025-12-20", "2025-12-27"),
+    ("Can you plan Berlin from 12/5 to 12/9?", "2025-12-05", "2025-12-09"),
+    ("Visit Vienna 5 December to 12 December", "2025-12-05", "2025-12-12"),
+    ("Prague 3-8 November please", "2025-11-03", "2025-11-08"),
+    ("Skiing in Zermatt from Dec 28 to Jan 4", "2025-12-28", "2026-01-04"),
+    ("Going to Dublin on March 14, 2026", "2026-03-14", "2026-03-21"),
+    ("Weekend in Amsterdam starting November 7th", "2025-11-07", "2025-11-14"),
+    ("I'm flying to Madrid on the 15th of November", "2025-11-15", "2025-11-22"),
+    ("Book a trip to London next week", "2025-10-08", "2025-10-15"),
+    ("Paris tomorrow for a few days", "2025-10-02", "2025-10-09"),
+    ("We leave today for Rome", "2025-10-01", "2025-10-08"),
+    ("Road trip through California next month", "2025-11-01", "2025-11-08"),
+    ("Japan trip between April 2 and April 16 2026", "2026-04-02", "2026-04-16"),
+    ("Sept 5 - Sept 12 in Greece", "2025-09-05", "2025-09-12"),
+    ("Honeymoon in Bali Jan 10 through Jan 24 2026", "2026-01-10", "2026-01-24"),
+    ("New York with my Mum, Oct. 20 until Oct. 26", "2025-10-20", "2025-10-26"),
+    ("Plan Florence 2026-05-01 for a week", "2026-05-01", "2026-05-08"),
+    ("Kyoto in late march, say March 24 - 31", "2025-03-24", "2025-03-31"),
+    ("I may travel to Oslo on 1st June 2026", "2026-06-01", "2026-06-08"),
+    ("Let's do Marseille, 7 to 14 August", "2025-08-07", "2025-08-14"),
+    ("I want to create a new trip", None, None),
+    ("Show me my trips", None, None),
+    ("What's the weather in Tokyo?", None, None),
+]
+
+
+def legacy_parse(text):
+    return legacy_date_parsing.parse_trip_request(
+        text, datetime.combine(TODAY, datetime.min.time())
+    )
+
+
+def new_parse(text):
+    return date_parser.parse_trip_dates(text, TODAY)
+
+
+def accuracy(parse):
+    failures = []
+    for text, start, end in CORPUS:
+        got = parse(text)
+        if (got["start_date"], got["end_date"]) != (start, end):
+            failures.append((text, (start, end), (got["start_date"], got["end_date"])))
+    return len(CORPUS) - len(failures), failures
+
+
+def throughput(parse, passes, clear_cache=False):
+    texts = [text for text, _, _ in CORPUS]
+    elapsed = 0.0
+    for _ in range(passes):
+        if clear_cache:
+            date_parser._parse.cache_clear()
+        start = time.perf_counter()
+        for text in texts:
+            parse(text)
+        elapsed += time.perf_counter() - start
+    return passes * len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--passes", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true", help="list failures")
+    args = parser.parse_args()
+
+    print(f"corpus={len(CORPUS)} requests  today={TODAY}  passes={args.passes}")
+    for name, parse in (("legacy", legacy_parse), ("date_parser", new_parse)):
+        correct, failures = accuracy(parse)
+        print(f"{name:<12} accuracy {correct}/{len(CORPUS)}")
+        if args.verbose:
+            for text, expected, got in failures:
+                print(f"    {text!r}: expected {expected}, got {got}")
+
+    legacy = throughput(legacy_parse, args.passes)
+    cold = throughput(new_parse, args.passes, clear_cache=True)
+    warm = throughput(new_parse, args.passes)
+    print(f"legacy       {legacy:>10,.0f} parses/s")
+    print(f"date_parser  {cold:>10,.0f} parses/s cold  ({cold / legacy:.1f}x)")
+    print(f"date_parser  {warm:>10,.0f} parses/s warm  ({warm / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
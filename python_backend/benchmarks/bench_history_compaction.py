@@ -0,0 +1,98 @@
+"""
+Prompt tokens per turn of a long conversation, with and without history
+compaction.
+
+Drives generate_ai_response_stream_async() turn after turn on one thread.
+The chat model and the summarizer are fakes (a fixed ~120-word answer and a
+fixed summary), so the run is offline; token counts come from the same
+counter the agent logs. "before" is what the prompt would have cost with the
+full history, "after" what was actually sent.
+
+Usage (from python_backend/):
+    python benchmarks/bench_history_compaction.py [--turns 40] [--every 5]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+
+import stub_server  # noqa: F401  (puts the backend on sys.path)
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+_tmp = tempfile.TemporaryDirectory()
+os.environ["CHECKPOINT_DB_PATH"] = os.path.join(_tmp.name, "checkpoints.sqlite3")
+
+from langchain_core.messages import AIMessage
+
+import agent
+from services import TripSnapshot
+
+MESSAGES = [
+    "I want to plan a trip to Rome and Florence",
+    "We would go from October 18 to October 28 2026",
+    "What's the weather like there in autumn?",
+    "Can you add Venice as well?",
+    "Any good restaurants near the Pantheon?",
+]
+ANSWER = " ".join(
+    ["Rome in late October is mild and pleasant, great for walking."] * 12
+)
+
+
+class FakeLLM:
+    def invoke(self, messages):
+        return AIMessage(content=ANSWER)
+
+
+class FakeSummarizer:
+    async def ainvoke(self, messages):
+        await asyncio.sleep(0.05)
+        return AIMessage(
+            content="User plans Rome, Florence and Venice, October 18-28 2026; "
+            "asked about autumn weather and restaurants near the Pantheon."
+        )
+
+
+async def run(turns):
+    per_turn = []
+    for turn in range(turns):
+        async for _ in agent.generate_ai_response_stream_async(
+            MESSAGES[turn % len(MESSAGES)],
+            "bench-user",
+            trip_snapshot=TripSnapshot("bench-user", trips=[]),
+        ):
+            pass
+        per_turn.append(dict(agent.history_compactor.last_call))
+        # The user reads the answer while the summary is written
+        await agent.history_compactor.drain()
+    return per_turn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--every", type=int, default=5)
+    args = parser.parse_args()
+    agent.llm = FakeLLM()
+    agent.history_compactor.llm = FakeSummarizer()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_turn = asyncio.run(run(args.turns))
+
+    print(f"{'turn':>6}{'before':>10}{'after':>10}{'saved':>8}")
+    for turn, tokens in enumerate(per_turn, 1):
+        if turn % args.every and turn != args.turns:
+            continue
+        before = tokens["prompt_tokens_before"]
+        after = tokens["prompt_tokens_after"]
+        print(
+            f"{turn:>6}{before:>10}{after:>10}{100 * (before - after) / before:>7.0f}%"
+        )
+    print(f"compactor stats {agent.history_compactor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Intent fast path: routing accuracy and per-turn latency with and without it.
+
+1. Routing: a labeled set of messages; reports hits per intent, misses
+   (simple requests left to the model) and false hits (anything routed that
+   should not have been, which must stay at zero).
+2. Latency: a mixed conversation through generate_ai_response_stream_async
+   against local stubs. The fake model sleeps --llm-latency per call and, like
+   the real one, first asks for the tool and then phrases its result.
+
+Usage (from python_backend/):
+    python benchmarks/bench_intent_router.py [--llm-latency 0.8] [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from stub_server import StubServer, point_serpapi_at
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+_tmp = tempfile.TemporaryDirectory()
+os.environ["CHECKPOINT_DB_PATH"] = os.path.join(_tmp.name, "checkpoints.sqlite3")
+os.environ["HISTORY_COMPACTION"] = "false"
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import agent
+from intent_router import IntentRouter
+from services import TripService, TripSnapshot
+
+# (message, expected intent or None)
+LABELED = [
+    ("weather in Tokyo", "weather"),
+    ("What's the weather like in Paris?", "weather"),
+    ("whats the weather in Rome", "weather"),
+    ("Weather forecast for London and Berlin", "weather"),
+    ("Barcelona weather", "weather"),
+    ("How is the weather in Lisbon?", "weather"),
+    ("show my trips", "trips"),
+    ("Can you list all my trips?", "trips"),
+    ("what trips do I have?", "trips"),
+    ("My trips", "trips"),
+    ("weather in Paris next week", None),
+    ("weather in Tokyo and book a hotel", None),
+    ("Is it raining in Tokyo?", None),
+    ("weather there?", None),
+    ("show my trips to Paris", None),
+    ("Plan a trip to Rome from May 3 to May 10", None),
+    ("What should I pack for Tokyo weather in winter?", None),
+    ("Add Florence to my Italy trip", None),
+    ("Best restaurants in Paris", None),
+    ("what's the weather in new york", None),  # lowercase: not a known place
+]
+
+CONVERSATION = [
+    "weather in Tokyo",
+    "Plan a trip to Rome from May 3 to May 10",
+    "show my trips",
+    "Best restaurants in Paris",
+    "What's the weather like in Paris?",
+    "Add Florence to my Italy trip",
+]
+
+
+class FakeLLM:
+    """Slow model that calls the matching tool, then answers."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.oracle = IntentRouter(enabled=True)
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.latency)
+        last = [m for m in messages if not m.type == "system"][-1]
+        if isinstance(last, HumanMessage):
+            intent = self.oracle.match(last.content)
+            if intent is not None:
+                return AIMessage(
+                    content="",
+                    tool_calls=[
+                        {
+                            "name": intent.tool,
+                            "args": dict(intent.args),
+                            "id": f"call_{self.calls}",
+                        }
+                    ],
+                )
+        if isinstance(last, ToolMessage):
+            return AIMessage(content="Here is what I found: " + last.content[:200])
+        return AIMessage(content="Happy to help with that. " * 5)
+
+
+def routing_report():
+    router = IntentRouter(enabled=True)
+    hits = misses = false_hits = 0
+    for text, expected in LABELED:
+        intent = router.match(text)
+        got = intent.name if intent else None
+        if got == expected and got is not None:
+            hits += 1
+        elif expected is not None and got is None:
+            misses += 1
+            print(f"  miss: {text!r}")
+        elif got != expected:
+            false_hits += 1
+            print(f"  FALSE HIT: {text!r} -> {got}")
+    simple = sum(1 for _, expected in LABELED if expected)
+    print(
+        f"routing: {hits}/{simple} simple requests routed, {misses} left to the "
+        f"model, {false_hits} false hits out of {len(LABELED) - simple} others"
+    )
+
+
+async def conversation(user_id, rounds):
+    latencies = []
+    for _ in range(rounds):
+        for text in CONVERSATION:
+            trips = await TripService.afetch_trips(user_id)
+            start = time.perf_counter()
+            async for _ in agent.generate_ai_response_stream_async(
+                text, user_id, trip_snapshot=TripSnapshot(user_id, trips)
+            ):
+                pass
+            latencies.append((text, time.perf_counter() - start))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    routing_report()
+
+    with StubServer(latency=0.05) as stub:
+        os.environ["NEXTJS_API_BASE"] = stub.url
+        point_serpapi_at(stub.url)
+        import services.http_client
+
+        services.http_client.NEXTJS_API_BASE = stub.url
+
+        print(
+            f"\n{len(CONVERSATION) * args.rounds} turns, model call "
+            f"{args.llm_latency:g}s, SerpAPI/Next.js stub 50ms"
+        )
+        print(f"{'router':<10}{'LLM calls':>10}{'avg turn':>10}{'simple turn':>13}")
+        for enabled in (False, True):
+            agent.llm = FakeLLM(args.llm_latency)
+            agent.intent_router = IntentRouter(enabled=enabled)
+            latencies = asyncio.run(conversation(f"bench-{int(enabled)}", args.rounds))
+            simple = [
+                seconds
+                for text, seconds in latencies
+                if IntentRouter(enabled=True).match(text)
+            ]
+            print(
+                f"{'on' if enabled else 'off':<10}{agent.llm.calls:>10}"
+                f"{statistics.mean(s for _, s in latencies):>9.2f}s"
+                f"{statistics.mean(simple):>12.2f}s"
+            )
+        print(f"router stats {agent.intent_router.stats()}")
+
+
+if __name__ == "__main__":
+    main()
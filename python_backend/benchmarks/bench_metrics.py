@@ -0,0 +1,76 @@
+"""
+Cost of recording metrics on the request path and of rendering /metrics.
+
+Times Histogram.observe() from one thread and from several at once (tool
+calls record from pool threads), the track_upstream context manager, and a
+full render() with label sets typical of a busy worker.
+
+Usage (from python_backend/):
+    python benchmarks/bench_metrics.py [--calls 200000] [--threads 8]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stub_server  # noqa: F401  (puts the backend on sys.path)
+
+import metrics
+
+TOOLS = ["search_places", "search_weather", "create_trip", "get_trip_details"]
+
+
+def observe_loop(calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        metrics.TOOL_CALL_SECONDS.observe(0.3, TOOLS[i % 4], "ok")
+    return time.perf_counter() - start
+
+
+def track_loop(calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        with metrics.track_upstream("serpapi"):
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    elapsed = observe_loop(args.calls)
+    print(f"observe, 1 thread       {elapsed / args.calls * 1e9:8.0f} ns/call")
+
+    per_thread = args.calls // args.threads
+    with ThreadPoolExecutor(args.threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(observe_loop, [per_thread] * args.threads))
+        elapsed = time.perf_counter() - start
+    print(
+        f"observe, {args.threads} threads "
+        f"{elapsed / (per_thread * args.threads) * 1e9:8.0f} ns/call (wall)"
+    )
+
+    elapsed = track_loop(args.calls)
+    print(f"track_upstream          {elapsed / args.calls * 1e9:8.0f} ns/call")
+
+    for node in ("chat", "tools"):
+        metrics.GRAPH_NODE_SECONDS.observe(1.0, node)
+    for upstream in ("nextjs", "serpapi", "nominatim"):
+        metrics.UPSTREAM_SECONDS.observe(0.2, upstream, "error")
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        text = metrics.render()
+    elapsed = (time.perf_counter() - start) / runs
+    print(
+        f"render                  {elapsed * 1e3:8.2f} ms "
+        f"({len(text.splitlines())} lines, {len(text) / 1e3:.1f} KB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Route optimizer: pure-Python nearest neighbour + 2-opt vs the NumPy version.
+
+Both run nearest neighbour + 2-opt on the same random stops (first stop
+fixed, open route); they apply 2-opt moves in a different order, so the
+final distances differ a little. The Python baseline computes the haversine matrix and scans
+2-opt moves with nested loops, which is what this would look like without
+NumPy; route_optimizer builds the matrix with broadcasting and scores every
+segment end of a 2-opt move in one vectorized expression.
+
+Usage (from python_backend/):
+    python benchmarks/bench_route_optimizer.py [--stops 50 100 300] [--runs 3]
+"""
+
+import argparse
+import math
+import random
+import time
+
+import stub_server  # noqa: F401  (puts the backend on sys.path)
+
+from route_optimizer import EARTH_RADIUS_KM, optimize_route
+
+
+def python_matrix(stops):
+    rad = [(math.radians(s["lat"]), math.radians(s["lng"])) for s in stops]
+    dist = [[0.0] * len(stops) for _ in stops]
+    for i, (lat1, lng1) in enumerate(rad):
+        for j, (lat2, lng2) in enumerate(rad):
+            a = (
+                math.sin((lat2 - lat1) / 2) ** 2
+                + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+            )
+            dist[i][j] = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+    return dist
+
+
+def python_route(stops):
+    """The same heuristic with plain lists and loops."""
+    dist = python_matrix(stops)
+    n = len(stops)
+    order, left = [0], set(range(1, n))
+    while left:
+        nxt = min(left, key=lambda k: dist[order[-1]][k])
+        order.append(nxt)
+        left.remove(nxt)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                after = dist[order[j]][order[j + 1]] if j + 1 < n else 0.0
+                new_after = dist[order[i]][order[j + 1]] if j + 1 < n else 0.0
+                gain = (
+                    dist[order[i - 1]][order[i]]
+                    + after
+                    - dist[order[i - 1]][order[j]]
+                    - new_after
+                )
+                if gain > 1e-9:
+                    order[i : j + 1] = order[i : j + 1][::-1]
+                    improved = True
+    return sum(dist[a][b] for a, b in zip(order, order[1:]))
+
+
+def make_stops(count: int, seed: int = 7) -> list:
+    """Stops scattered over Western Europe."""
+    rng = random.Random(seed)
+    return [
+        {"name": f"Stop {i}", "lat": rng.uniform(36, 55), "lng": rng.uniform(-9, 15)}
+        for i in range(count)
+    ]
+
+
+def best_ms(fn, arg, runs):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stops", type=int, nargs="+", default=[50, 100, 300])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'stops':>6}{'python ms':>11}{'numpy ms':>10}{'speedup':>9}", end="")
+    print(f"{'input km':>10}{'python km':>11}{'numpy km':>10}")
+    for count in args.stops:
+        stops = make_stops(count)
+        py_ms, py_km = best_ms(python_route, stops, args.runs)
+        np_ms, route = best_ms(optimize_route, stops, args.runs)
+        print(
+            f"{count:>6}{py_ms:>11.1f}{np_ms:>10.1f}{py_ms / np_ms:>8.0f}x"
+            f"{route['original_km']:>10.0f}{py_km:>11.0f}{route['total_km']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+SerpAPI search tools with and without the persistent search cache.
+
+Calls search_places, search_trip_planning and get_travel_recommendations
+with queries drawn from a skewed (Zipf-like) distribution, as many users
+asking about the same popular destinations would. The local stub answers
+with full-size SerpAPI payloads after --latency seconds.
+
+Reports SerpAPI calls, mean tool latency, hit rate and bytes stored per
+entry vs the full payload, then expires every entry and times a warm-up.
+
+Usage (from python_backend/):
+    python benchmarks/bench_search_cache.py [--calls 150] [--latency 0.2]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from stub_server import StubServer, point_serpapi_at
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import agent
+import trip_tools
+from search_cache import SearchCache
+from services import TripSnapshot, use_trip_snapshot
+
+DESTINATIONS = [
+    "Paris",
+    "Rome",
+    "Tokyo",
+    "Barcelona",
+    "London",
+    "New York",
+    "Lisbon",
+    "Kyoto",
+    "Prague",
+    "Istanbul",
+    "Bali",
+    "Reykjavik",
+    "Marrakech",
+    "Cape Town",
+    "Hanoi",
+]
+TRIP_TYPES = ["romantic", "cultural", "adventure", "family"]
+
+
+def workload(calls, seed=7):
+    """(tool, args) pairs; destination popularity follows 1/rank."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(DESTINATIONS))]
+    jobs = []
+    for _ in range(calls):
+        city = rng.choices(DESTINATIONS, weights)[0]
+        kind = rng.randrange(3)
+        if kind == 0:
+            jobs.append((agent.search_places, {"query": f"things to do in {city}"}))
+        elif kind == 1:
+            jobs.append(
+                (
+                    agent.search_trip_planning,
+                    {
+                        "destination": city,
+                        "start_date": "2026-06-01",
+                        "end_date": "2026-06-08",
+                    },
+                )
+            )
+        else:
+            jobs.append(
+                (
+                    trip_tools.get_travel_recommendations,
+                    {
+                        "user_id": "bench",
+                        "destination": city,
+                        "trip_type": rng.choice(TRIP_TYPES),
+                    },
+                )
+            )
+    return jobs
+
+
+def run(jobs, cache, stub):
+    agent.search_cache = trip_tools.search_cache = cache
+    before = stub.request_count
+    latencies = []
+    with use_trip_snapshot(TripSnapshot("bench", trips=[])):
+        for tool, args in jobs:
+            start = time.perf_counter()
+            tool.invoke(args)
+            latencies.append(time.perf_counter() - start)
+    return stub.request_count - before, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=150)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    jobs = workload(args.calls)
+    with StubServer(latency=args.latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        point_serpapi_at(stub.url)
+        print(
+            f"{args.calls} tool calls over {len(DESTINATIONS)} destinations, "
+            f"SerpAPI stub {args.latency * 1000:g}ms"
+        )
+        print(f"{'cache':<8}{'SerpAPI calls':>14}{'mean ms':>9}{'p50 ms':>8}")
+        for enabled in (False, True):
+            cache = SearchCache(os.path.join(tmp, "search.sqlite3"), enabled=enabled)
+            calls, latencies = run(jobs, cache, stub)
+            print(
+                f"{'on' if enabled else 'off':<8}{calls:>14}"
+                f"{statistics.mean(latencies) * 1000:>9.1f}"
+                f"{statistics.median(latencies) * 1000:>8.1f}"
+            )
+
+        stats = cache.stats()
+        stored = stats["payload_bytes"] / max(stats["entries"], 1)
+        full = (stats["bytes_saved_by_projection"] + stats["payload_bytes"]) / max(
+            stats["entries"], 1
+        )
+        print(
+            f"hit rate {stats['hit_rate']:.0%}, {stats['entries']} entries, "
+            f"{stored:.0f} B stored per entry vs {full:.0f} B full payload"
+        )
+
+        # Simulate a restart after every entry expired
+        cache._connection().execute("UPDATE searches SET expires_at = 0")
+        start = time.perf_counter()
+        refreshed = cache.warm(limit=10)
+        print(
+            f"warm-up: refreshed the {refreshed} most requested entries in "
+            f"{time.perf_counter() - start:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
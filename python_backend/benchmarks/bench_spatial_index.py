@@ -0,0 +1,178 @@
+"""
+"Near X" queries over a user's trip locations: scanning every trip vs the
+grid index in spatial_index.
+
+- scan: loop over every trip location with math.haversine (what a tool would
+  do with the trips from /api/ai/trips)
+- numpy: one vectorized distance computation over all points
+- grid: UserSpatialIndex (only the grid cells around the query)
+
+Reports microseconds per query for a 200 km radius query and for the 5
+nearest locations, plus the cost of building the index and of adding one
+location to it.
+
+Usage (from python_backend/):
+    python benchmarks/bench_spatial_index.py [--points 1000 5000 20000]
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+import stub_server  # noqa: F401  (puts the backend on sys.path)
+
+from route_optimizer import EARTH_RADIUS_KM
+from spatial_index import UserSpatialIndex
+
+# Trips cluster around cities people travel to
+CITIES = [
+    (38.72, -9.14),
+    (48.86, 2.35),
+    (41.90, 12.50),
+    (40.42, -3.70),
+    (51.51, -0.13),
+    (35.68, 139.69),
+    (40.71, -74.01),
+    (-33.87, 151.21),
+    (-22.91, -43.17),
+    (13.76, 100.50),
+]
+
+
+def make_trips(points: int, per_trip: int = 8, seed: int = 5) -> list:
+    rng = random.Random(seed)
+    trips = []
+    for t in range(points // per_trip):
+        lat, lng = rng.choice(CITIES)
+        trips.append(
+            {
+                "id": f"trip-{t}",
+                "title": f"Trip {t}",
+                "locations": [
+                    {
+                        "name": f"Stop {t}-{s}",
+                        "lat": lat + rng.gauss(0, 2),
+                        "lng": lng + rng.gauss(0, 2),
+                    }
+                    for s in range(per_trip)
+                ],
+            }
+        )
+    return trips
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def scan(trips, lat, lng, radius_km=None, k=5):
+    found = sorted(
+        (haversine_km(lat, lng, loc["lat"], loc["lng"]), loc["name"])
+        for trip in trips
+        for loc in trip["locations"]
+    )
+    if radius_km is None:
+        return found[:k]
+    return [item for item in found if item[0] <= radius_km]
+
+
+class BruteForce:
+    def __init__(self, trips):
+        locations = [loc for trip in trips for loc in trip["locations"]]
+        self.names = [loc["name"] for loc in locations]
+        self.lat = np.radians([loc["lat"] for loc in locations])
+        self.lng = np.radians([loc["lng"] for loc in locations])
+
+    def query(self, lat, lng, radius_km=None, k=5):
+        lat, lng = math.radians(lat), math.radians(lng)
+        a = (
+            np.sin((self.lat - lat) / 2) ** 2
+            + math.cos(lat) * np.cos(self.lat) * np.sin((self.lng - lng) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+        if radius_km is None:
+            picked = np.argpartition(distances, k)[:k]
+        else:
+            picked = np.flatnonzero(distances <= radius_km)
+        picked = picked[np.argsort(distances[picked])]
+        return [(distances[i], self.names[i]) for i in picked]
+
+
+def per_query_us(fn, queries):
+    start = time.perf_counter()
+    for lat, lng in queries:
+        fn(lat, lng)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--radius", type=float, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    queries = [
+        (lat + rng.gauss(0, 3), lng + rng.gauss(0, 3))
+        for lat, lng in (rng.choice(CITIES) for _ in range(args.queries))
+    ]
+    radius = args.radius
+
+    print(f"us per query ({args.queries} queries around the same cities)")
+    print(
+        f"{'points':>7}  {'query':<10}{'scan':>9}{'numpy':>9}{'grid':>9}"
+        f"{'build ms':>10}{'add us':>8}"
+    )
+    for count in args.points:
+        trips = make_trips(count)
+        brute = BruteForce(trips)
+
+        start = time.perf_counter()
+        index = UserSpatialIndex()
+        index.add_trips(trips)
+        build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        index.add_many([{"name": "New stop", "lat": 45.0, "lng": 7.0}])
+        add_us = (time.perf_counter() - start) * 1e6
+
+        # Same answers from all three
+        lat, lng = queries[0]
+        expected = [name for _, name in brute.query(lat, lng, radius)]
+        assert [loc.name for loc, _ in index.within(lat, lng, radius)] == expected
+        expected = [name for _, name in scan(trips, lat, lng, k=5)]
+        assert [loc.name for loc, _ in index.nearest(lat, lng, 5)] == expected
+
+        scan_queries = queries[: max(10, len(queries) * 1000 // count // 10)]
+        for label, scan_fn, brute_fn, grid_fn in (
+            (
+                f"{radius:g} km",
+                lambda la, ln: scan(trips, la, ln, radius),
+                lambda la, ln: brute.query(la, ln, radius),
+                lambda la, ln: index.within(la, ln, radius),
+            ),
+            (
+                "5 nearest",
+                lambda la, ln: scan(trips, la, ln, k=5),
+                lambda la, ln: brute.query(la, ln, k=5),
+                lambda la, ln: index.nearest(la, ln, 5),
+            ),
+        ):
+            print(
+                f"{count:>7}  {label:<10}{per_query_us(scan_fn, scan_queries):>9.0f}"
+                f"{per_query_us(brute_fn, queries):>9.0f}"
+                f"{per_query_us(grid_fn, queries):>9.0f}"
+                f"{build_ms:>10.1f}{add_us:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
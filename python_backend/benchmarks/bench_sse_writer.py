@@ -0,0 +1,165 @@
+"""
+/chat-trip framing: one SSE frame per token (the old path) vs the coalescing
+SSEWriter.
+
+The server runs in a child process with the agent replaced by a fake token
+source (fixed inter-token interval) and Next.js by the local stub server.
+The parent streams responses over HTTP and reports frames/s, bytes and the
+server's CPU time per response (read from the child before and after), plus
+time to first token.
+
+Usage (from python_backend/):
+    python benchmarks/bench_sse_writer.py [--tokens 600] [--interval 0.002]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class PerTokenWriter:
+    """The framing /chat-trip used before SSEWriter: one frame per token."""
+
+    async def stream(self, tokens):
+        async for token in tokens:
+            if token:
+                yield f"data: {json.dumps({'ai_response': token})}\n\n"
+
+    def stats(self):
+        return {}
+
+
+def serve(mode, port, tokens, interval):
+    from stub_server import StubServer
+
+    stub = StubServer(latency=0).__enter__()
+    os.environ["NEXTJS_API_BASE"] = stub.url
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # The agent is faked; do not load the real one alongside
+    os.environ["AGENT_WARMUP"] = "lazy"
+
+    import uvicorn
+    import setup
+
+    async def fake_tokens(user_input, user_id, **kwargs):
+        for i in range(tokens):
+            await asyncio.sleep(interval)
+            yield f" tok{i}"
+
+    setup.generate_ai_response_stream_async = fake_tokens
+    if mode == "per-token":
+        setup.sse_writer = PerTokenWriter()
+
+    @setup.app.get("/__cpu")
+    async def cpu():
+        return {"cpu": time.process_time()}
+
+    uvicorn.run(setup.app, host="127.0.0.1", port=port, log_level="error")
+
+
+async def stream_once(client, base_url):
+    start = time.perf_counter()
+    first = None
+    frames = 0
+    size = 0
+    tail = b""
+    async with client.stream(
+        "POST",
+        f"{base_url}/chat-trip",
+        json={"user_input": "Plan a trip to Paris", "user_id": "bench"},
+    ) as response:
+        async for chunk in response.aiter_raw():
+            size += len(chunk)
+            if first is None:
+                first = time.perf_counter() - start
+            # A frame header may be split across chunks; 5 bytes of tail
+            # can finish it but never hold a whole one
+            text = tail + chunk
+            frames += text.count(b"data: ")
+            tail = text[-5:]
+    return first, frames, size
+
+
+async def measure(base_url, streams, concurrency):
+    import httpx
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        for _ in range(100):
+            try:
+                await client.get(f"{base_url}/health")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        cpu_before = (await client.get(f"{base_url}/__cpu")).json()["cpu"]
+        start = time.perf_counter()
+        results = []
+        for _ in range(streams // concurrency):
+            results += await asyncio.gather(
+                *(stream_once(client, base_url) for _ in range(concurrency))
+            )
+        wall = time.perf_counter() - start
+        cpu_after = (await client.get(f"{base_url}/__cpu")).json()["cpu"]
+    return results, wall, cpu_after - cpu_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=600)
+    parser.add_argument("--interval", type=float, default=0.002)
+    parser.add_argument("--streams", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--serve", choices=["per-token", "coalesced"])
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.tokens, args.interval)
+        return
+
+    print(
+        f"{args.streams} responses x {args.tokens} tokens every "
+        f"{args.interval * 1000:g}ms, {args.concurrency} concurrent"
+    )
+    print(
+        f"{'mode':<12}{'frames/resp':>12}{'frames/s':>10}{'KB/resp':>9}"
+        f"{'CPU ms/resp':>13}{'TTFT p50':>10}"
+    )
+    for mode in ("per-token", "coalesced"):
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, __file__, "--serve", mode, "--port", str(port)]
+            + ["--tokens", str(args.tokens), "--interval", str(args.interval)]
+        )
+        try:
+            results, wall, cpu = asyncio.run(
+                measure(f"http://127.0.0.1:{port}", args.streams, args.concurrency)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        count = len(results)
+        frames = sum(r[1] for r in results) / count
+        size = sum(r[2] for r in results) / count / 1000
+        ttft = statistics.median(r[0] for r in results) * 1000
+        print(
+            f"{mode:<12}{frames:>12.0f}{frames * count / wall:>10.0f}{size:>9.1f}"
+            f"{cpu / count * 1000:>13.1f}{ttft:>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Cold-start cost of the API: import time of `setup` and time until /health
+answers, plus how long the deferred agent load takes.
+
+Each measurement runs in a fresh interpreter. Import times come from
+`python -X importtime`; the script fails (exit code 1) if `import setup`
+pulls in one of HEAVY_MODULES or takes longer than --max-import-ms, so it can
+be used as a regression check.
+
+Usage (from python_backend/):
+    python benchmarks/bench_startup.py [--runs 5] [--max-import-ms 1000]
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when the agent is loaded
+HEAVY_MODULES = (
+    "langchain_openai",
+    "langgraph",
+    "langchain",
+    "openai",
+    "geopy",
+    "numpy",
+)
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def import_profile(module: str) -> dict:
+    """Cumulative import time (us) per module for `import <module>`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            profile[match.group(4)] = int(match.group(2))
+    return profile
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_health(warmup: str) -> tuple:
+    """Seconds from process start to the first /health answer, and to "ready"."""
+    port = free_port()
+    env = _env()
+    env["AGENT_WARMUP"] = warmup
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "setup:app", "--port", str(port)]
+        + ["--log-level", "error"],
+        cwd=BACKEND,
+        env=env,
+    )
+    healthy = ready = None
+    try:
+        with httpx.Client(timeout=5) as client:
+            while time.perf_counter() - start < 60:
+                try:
+                    body = client.get(f"http://127.0.0.1:{port}/health").json()
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                if healthy is None:
+                    healthy = time.perf_counter() - start
+                if body.get("agent") in ("ready", "failed") or warmup == "lazy":
+                    ready = time.perf_counter() - start
+                    break
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+    return healthy, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=1000)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    setup_ms, agent_ms, profiles = [], [], []
+    for _ in range(args.runs):
+        profile = import_profile("setup")
+        profiles.append(profile)
+        setup_ms.append(profile["setup"] / 1000)
+        agent_ms.append(import_profile("agent")["agent"] / 1000)
+
+    print(f"import setup   p50 {statistics.median(setup_ms):7.0f} ms")
+    print(f"import agent   p50 {statistics.median(agent_ms):7.0f} ms  (deferred)")
+    print("heaviest imports under setup (cumulative ms, last run):")
+    ranked = sorted(profiles[-1].items(), key=lambda kv: -kv[1])
+    for name, us in [kv for kv in ranked if kv[0] != "setup"][: args.top]:
+        print(f"  {name:<40}{us / 1000:7.0f}")
+
+    for warmup in ("lazy", "background", "startup"):
+        healthy, ready = time_to_health(warmup)
+        line = f"/health AGENT_WARMUP={warmup:<11}{healthy * 1000:7.0f} ms"
+        if warmup != "lazy" and ready is not None:
+            line += f"   agent ready {ready * 1000:7.0f} ms"
+        print(line)
+
+    failures = []
+    leaked = sorted({name.split(".")[0] for name in profiles[-1]} & set(HEAVY_MODULES))
+    if leaked:
+        failures.append(f"`import setup` loads {', '.join(leaked)}")
+    if statistics.median(setup_ms) > args.max_import_ms:
+        failures.append(f"`import setup` slower than {args.max_import_ms:g} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Streaming throughput of /chat-trip with the old per-token prints vs the
+structured, queue-backed logging (at INFO, and at DEBUG with per-token
+records enabled).
+
+Each mode runs in its own process. The chat model is a fake that streams a
+fixed reply word by word, Next.js is the local stub server, and the app's
+output goes to a pipe read by the parent, as under a process manager or
+container runtime. "print" replays
+what the old code wrote for every token (an EVENT line, YIELDING TOKEN and
+STREAMING TOKEN) synchronously on the streaming path.
+
+Usage (from python_backend/):
+    python benchmarks/bench_stream_logging.py [--tokens 2000] [--runs 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    "print": "INFO",
+    "logging (INFO)": "INFO",
+    "logging (DEBUG)": "DEBUG",
+}
+
+
+def run_mode(mode, tokens, runs):
+    from itertools import cycle
+    from stub_server import StubServer
+
+    with StubServer(latency=0) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["NEXTJS_API_BASE"] = stub.url
+        os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmp, "checkpoints.sqlite3")
+        os.environ["HISTORY_COMPACTION"] = "false"
+        os.environ["LOG_LEVEL"] = MODES[mode]
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+
+        from langchain_core.language_models.fake_chat_models import (
+            GenericFakeChatModel,
+        )
+        from langchain_core.messages import AIMessage
+
+        import agent
+        import setup
+        from app_logging import shutdown_logging
+        from models import ChatRequest
+
+        reply = AIMessage(content=" ".join(f"tok{i}" for i in range(tokens)))
+        agent.llm = GenericFakeChatModel(messages=cycle([reply]))
+
+        if mode == "print":
+            stream = setup.generate_ai_response_stream_async
+
+            async def printing_stream(*args, **kwargs):
+                async for token in stream(*args, **kwargs):
+                    print(f"\nEVENT: on_chat_model_stream")
+                    print(f"YIELDING TOKEN: '{token}'")
+                    print(f"STREAMING TOKEN: '{token}'")
+                    yield token
+
+            setup.generate_ai_response_stream_async = printing_stream
+
+        async def consume(run):
+            response = await setup.chat_trip(
+                ChatRequest(user_input="Plan a trip to Paris", user_id=f"user-{run}")
+            )
+            # Frames carry several tokens; count what the writer consumed
+            before = setup.sse_writer.stats()["tokens"]
+            async for _ in response.body_iterator:
+                pass
+            return setup.sse_writer.stats()["tokens"] - before
+
+        streamed = 0
+        elapsed = 0.0
+        for run in range(runs):
+            start = time.perf_counter()
+            streamed += asyncio.run(consume(run))
+            elapsed += time.perf_counter() - start
+        shutdown_logging()
+    return streamed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # Child process: app output to stdout (a file), result on stderr
+        streamed, elapsed = run_mode(args.mode, args.tokens, args.runs)
+        print(json.dumps({"tokens": streamed, "seconds": elapsed}), file=sys.stderr)
+        return
+
+    print(f"{args.runs} streams x {args.tokens} tokens, output to a pipe")
+    print(f"{'mode':<18}{'tokens/s':>10}{'log KB':>9}")
+    for mode in MODES:
+        child = subprocess.run(
+            [sys.executable, __file__, "--mode", mode]
+            + ["--tokens", str(args.tokens), "--runs", str(args.runs)],
+            capture_output=True,
+            check=True,
+        )
+        size = len(child.stdout) / 1e3
+        result = json.loads(child.stderr.decode().strip().splitlines()[-1])
+        rate = result["tokens"] / result["seconds"]
+        print(f"{mode:<18}{rate:>10.0f}{size:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Sequential vs parallel execution of one multi-tool model turn in CustomToolNode.
+
+The tools are stubs that sleep for a fixed time (standing in for SerpAPI and
+Next.js calls), so the difference is purely how the node schedules them. A
+turn with create_trip in the middle checks that reads issued after it wait for
+it in both modes. The
+last scenario adds a tool that hangs and checks that it comes back as a
+timeout ToolMessage (and is counted in agent_tool_timeouts_total) while the
+other calls of the turn still return their results; a lone call to it times
+out too, with and without TOOL_PARALLEL.
+
+Usage (from python_backend/):
+    python benchmarks/bench_tool_node.py [--runs 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+
+import stub_server  # noqa: F401  (puts the backend on sys.path)
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from agent import CustomToolNode
+from metrics import TOOL_TIMEOUTS
+
+# (event, query) in the order the stub tools start and finish
+EVENTS = []
+
+
+def sleeping_tool(name: str, seconds: float):
+    @tool(name)
+    def stub(query: str, user_id: str = "") -> str:
+        """Stub tool that sleeps to simulate an upstream call."""
+        EVENTS.append(("start", query))
+        time.sleep(seconds)
+        EVENTS.append(("end", query))
+        return f"{name}: {query}"
+
+    return stub
+
+
+# Latencies roughly matching what the real tools spend upstream
+TOOLS = [
+    sleeping_tool("search_places", 0.8),
+    sleeping_tool("search_weather", 0.6),
+    sleeping_tool("search_trip_planning", 1.0),
+    sleeping_tool("slow_tool", 30),
+    sleeping_tool("create_trip", 0.3),
+]
+
+TURN = ["search_places", "search_weather", "search_weather", "search_trip_planning"]
+
+
+def make_state(tool_names):
+    calls = [
+        {"name": name, "args": {"query": f"q{i}"}, "id": f"call_{i}"}
+        for i, name in enumerate(tool_names)
+    ]
+    return {
+        "messages": [AIMessage(content="", tool_calls=calls)],
+        "user_id": "bench-user",
+        "trip_snapshot": None,
+    }
+
+
+def run_turn(node, tool_names):
+    state = make_state(tool_names)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = node(state)
+    elapsed = time.perf_counter() - start
+    ids = [message.tool_call_id for message in result["messages"]]
+    assert ids == [call["id"] for call in state["messages"][-1].tool_calls]
+    return elapsed, result["messages"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    sequential = CustomToolNode(TOOLS, parallel=False)
+    parallel = CustomToolNode(TOOLS, parallel=True)
+
+    seq = [run_turn(sequential, TURN)[0] for _ in range(args.runs)]
+    par = [run_turn(parallel, TURN)[0] for _ in range(args.runs)]
+
+    # search_weather (q2) is issued after create_trip (q1): it must not start
+    # before create_trip ends, in either mode
+    for node in (sequential, parallel):
+        EVENTS.clear()
+        run_turn(node, ["search_places", "create_trip", "search_weather"])
+        assert EVENTS.index(("end", "q1")) < EVENTS.index(("start", "q2")), EVENTS
+        assert EVENTS.index(("end", "q0")) < EVENTS.index(("start", "q1")), EVENTS
+
+    timeout_node = CustomToolNode(TOOLS, parallel=True, timeouts={"slow_tool": 1.5})
+    timeouts_before = TOOL_TIMEOUTS.samples()
+    elapsed, messages = run_turn(timeout_node, TURN + ["slow_tool"])
+    assert messages[-1].content == "Error: slow_tool timed out after 1.5s", messages[
+        -1
+    ].content
+    assert all(not m.content.startswith("Error") for m in messages[:-1])
+    assert TOOL_TIMEOUTS.samples() != timeouts_before
+
+    # A single call, and every call in sequential mode, has a timeout too
+    for flag in (True, False):
+        node = CustomToolNode(TOOLS, parallel=flag, timeouts={"slow_tool": 0.5})
+        _, (message,) = run_turn(node, ["slow_tool"])
+        assert message.content == "Error: slow_tool timed out after 0.5s", flag
+
+    seq_median = statistics.median(seq)
+    par_median = statistics.median(par)
+    print(f"turn={TURN} runs={args.runs}")
+    print(f"sequential  median={seq_median:.3f}s")
+    print(
+        f"parallel    median={par_median:.3f}s  speedup={seq_median / par_median:.1f}x"
+    )
+    print(f"timeout     {elapsed:.3f}s  slow_tool -> {messages[-1].content!r}")
+    print("tool messages returned in tool_call_id order: ok")
+    print("calls after create_trip wait for it: ok")
+    print("lone and sequential calls time out: ok")
+    os._exit(0)  # Don't wait for the abandoned slow_tool thread
+
+
+if __name__ == "__main__":
+    main()
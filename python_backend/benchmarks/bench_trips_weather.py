@@ -0,0 +1,87 @@
+"""
+Weather for many trips: one search_weather call per trip vs one batch.
+
+A user's trips often share cities ("Paris" in three of them, spelled
+differently). The per-trip path runs one fan-out per trip, one after the
+other; search_trips_weather normalizes and dedupes locations across all
+trips and fetches each once in a single fan-out.
+
+Reported with the weather cache cold and with it disabled (TTL 0), since
+with the cache on, repeats within its TTL are already hits.
+
+Usage (from python_backend/):
+    python benchmarks/bench_trips_weather.py [--trips 6] [--latency 0.3]
+"""
+
+import argparse
+import random
+import time
+
+from stub_server import StubServer, point_serpapi_at
+
+import search_weather
+from weather_cache import WeatherCache
+
+CITIES = ["Paris", "Rome", "Barcelona", "London", "Lisbon", "Tokyo", "Kyoto"]
+SPELLINGS = [str, str.lower, str.upper, lambda city: f" {city}  "]
+
+
+def make_trips(count: int, stops: int, seed: int = 3) -> list:
+    """Trips of `stops` locations drawn from a few popular cities."""
+    rng = random.Random(seed)
+    return [
+        {
+            "trip_id": f"trip-{i}",
+            "locations": [
+                rng.choice(SPELLINGS)(city) for city in rng.sample(CITIES, stops)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def per_trip(trips):
+    return [search_weather.search_weather(trip["locations"]) for trip in trips]
+
+
+def batch(trips):
+    return search_weather.search_trips_weather(trips)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trips", type=int, default=6)
+    parser.add_argument("--stops", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    trips = make_trips(args.trips, args.stops)
+    with StubServer(latency=args.latency) as stub:
+        point_serpapi_at(stub.url)
+        print(
+            f"{args.trips} trips x {args.stops} stops over {len(CITIES)} cities, "
+            f"SerpAPI stub {args.latency * 1000:g}ms"
+        )
+        print(f"{'weather cache':<15}{'path':<10}{'SerpAPI calls':>14}{'seconds':>9}")
+        for label, ttl in (("cold", None), ("off", 0)):
+            for name, fn in (("per-trip", per_trip), ("batch", batch)):
+                search_weather.weather_cache = (
+                    WeatherCache() if ttl is None else WeatherCache(ttl=0, stale_ttl=0)
+                )
+                before = stub.request_count
+                start = time.perf_counter()
+                result = fn(trips)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{label:<15}{name:<10}{stub.request_count - before:>14}"
+                    f"{elapsed:>9.2f}"
+                )
+        print(
+            f"batch: {result.requested_locations} locations requested, "
+            f"{result.unique_locations} unique, "
+            f"{result.upstream_calls_saved} upstream calls saved"
+        )
+
+
+if __name__ == "__main__":
+    main()
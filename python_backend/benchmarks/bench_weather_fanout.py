@@ -0,0 +1,96 @@
+"""
+Sequential vs concurrent latency of search_weather against a local stub.
+
+The weather cache is cleared before every run, so each one fetches every
+stop from the stub.
+
+Usage (from python_backend/):
+    python benchmarks/bench_weather_fanout.py [--stops 8] [--latency 0.3]
+"""
+
+import argparse
+import statistics
+import time
+
+from stub_server import StubServer, point_serpapi_at
+
+from weather_cache import weather_cache
+
+CITIES = [
+    "Paris",
+    "Rome",
+    "Milan",
+    "Florence",
+    "Venice",
+    "Naples",
+    "Barcelona",
+    "Madrid",
+    "Lisbon",
+    "Porto",
+    "Berlin",
+    "Prague",
+    "Vienna",
+    "Amsterdam",
+    "London",
+    "Dublin",
+]
+
+
+def time_call(fn, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        weather_cache.invalidate()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stops", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    locations = (CITIES * (args.stops // len(CITIES) + 1))[: args.stops]
+
+    with StubServer(
+        latency=args.latency, slow_queries=["Dublin"], slow_latency=10
+    ) as stub:
+        point_serpapi_at(stub.url)
+        from search_weather import search_weather
+
+        before = stub.request_count
+        sequential = time_call(
+            lambda: search_weather(locations, max_workers=1, deadline=60), args.runs
+        )
+        concurrent = time_call(lambda: search_weather(locations), args.runs)
+        # Cache hits would make both modes look instant
+        unique = len(set(locations))
+        assert stub.request_count - before == 2 * args.runs * unique, (
+            stub.request_count - before
+        )
+
+        # One stop that never answers in time: the rest still come back
+        partial_locations = locations[:-1] + ["Dublin"]
+        weather_cache.invalidate()
+        start = time.perf_counter()
+        partial = search_weather(partial_locations, deadline=2 * args.latency + 0.5)
+        partial_elapsed = time.perf_counter() - start
+
+    seq_median = statistics.median(sequential)
+    con_median = statistics.median(concurrent)
+    print(f"stops={args.stops} upstream_latency={args.latency:.2f}s runs={args.runs}")
+    print(f"sequential  median={seq_median:.3f}s")
+    print(
+        f"concurrent  median={con_median:.3f}s  speedup={seq_median / con_median:.1f}x"
+    )
+    print(
+        f"deadline    {partial_elapsed:.3f}s  returned={len(partial.locations)} "
+        f"timed_out={partial.timed_out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
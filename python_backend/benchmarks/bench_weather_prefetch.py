@@ -0,0 +1,183 @@
+"""
+Weather prefetch for upcoming trips: what a user waits for when opening a
+trip, with and without a prefetch job having run.
+
+1. Two "workers" (prefetchers sharing one SQLite file) tick at the same
+   time; only one may run the job.
+2. The job's SerpAPI calls are paced by the rate budget while interactive
+   lookups run next to it.
+3. /trips-weather-style lookups of the upcoming trips, cold vs prefetched,
+   and on a second worker that only imported the job's results.
+4. A prefetch refresh and a user lookup of the same location at once share
+   one SerpAPI request.
+5. A job that outlasts its interval keeps the lease: a second worker ticking
+   meanwhile does not run the job again, and takes it once the job ends.
+
+Usage (from python_backend/):
+    python benchmarks/bench_weather_prefetch.py [--users 5] [--latency 0.3]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from stub_server import StubServer, point_serpapi_at
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import services.http_client
+import search_weather
+from weather_cache import weather_cache
+from weather_prefetch import WeatherPrefetcher
+
+CITIES = ["Paris", "Rome", "Lisbon", "Kyoto", "Prague", "Oslo", "Seville", "Porto"]
+
+
+def make_trips():
+    """Two upcoming trips and one far in the future, over shared cities."""
+    today = date.today()
+
+    def trip(i, start_in, cities):
+        start = today + timedelta(days=start_in)
+        return {
+            "id": f"trip-{i}",
+            "title": f"Trip {i}",
+            "description": "",
+            "startDate": f"{start.isoformat()}T00:00:00.000Z",
+            "endDate": f"{(start + timedelta(days=6)).isoformat()}T00:00:00.000Z",
+            "locations": [{"name": name} for name in cities],
+        }
+
+    return [
+        trip(0, 3, CITIES[:3]),
+        trip(1, 10, CITIES[2:6]),
+        trip(2, 90, CITIES[6:]),
+    ]
+
+
+def open_trips(trips):
+    """What the trip pages wait for: weather of every upcoming trip."""
+    start = time.perf_counter()
+    search_weather.search_trips_weather(
+        [{"locations": [loc["name"] for loc in t["locations"]]} for t in trips[:2]]
+    )
+    return time.perf_counter() - start
+
+
+async def main_async(args):
+    trips = make_trips()
+    with StubServer(
+        latency=args.latency, trips=trips
+    ) as stub, tempfile.TemporaryDirectory() as tmp:
+        point_serpapi_at(stub.url)
+        services.http_client.NEXTJS_API_BASE = stub.url
+        path = os.path.join(tmp, "prefetch.sqlite3")
+        workers = [
+            WeatherPrefetcher(
+                path, calls_per_minute=args.calls_per_minute, enabled=True
+            )
+            for _ in range(2)
+        ]
+        workers[1].holder += "-b"
+        for i in range(args.users):
+            workers[i % 2].note_user(f"user-{i}")
+
+        cold = open_trips(trips)
+        weather_cache.invalidate()
+
+        # 1 + 2: both workers tick at once while interactive lookups run
+        before = stub.request_count
+        interactive = []
+
+        async def interactive_lookups():
+            for city in ["Berlin", "Vienna", "Dublin", "Madrid"]:
+                start = time.perf_counter()
+                await search_weather.search_weather_async([city])
+                interactive.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ran, _ = await asyncio.gather(
+            asyncio.gather(*(worker.tick() for worker in workers)),
+            interactive_lookups(),
+        )
+        job_seconds = time.perf_counter() - start
+        print(
+            f"lease: {sum(ran)} of {len(workers)} workers ran the job; "
+            f"{workers[0].fetched + workers[1].fetched} locations fetched in "
+            f"{job_seconds:.2f}s at {args.calls_per_minute:g} calls/min "
+            f"({stub.request_count - before} upstream requests incl. "
+            f"{args.users} trip lists and 4 interactive)"
+        )
+        print(
+            f"interactive lookups during the job: "
+            f"median {statistics.median(interactive) * 1000:.0f}ms "
+            f"(stub latency {args.latency * 1000:g}ms)"
+        )
+
+        # 3: open the upcoming trips now
+        warm = open_trips(trips)
+        weather_cache.invalidate()  # a worker that did not run the job
+        other = workers[list(ran).index(False)]
+        await other.tick()
+        imported = open_trips(trips)
+        print(f"{'open upcoming trips':<28}{'seconds':>8}")
+        print(f"{'cold':<28}{cold:>8.3f}")
+        print(f"{'prefetched (job worker)':<28}{warm:>8.3f}")
+        print(f"{'prefetched (other worker)':<28}{imported:>8.3f}")
+        print(f"other worker imported {other.imported} locations")
+
+        # 4: prefetch refresh and a user lookup of the same location at once
+        weather_cache.invalidate()
+        before = stub.request_count
+        results = await asyncio.gather(
+            asyncio.to_thread(search_weather.refresh_location_weather, "Zurich"),
+            asyncio.to_thread(search_weather.fetch_location_weather, "Zurich"),
+        )
+        requests = stub.request_count - before
+        print(f"concurrent prefetch + user lookup: {requests} upstream request(s)")
+        assert requests == 1, "prefetch refresh did not join the in-flight lookup"
+        assert results[0] is results[1]
+
+        # 5: a paced job longer than its interval
+        weather_cache.invalidate()
+        short = [
+            WeatherPrefetcher(
+                os.path.join(tmp, "short.sqlite3"),
+                interval=1.0,
+                calls_per_minute=args.calls_per_minute,
+                enabled=True,
+            )
+            for _ in range(2)
+        ]
+        short[1].holder += "-b"
+        short[0].note_user("user-0")
+        job = asyncio.ensure_future(short[0].tick())
+        await asyncio.sleep(0.1)
+        stolen = []
+        while not job.done():
+            stolen.append(await short[1].tick())
+            await asyncio.sleep(0.3)
+        assert await job
+        print(
+            f"long job: {short[0].last_job_seconds:.2f}s with a 1s interval, "
+            f"second worker ran it {sum(stolen)} of {len(stolen)} ticks"
+        )
+        assert short[0].last_job_seconds > 1.0 and not any(stolen)
+        assert await short[1].tick(), "lease not released after the job"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--calls-per-minute", type=float, default=300)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Weather records: nested dicts + FastAPI's generic encoder vs slotted
+dataclasses serialized by orjson, for a 100-location /trip-weather response.
+
+Reports, per response:
+- parse: SerpAPI answer boxes -> records
+- memory: bytes retained by the records (tracemalloc)
+- serialize: records -> response body, the way each endpoint version does it
+  (jsonable_encoder + JSONResponse, vs ORJSONResponse on the dataclasses)
+
+Usage (from python_backend/):
+    python benchmarks/bench_weather_records.py [--locations 100] [--runs 200]
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from stub_server import weather_payload
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from models import WeatherResponse
+from search_weather import _parse_weather
+
+
+def _legacy_fahrenheit_to_celsius(value):
+    try:
+        return (int(value) - 32) * 5 // 9
+    except (ValueError, TypeError):
+        return None
+
+
+def legacy_parse(location, results):
+    """The dict-building parser this replaced."""
+    answer_box = results.get("answer_box", {})
+    temp_f = answer_box.get("temperature")
+    current_weather = {
+        "location": answer_box.get("location", location),
+        "temperature_f": temp_f,
+        "temperature_c": _legacy_fahrenheit_to_celsius(temp_f),
+        "condition": answer_box.get("weather"),
+        "humidity": answer_box.get("humidity"),
+        "wind": answer_box.get("wind"),
+    }
+    forecast_data = []
+    for day_forecast in answer_box.get("forecast", [])[:5]:
+        temperature = day_forecast.get("temperature", {})
+        forecast_data.append(
+            {
+                "day": day_forecast.get("day"),
+                "condition": day_forecast.get("weather"),
+                "high_f": temperature.get("high"),
+                "high_c": _legacy_fahrenheit_to_celsius(temperature.get("high")),
+                "low_f": temperature.get("low"),
+                "low_c": _legacy_fahrenheit_to_celsius(temperature.get("low")),
+            }
+        )
+    return {"current": current_weather, "forecast": forecast_data}
+
+
+def legacy_build(payloads):
+    return {"locations": [legacy_parse(loc, res) for loc, res in payloads]}
+
+
+def typed_build(payloads):
+    return WeatherResponse([_parse_weather(loc, res) for loc, res in payloads])
+
+
+def legacy_serialize(response):
+    return JSONResponse(jsonable_encoder(response)).body
+
+
+def typed_serialize(response):
+    return ORJSONResponse(response).body
+
+
+def per_call_us(fn, arg, runs, repeat=5):
+    """Best of `repeat` batches of `runs` calls, in microseconds per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best / runs * 1e6
+
+
+def retained_bytes(build, payloads):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    response = build(payloads)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del response
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--locations", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = [
+        (f"City {i}", weather_payload(f"weather City {i}"))
+        for i in range(args.locations)
+    ]
+    legacy = legacy_build(payloads)
+    typed = typed_build(payloads)
+    # Same document apart from temperatures now being numbers
+    assert len(json.loads(typed_serialize(typed))["locations"]) == args.locations
+
+    print(f"{args.locations}-location response, {args.runs} runs")
+    print(f"{'records':<22}{'parse us':>10}{'memory KB':>11}{'serialize us':>14}")
+    for name, build, serialize, response in (
+        ("dicts + jsonable", legacy_build, legacy_serialize, legacy),
+        ("dataclasses + orjson", typed_build, typed_serialize, typed),
+    ):
+        print(
+            f"{name:<22}{per_call_us(build, payloads, args.runs):>10.0f}"
+            f"{retained_bytes(build, payloads) / 1024:>11.1f}"
+            f"{per_call_us(serialize, response, args.runs):>14.0f}"
+        )
+    print(
+        f"body bytes: {len(legacy_serialize(legacy))} -> "
+        f"{len(typed_serialize(typed))}"
+    )
+
+
+if __name__ == "__main__":
+    main()
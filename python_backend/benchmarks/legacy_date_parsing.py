@@ -0,0 +1,146 @@
+"""
+Frozen copy of the regex/strptime date parsing that trip_utils used before
+date_parser.py, kept as the baseline for bench_date_parser.py.
+
+The only change is the optional `today` argument, so the benchmark can pin
+the reference date for both parsers.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+
+def parse_date_flexible(
+    date_str: str, today: Optional[datetime] = None
+) -> Optional[str]:
+    """
+    Parse various date formats and return YYYY-MM-DD format.
+
+    Args:
+        date_str: Date string in various formats
+
+    Returns:
+        Date in YYYY-MM-DD format or None if parsing fails
+    """
+    if not date_str or not isinstance(date_str, str):
+        return None
+
+    date_str = date_str.strip().lower()
+
+    # Handle relative dates
+    today = today or datetime.now()
+
+    if "today" in date_str:
+        return today.strftime("%Y-%m-%d")
+    elif "tomorrow" in date_str:
+        return (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    elif "next week" in date_str:
+        return (today + timedelta(weeks=1)).strftime("%Y-%m-%d")
+    elif "next month" in date_str:
+        next_month = today.replace(day=1) + timedelta(days=32)
+        return next_month.replace(day=1).strftime("%Y-%m-%d")
+
+    # Handle specific date patterns
+    patterns = [
+        # YYYY-MM-DD
+        (r"(\d{4})-(\d{1,2})-(\d{1,2})", "%Y-%m-%d"),
+        # MM/DD/YYYY
+        (r"(\d{1,2})/(\d{1,2})/(\d{4})", "%m/%d/%Y"),
+        # DD/MM/YYYY
+        (r"(\d{1,2})/(\d{1,2})/(\d{4})", "%d/%m/%Y"),
+        # Month DD, YYYY
+        (r"([a-z]+)\s+(\d{1,2}),?\s+(\d{4})", "%B %d, %Y"),
+        # DD Month YYYY
+        (r"(\d{1,2})\s+([a-z]+)\s+(\d{4})", "%d %B %Y"),
+        # Month DD
+        (r"([a-z]+)\s+(\d{1,2})", "%B %d"),
+        # DD Month
+        (r"(\d{1,2})\s+([a-z]+)", "%d %B"),
+    ]
+
+    for pattern, date_format in patterns:
+        match = re.search(pattern, date_str)
+        if match:
+            try:
+                # For patterns without year, assume current year
+                if "%Y" not in date_format:
+                    date_str_with_year = f"{match.group(0)} {today.year}"
+                    parsed_date = datetime.strptime(
+                        date_str_with_year, f"{date_format} %Y"
+                    )
+                else:
+                    parsed_date = datetime.strptime(match.group(0), date_format)
+
+                return parsed_date.strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+
+    return None
+
+
+def parse_trip_request(
+    text: str, today: Optional[datetime] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Parse trip request text to extract start and end dates.
+
+    Args:
+        text: Input text containing trip information
+
+    Returns:
+        Dictionary with start_date and end_date keys
+    """
+    result = {"start_date": None, "end_date": None}
+
+    if not text:
+        return result
+
+    text_lower = text.lower()
+
+    # Look for date ranges
+    date_range_patterns = [
+        # "from X to Y"
+        r"from\s+([^to]+)\s+to\s+([^,\s]+)",
+        # "X to Y"
+        r"(\d{1,2}[\/\-]\d{1,2}[\/\-]?\d{0,4}|\w+\s+\d{1,2})\s+to\s+(\d{1,2}[\/\-]\d{1,2}[\/\-]?\d{0,4}|\w+\s+\d{1,2})",
+        # "X - Y"
+        r"(\d{1,2}[\/\-]\d{1,2}[\/\-]?\d{0,4}|\w+\s+\d{1,2})\s*-\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]?\d{0,4}|\w+\s+\d{1,2})",
+    ]
+
+    for pattern in date_range_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            start_str = match.group(1).strip()
+            end_str = match.group(2).strip()
+
+            start_date = parse_date_flexible(start_str, today)
+            end_date = parse_date_flexible(end_str, today)
+
+            if start_date and end_date:
+                result["start_date"] = start_date
+                result["end_date"] = end_date
+                return result
+
+    # Look for single dates (assume it's start date)
+    single_date_patterns = [
+        r"(\d{1,2}[\/\-]\d{1,2}[\/\-]?\d{0,4})",
+        r"(\w+\s+\d{1,2})",
+        r"(next\s+week)",
+        r"(next\s+month)",
+    ]
+
+    for pattern in single_date_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            date_str = match.group(1).strip()
+            parsed_date = parse_date_flexible(date_str, today)
+            if parsed_date:
+                result["start_date"] = parsed_date
+                # Assume trip duration of 7 days if no end date
+                start_dt = datetime.strptime(parsed_date, "%Y-%m-%d")
+                end_dt = start_dt + timedelta(days=7)
+                result["end_date"] = end_dt.strftime("%Y-%m-%d")
+                return result
+
+    return result
@@ -0,0 +1,165 @@
+"""
+Load test: token streaming latency of /chat-trip under concurrent sessions
+while /trip-weather requests wait on a slow SerpAPI.
+
+The LLM is replaced by a fake token generator (fixed inter-token interval) and
+Next.js/SerpAPI by the local stub server, so any extra gap between tokens is
+time the event loop spent blocked. --blocking-baseline reproduces the old
+behaviour of calling search_weather inline on the event loop.
+
+Usage (from python_backend/):
+    python benchmarks/load_chat_stream.py [--sessions 20] [--weather-requests 10]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import socket
+import statistics
+import threading
+import time
+
+from stub_server import StubServer, point_serpapi_at
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def chat_session(client, base_url, session_id):
+    """Stream one chat response and record time-to-first-token and token gaps."""
+    gaps = []
+    start = time.perf_counter()
+    first_token = None
+    last = start
+    async with client.stream(
+        "POST",
+        f"{base_url}/chat-trip",
+        json={"user_input": "Plan a trip to Paris", "user_id": f"user-{session_id}"},
+    ) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            now = time.perf_counter()
+            if first_token is None:
+                first_token = now - start
+            else:
+                gaps.append(now - last)
+            last = now
+    return first_token or 0.0, gaps
+
+
+async def weather_request(client, base_url, index, delay):
+    # Spread over the streaming window; unique names so every request misses
+    # the weather cache
+    await asyncio.sleep(delay)
+    await client.post(
+        f"{base_url}/trip-weather",
+        json={"locations": [{"name": f"Benchtown {index}-{j}"} for j in range(3)]},
+        timeout=60,
+    )
+
+
+async def run_load(base_url, sessions, weather_requests, stream_seconds):
+    import httpx
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        chats = [chat_session(client, base_url, i) for i in range(sessions)]
+        weather = [
+            weather_request(
+                client, base_url, i, stream_seconds * i / max(weather_requests, 1)
+            )
+            for i in range(weather_requests)
+        ]
+        results = await asyncio.gather(*chats, *weather)
+    return results[:sessions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--weather-requests", type=int, default=10)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token-interval", type=float, default=0.02)
+    parser.add_argument("--serpapi-latency", type=float, default=0.5)
+    parser.add_argument("--blocking-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with StubServer(latency=args.serpapi_latency) as stub:
+        os.environ["NEXTJS_API_BASE"] = stub.url
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark-not-used")
+        # The agent is faked; do not load the real one alongside
+        os.environ["AGENT_WARMUP"] = "lazy"
+        point_serpapi_at(stub.url)
+
+        import uvicorn
+        import setup
+
+        async def fake_llm_stream(user_input, user_id, **kwargs):
+            for i in range(args.tokens):
+                await asyncio.sleep(args.token_interval)
+                yield f" tok{i}"
+
+        setup.generate_ai_response_stream_async = fake_llm_stream
+
+        if args.blocking_baseline:
+            from search_weather import search_weather
+
+            async def blocking_search_weather(locations, *a, **kw):
+                return search_weather(locations, *a, **kw)
+
+            setup.search_weather_async = blocking_search_weather
+
+        port = free_port()
+        server = uvicorn.Server(
+            uvicorn.Config(setup.app, host="127.0.0.1", port=port, log_level="error")
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        # Keep the per-request prints of the app out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(
+                run_load(
+                    f"http://127.0.0.1:{port}",
+                    args.sessions,
+                    args.weather_requests,
+                    args.tokens * args.token_interval,
+                )
+            )
+        server.should_exit = True
+        thread.join()
+
+    ttft = [first for first, _ in results]
+    gaps = [gap for _, session_gaps in results for gap in session_gaps]
+    mode = "blocking baseline" if args.blocking_baseline else "non-blocking"
+    print(
+        f"{mode}: sessions={args.sessions} weather_requests={args.weather_requests} "
+        f"token_interval={args.token_interval * 1000:.0f}ms"
+    )
+    print(
+        f"time to first token  p50={statistics.median(ttft) * 1000:.1f}ms "
+        f"p99={percentile(ttft, 99) * 1000:.1f}ms"
+    )
+    print(
+        f"inter-token gap      p50={statistics.median(gaps) * 1000:.1f}ms "
+        f"p99={percentile(gaps, 99) * 1000:.1f}ms max={max(gaps) * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Local stub of the upstream services used by the benchmarks.
+
+Answers SerpAPI-style searches with a canned weather answer box (or, for
+non-weather queries, full-size places/web results) and the Next.js
+/api/ai/trips endpoint with canned trips, after a configurable delay, so
+latency numbers reflect our code and not the network.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Make the backend modules importable when running `python benchmarks/<file>.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def weather_payload(query: str) -> dict:
+    """Minimal SerpAPI response containing a weather answer box."""
+    location = query.replace("weather", "", 1).strip() or "Unknown"
+    return {
+        "search_metadata": {"status": "Success"},
+        "answer_box": {
+            "location": location,
+            "weather": "Partly cloudy",
+            "temperature": "68",
+            "humidity": "55%",
+            "wind": "8 mph",
+            "forecast": [
+                {
+                    "day": day,
+                    "weather": "Sunny",
+                    "temperature": {"high": "75", "low": "59"},
+                }
+                for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+            ],
+        },
+    }
+
+
+def search_payload(engine: str, query: str) -> dict:
+    """SerpAPI-sized search response: 20 places (google_maps) or 10 web results
+    with the metadata the real API returns alongside."""
+    metadata = {
+        "search_metadata": {
+            "status": "Success",
+            "id": "0" * 24,
+            "total_time_taken": 1.2,
+        },
+        "search_parameters": {"engine": engine, "q": query, "hl": "en", "gl": "us"},
+        "search_information": {"query_displayed": query, "total_results": 123000},
+    }
+    if engine == "google_maps":
+        return {
+            **metadata,
+            "local_results": [
+                {
+                    "position": i,
+                    "title": f"{query} place {i}",
+                    "place_id": f"ChIJ{i:020d}",
+                    "gps_coordinates": {"latitude": 48.85, "longitude": 2.35},
+                    "rating": 4.5,
+                    "reviews": 1200 + i,
+                    "price": "$$",
+                    "type": "Tourist attraction",
+                    "types": ["Tourist attraction", "Museum", "Historical landmark"],
+                    "address": f"{i} Example Street, 75001",
+                    "open_state": "Open ⋅ Closes 6 PM",
+                    "hours": "Open ⋅ Closes 6 PM",
+                    "operating_hours": {
+                        day: "9 AM-6 PM"
+                        for day in ["monday", "tuesday", "wednesday", "thursday"]
+                    },
+                    "phone": "+33 1 23 45 67 89",
+                    "website": f"https://example.com/{i}",
+                    "description": "A well-loved spot with a long history.",
+                    "service_options": {"dine_in": True, "takeout": False},
+                    "thumbnail": f"https://lh5.googleusercontent.com/p/{'x' * 120}",
+                }
+                for i in range(20)
+            ],
+        }
+    return {
+        **metadata,
+        "related_questions": [{"question": f"Question {i}?"} for i in range(4)],
+        "organic_results": [
+            {
+                "position": i,
+                "title": f"{query}: guide part {i}",
+                "link": f"https://example.com/guide/{i}",
+                "displayed_link": f"https://example.com › guide › {i}",
+                "favicon": f"https://example.com/favicon-{'x' * 60}.png",
+                "snippet": "Everything you need to know before you go, from "
+                "neighbourhoods to food and day trips. " * 2,
+                "snippet_highlighted_words": ["travel", "recommendations"],
+                "sitelinks": {
+                    "inline": [
+                        {"title": f"Link {j}", "link": "https://example.com"}
+                        for j in range(3)
+                    ]
+                },
+                "source": "Example Travel",
+            }
+            for i in range(10)
+        ],
+    }
+
+
+def trips_payload(count: int = 3) -> dict:
+    """Minimal /api/ai/trips response."""
+    cities = [("Paris", 48.8566, 2.3522), ("Rome", 41.9028, 12.4964)]
+    return {
+        "trips": [
+            {
+                "id": f"trip-{i}",
+                "title": f"Trip {i}",
+                "description": "Benchmark trip",
+                "startDate": "2026-07-01T00:00:00.000Z",
+                "endDate": "2026-07-10T00:00:00.000Z",
+                "locations": [
+                    {"id": f"loc-{i}-{j}", "name": name, "lat": lat, "lng": lng}
+                    for j, (name, lat, lng) in enumerate(cities)
+                ],
+            }
+            for i in range(count)
+        ]
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections under load tests
+    request_queue_size = 256
+
+
+class StubServer:
+    """Threaded HTTP server answering /api/ai/trips with canned trips, weather
+    queries with a weather payload and other searches with search results.
+
+    Args:
+        latency: Seconds to sleep before answering each request
+        slow_queries: Queries (substring match) that sleep slow_latency instead
+        slow_latency: Delay used for slow_queries
+        trips: Trips served by /api/ai/trips (defaults to trips_payload())
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        slow_queries=(),
+        slow_latency: float = 5.0,
+        trips=None,
+    ):
+        self.latency = latency
+        self.trips = trips
+        self.slow_queries = tuple(slow_queries)
+        self.slow_latency = slow_latency
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                query = params.get("q", [""])[0]
+                engine = params.get("engine", ["google"])[0]
+                with stub._count_lock:
+                    stub.request_count += 1
+                delay = stub.latency
+                if any(slow in query for slow in stub.slow_queries):
+                    delay = stub.slow_latency
+                time.sleep(delay)
+                if url.path.startswith("/api/ai/trips"):
+                    payload = (
+                        {"trips": stub.trips}
+                        if stub.trips is not None
+                        else trips_payload()
+                    )
+                elif engine == "google_maps" or (query and "weather" not in query):
+                    payload = search_payload(engine, query)
+                else:
+                    payload = weather_payload(query)
+                body = json.dumps(payload).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def point_serpapi_at(url: str):
+    """Redirect the serpapi client library to the stub server."""
+    from serpapi import GoogleSearch
+
+    GoogleSearch.BACKEND = url
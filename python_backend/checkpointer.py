@@ -0,0 +1,773 @@
+"""
+Durable conversation state for the LangGraph agent.
+
+SQLiteCheckpointSaver persists graph checkpoints to a local SQLite file keyed
+by thread, so a follow-up turn resumes the stored conversation instead of the
+caller resending history. Writing a checkpoint costs O(what changed), not
+O(thread length):
+
+- channel values are stored per (channel, version), so a channel is only
+  serialized in the step that changed it;
+- the message history is stored append-only, one row per message id with
+  its position and the checkpoints that added and removed it; a checkpoint
+  only records its own id, so each message is serialized once and a turn
+  writes just its new messages;
+- the latest checkpoint of recently active threads stays deserialized in an
+  in-memory LRU, so resuming a hot thread costs one indexed lookup of the
+  thread's newest checkpoint id (another worker may have written since) and
+  no deserialization. The async API runs every SQLite call, that lookup
+  included, in the blocking-I/O executor.
+
+Only the newest few checkpoints of each thread are kept on disk. Request-scoped
+channels (the trip snapshot, the formatted trips passed in per request) are
+never persisted; every request supplies fresh values.
+"""
+
+import json
+import operator
+import os
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+)
+from services.http_client import run_blocking
+
+load_dotenv()
+
+CHECKPOINT_DB_PATH = os.getenv(
+    "CHECKPOINT_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints.sqlite3"),
+)
+CHECKPOINT_HOT_THREADS = int(os.getenv("CHECKPOINT_HOT_THREADS", "256"))
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "10"))
+
+# Blob type of a message channel: the id of the checkpoint that wrote it,
+# whose messages are the rows added by then and not yet removed
+_MESSAGE_LOG = "message_log"
+# Older blob type holding the full list of message ids
+_MESSAGE_IDS = "message_ids"
+
+
+def thread_key(user_id: str, thread_id: Optional[str] = None) -> str:
+    """Checkpoint thread for a user's conversation.
+
+    Thread ids are scoped by user so one user can never resume another's
+    thread; without a thread_id each user has a single conversation.
+    """
+    return f"{user_id}:{thread_id or user_id}"
+
+
+def _thread_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> dict:
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint_id,
+        }
+    }
+
+
+def _is_message_list(value: Any) -> bool:
+    return isinstance(value, list) and all(
+        isinstance(item, BaseMessage) and item.id for item in value
+    )
+
+
+def _changed_messages(
+    value: Any, known: Dict[str, Any], previous: Any = None
+) -> Optional[Tuple[List[BaseMessage], int]]:
+    """Messages of a list not stored as-is yet, and how many known ids remain.
+
+    Skips the messages already stored (identity check) and type-checks the
+    rest. A turn usually only appends to the parent checkpoint's list
+    (previous), so that prefix is compared in one C-level pass.
+
+    Returns:
+        (changed messages, known messages still present), or None if value is
+        not a list of messages
+    """
+    if not isinstance(value, list):
+        return None
+    start = 0
+    if (
+        isinstance(previous, list)
+        and len(previous) <= len(value)
+        and all(map(operator.is_, previous, value))
+    ):
+        start = len(previous)
+    changed = []
+    still_known = start
+    for message in value[start:]:
+        previous = known.get(getattr(message, "id", None))
+        if previous is not None:
+            still_known += 1
+            if previous is message:
+                continue
+        if not isinstance(message, BaseMessage) or not message.id:
+            return None
+        changed.append(message)
+    return changed, still_known
+
+
+class _HotThread:
+    __slots__ = ("tuple", "messages")
+
+    def __init__(self, checkpoint_tuple: CheckpointTuple, messages: Dict[str, Any]):
+        self.tuple = checkpoint_tuple
+        # Message id -> object already stored; identity tells if it changed
+        self.messages = messages
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """SQLite checkpoint store with an LRU of hot threads.
+
+    Args:
+        path: SQLite file location (":memory:" works for throwaway stores)
+        hot_threads: Threads whose latest checkpoint stays in memory
+        keep_per_thread: Checkpoints kept on disk per thread (0 keeps all)
+        request_scoped: Channels dropped before persisting
+        serde: Serializer (defaults to LangGraph's JsonPlusSerializer)
+    """
+
+    def __init__(
+        self,
+        path: str = CHECKPOINT_DB_PATH,
+        hot_threads: int = CHECKPOINT_HOT_THREADS,
+        keep_per_thread: int = CHECKPOINT_KEEP_PER_THREAD,
+        request_scoped: Iterable[str] = (),
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.hot_threads = hot_threads
+        self.keep_per_thread = keep_per_thread
+        self.request_scoped = frozenset(request_scoped)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # (thread_id, checkpoint_ns) -> latest checkpoint of the thread
+        self._hot: "OrderedDict[Tuple[str, str], _HotThread]" = OrderedDict()
+        self.hot_hits = 0
+        self.cold_loads = 0
+        self.messages_written = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL,
+                    checkpoint_id TEXT NOT NULL,
+                    parent_id TEXT,
+                    type TEXT NOT NULL,
+                    checkpoint BLOB NOT NULL,
+                    metadata_type TEXT NOT NULL,
+                    metadata BLOB NOT NULL,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                )""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL,
+                    channel TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    value BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+                )""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS messages (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL,
+                    message_id TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    removed_at TEXT,
+                    seq INTEGER,
+                    added_at TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (thread_id, checkpoint_ns, message_id)
+                )""")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+            if "seq" not in columns:
+                # Files written before messages were stored append-only; their
+                # checkpoints still hold id lists (_MESSAGE_IDS)
+                conn.execute("ALTER TABLE messages ADD COLUMN seq INTEGER")
+                conn.execute(
+                    "ALTER TABLE messages ADD COLUMN added_at TEXT NOT NULL DEFAULT ''"
+                )
+                conn.execute("UPDATE messages SET seq = rowid")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS messages_seq "
+                "ON messages (thread_id, checkpoint_ns, seq)"
+            )
+            # Lets _prune find removed messages without scanning the thread
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS messages_removed "
+                "ON messages (thread_id, checkpoint_ns, removed_at)"
+            )
+            conn.execute("""CREATE TABLE IF NOT EXISTS writes (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL,
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    task_path TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                )""")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _strip(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        # Graph input (the __start__ channel) is a dict holding the same keys
+        return {
+            channel: (
+                {k: v for k, v in value.items() if k not in self.request_scoped}
+                if isinstance(value, dict)
+                else value
+            )
+            for channel, value in values.items()
+            if channel not in self.request_scoped
+        }
+
+    def _remember(self, key: Tuple[str, str], hot: _HotThread):
+        self._hot[key] = hot
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_threads:
+            self._hot.popitem(last=False)
+
+    @staticmethod
+    def _copy(checkpoint_tuple: CheckpointTuple) -> CheckpointTuple:
+        # The graph loop updates version maps in place; hand out a copy
+        return checkpoint_tuple._replace(
+            checkpoint=copy_checkpoint(checkpoint_tuple.checkpoint),
+            pending_writes=list(checkpoint_tuple.pending_writes),
+        )
+
+    def _hot_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""))
+        with self._lock:
+            hot = self._hot.get(key)
+            if hot is None:
+                return None
+            checkpoint_id = get_checkpoint_id(config)
+            if not checkpoint_id:
+                # Other workers share the database: only serve the cached
+                # checkpoint while it is still the thread's newest one
+                row = (
+                    self._connection()
+                    .execute(
+                        "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? "
+                        "AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                        key,
+                    )
+                    .fetchone()
+                )
+                checkpoint_id = row[0] if row else None
+            if checkpoint_id != hot.tuple.checkpoint["id"]:
+                del self._hot[key]
+                return None
+            self._hot.move_to_end(key)
+            self.hot_hits += 1
+            return self._copy(hot.tuple)
+
+    def _load_writes(self, conn, thread_id, checkpoint_ns, checkpoint_id) -> list:
+        rows = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? "
+            "AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [
+            (task_id, channel, self.serde.loads_typed((type_, value)))
+            for task_id, channel, type_, value in rows
+        ]
+
+    def _load_messages(self, conn, thread_id, checkpoint_ns, ids: List[str]) -> list:
+        rows = conn.execute(
+            "SELECT message_id, type, value FROM messages WHERE thread_id = ? "
+            "AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        stored = {message_id: (type_, value) for message_id, type_, value in rows}
+        return [self.serde.loads_typed(stored[i]) for i in ids if i in stored]
+
+    def _load_message_log(self, conn, thread_id, checkpoint_ns, upto: str) -> list:
+        rows = conn.execute(
+            "SELECT type, value FROM messages WHERE thread_id = ? AND "
+            "checkpoint_ns = ? AND added_at <= ? AND (removed_at IS NULL OR "
+            "removed_at > ?) ORDER BY seq",
+            (thread_id, checkpoint_ns, upto, upto),
+        ).fetchall()
+        return [self.serde.loads_typed(row) for row in rows]
+
+    def _load_values(self, conn, thread_id, checkpoint_ns, versions) -> dict:
+        values = {}
+        for channel, version in versions.items():
+            row = conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND "
+                "checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            if row[0] == _MESSAGE_LOG:
+                values[channel] = self._load_message_log(
+                    conn, thread_id, checkpoint_ns, row[1]
+                )
+            elif row[0] == _MESSAGE_IDS:
+                values[channel] = self._load_messages(
+                    conn, thread_id, checkpoint_ns, json.loads(row[1])
+                )
+            else:
+                values[channel] = self.serde.loads_typed(row)
+        return values
+
+    def _row_to_tuple(self, conn, thread_id, checkpoint_ns, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint))
+        checkpoint["channel_values"] = self._load_values(
+            conn, thread_id, checkpoint_ns, checkpoint["channel_versions"]
+        )
+        return CheckpointTuple(
+            config=_thread_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                _thread_config(thread_id, checkpoint_ns, parent_id)
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(
+                conn, thread_id, checkpoint_ns, checkpoint_id
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Latest checkpoint of a thread, or the one named by checkpoint_id."""
+        cached = self._hot_tuple(config)
+        if cached is not None:
+            return cached
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        query = (
+            "SELECT checkpoint_id, parent_id, type, checkpoint, metadata_type, "
+            "metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: tuple = (thread_id, checkpoint_ns)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            checkpoint_tuple = self._row_to_tuple(conn, thread_id, checkpoint_ns, row)
+            self.cold_loads += 1
+            if not checkpoint_id:
+                messages = {
+                    message.id: message
+                    for value in checkpoint_tuple.checkpoint["channel_values"].values()
+                    if _is_message_list(value)
+                    for message in value
+                }
+                self._remember(
+                    (thread_id, checkpoint_ns), _HotThread(checkpoint_tuple, messages)
+                )
+        return self._copy(checkpoint_tuple)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Checkpoints newest first, optionally filtered by thread and metadata."""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params: list = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                checkpoint_tuple = self._row_to_tuple(
+                    conn, thread_id, checkpoint_ns, row
+                )
+                if filter and not all(
+                    checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()
+                ):
+                    continue
+                results.append(checkpoint_tuple)
+                if limit is not None and len(results) >= limit:
+                    break
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Persist a checkpoint and make it the thread's hot entry.
+
+        Only channels listed in new_versions are written, and only messages
+        that are new or changed since the thread's previous checkpoint. When
+        that checkpoint is not this worker's hot entry, the stored history is
+        synced to the full list of ids instead.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        key = (thread_id, checkpoint_ns)
+
+        values = self._strip(checkpoint["channel_values"])
+        checkpoint = {**checkpoint, "channel_values": values}
+        if isinstance(metadata.get("writes"), dict):
+            # Metadata echoes each node's writes, including the graph input
+            metadata = {**metadata, "writes": self._strip(metadata["writes"])}
+
+        with self._lock:
+            hot = self._hot.get(key)
+            # Messages stored by the parent checkpoint; if this worker's entry
+            # is for another checkpoint, assume nothing is stored yet
+            if hot is not None and hot.tuple.checkpoint["id"] == parent_id:
+                known = hot.messages
+                parent_values = hot.tuple.checkpoint["channel_values"]
+            else:
+                known, parent_values = {}, {}
+
+        stored_messages = dict(known)
+        message_rows = []
+        removed: List[str] = []
+        # Ids of the whole history, when there is no known baseline to diff
+        synced_ids: Optional[List[str]] = None
+        blob_rows = []
+        for channel, version in new_versions.items():
+            if channel in self.request_scoped:
+                continue
+            value = values.get(channel)
+            diff = (
+                _changed_messages(value, known, parent_values.get(channel))
+                if channel in values
+                else None
+            )
+            if channel not in values:
+                type_, serialized = "empty", None
+            elif diff is not None:
+                changed, still_known = diff
+                for message in changed:
+                    message_rows.append(
+                        (
+                            thread_id,
+                            checkpoint_ns,
+                            message.id,
+                            *self.serde.dumps_typed(message),
+                        )
+                    )
+                    stored_messages[message.id] = message
+                if not known:
+                    synced_ids = [message.id for message in value]
+                elif still_known < len(known):
+                    # Messages dropped from the history (e.g. by compaction)
+                    current = {message.id for message in value}
+                    removed = [i for i in known if i not in current]
+                    for message_id in removed:
+                        del stored_messages[message_id]
+                type_, serialized = _MESSAGE_LOG, checkpoint["id"]
+            else:
+                type_, serialized = self.serde.dumps_typed(value)
+            blob_rows.append(
+                (thread_id, checkpoint_ns, channel, str(version), type_, serialized)
+            )
+
+        type_, serialized = self.serde.dumps_typed({**checkpoint, "channel_values": {}})
+        metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
+        saved_config = _thread_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+        with self._lock:
+            conn = self._connection()
+            if message_rows:
+                (last_seq,) = conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM messages WHERE thread_id = ? "
+                    "AND checkpoint_ns = ?",
+                    key,
+                ).fetchone()
+                # A changed message keeps its position; a new (or re-added)
+                # one goes after everything stored so far
+                conn.executemany(
+                    "INSERT INTO messages VALUES (?, ?, ?, ?, ?, NULL, ?, ?) "
+                    "ON CONFLICT (thread_id, checkpoint_ns, message_id) DO UPDATE "
+                    "SET type = excluded.type, value = excluded.value, "
+                    "seq = CASE WHEN removed_at IS NULL THEN seq "
+                    "ELSE excluded.seq END, "
+                    "added_at = CASE WHEN removed_at IS NULL THEN added_at "
+                    "ELSE excluded.added_at END, removed_at = NULL",
+                    [
+                        (*row, last_seq + position, checkpoint["id"])
+                        for position, row in enumerate(message_rows, 1)
+                    ],
+                )
+            if synced_ids is not None:
+                conn.execute(
+                    "UPDATE messages SET removed_at = ? WHERE thread_id = ? AND "
+                    "checkpoint_ns = ? AND removed_at IS NULL AND message_id "
+                    "NOT IN (SELECT value FROM json_each(?))",
+                    (checkpoint["id"], *key, json.dumps(synced_ids)),
+                )
+            conn.executemany(
+                "UPDATE messages SET removed_at = ? WHERE thread_id = ? AND "
+                "checkpoint_ns = ? AND message_id = ?",
+                [(checkpoint["id"], thread_id, checkpoint_ns, i) for i in removed],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    parent_id,
+                    type_,
+                    serialized,
+                    metadata_type,
+                    serialized_metadata,
+                ),
+            )
+            if self.keep_per_thread:
+                self._prune(conn, thread_id, checkpoint_ns)
+            conn.commit()
+            self.messages_written += len(message_rows)
+            self._remember(
+                key,
+                _HotThread(
+                    CheckpointTuple(
+                        config=saved_config,
+                        checkpoint=checkpoint,
+                        metadata=metadata,
+                        parent_config=(
+                            _thread_config(thread_id, checkpoint_ns, parent_id)
+                            if parent_id
+                            else None
+                        ),
+                        pending_writes=[],
+                    ),
+                    stored_messages,
+                ),
+            )
+        return saved_config
+
+    def _prune(self, conn, thread_id: str, checkpoint_ns: str):
+        # Checkpoint ids sort by time, so everything below the newest N goes
+        row = conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE "
+            "thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC "
+            "LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_per_thread - 1),
+        ).fetchone()
+        if row is None:
+            return
+        oldest_id, type_, serialized = row
+        scope = (thread_id, checkpoint_ns)
+        deleted = conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND checkpoint_id < ?",
+            (*scope, oldest_id),
+        ).rowcount
+        if not deleted:
+            return
+        conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND checkpoint_id < ?",
+            (*scope, oldest_id),
+        )
+        conn.execute(
+            "DELETE FROM messages WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND removed_at IS NOT NULL AND removed_at <= ?",
+            (*scope, oldest_id),
+        )
+        # Versions only grow, so blobs older than the oldest kept checkpoint's
+        # version of a channel are unreachable
+        versions = self.serde.loads_typed((type_, serialized))["channel_versions"]
+        conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND channel = ? AND version < ?",
+            [(*scope, channel, str(version)) for channel, version in versions.items()],
+        )
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Persist the pending writes of a task for the given checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        pending = []
+        for idx, (channel, value) in enumerate(writes):
+            if channel in self.request_scoped:
+                continue
+            if isinstance(value, dict):
+                value = self._strip(value)
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    serialized,
+                    task_path,
+                )
+            )
+            pending.append((task_id, channel, value))
+        if not rows:
+            return
+
+        # Special channels (errors, interrupts) are overwritten, the rest
+        # are only stored once per task
+        verb = "REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "IGNORE"
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                f"INSERT OR {verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            hot = self._hot.get((thread_id, checkpoint_ns))
+            if hot is not None and hot.tuple.checkpoint["id"] == checkpoint_id:
+                hot.tuple.pending_writes.extend(pending)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Forget a conversation entirely."""
+        with self._lock:
+            conn = self._connection()
+            for table in ("checkpoints", "blobs", "messages", "writes"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            conn.commit()
+            for key in [key for key in self._hot if key[0] == thread_id]:
+                del self._hot[key]
+
+    def stats(self) -> dict:
+        """Hot-thread LRU size and hit counters."""
+        with self._lock:
+            return {
+                "hot_threads": len(self._hot),
+                "max_hot_threads": self.hot_threads,
+                "hot_hits": self.hot_hits,
+                "cold_loads": self.cold_loads,
+                "messages_written": self.messages_written,
+            }
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        # Even a hot thread checks SQLite for a newer checkpoint (and waits for
+        # the lock a put holds through its commit), so it all runs off the loop
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await run_blocking(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in results:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await run_blocking(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await run_blocking(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await run_blocking(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel) -> str:
+        # Same scheme as LangGraph's own savers: zero-padded counter + jitter
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
@@ -0,0 +1,150 @@
+"""
+Incremental trip analysis of a conversation.
+
+Each user message is analyzed once (destinations and dates) and the result is
+stored under the message id. The agent keeps the analyzer in AgentState, so a
+chat step only analyzes messages it has not seen yet and merges the cached
+per-message results, instead of re-parsing the whole history every time.
+
+Only the user's last CONVERSATION_ANALYSIS_TURNS messages since the last trip
+the agent created count, so a destination and dates from an old request do
+not keep asking for a trip on unrelated later turns. Results for messages
+that left that window (or were compacted away) are dropped.
+
+The analyzer is a plain dataclass so it can be checkpointed with the rest of
+the graph state.
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from date_parser import parse_dates
+from trip_utils import extract_locations_from_text
+from weather_cache import normalize_location
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_ANALYSIS_TURNS = int(os.getenv("CONVERSATION_ANALYSIS_TURNS", "6"))
+
+# Start of create_trip's result when the trip was saved (see trip_tools)
+_TRIP_CREATED = "✅ Trip created successfully!"
+
+
+# A NamedTuple rather than a dataclass: it checkpoints about ten times faster
+class MessageAnalysis(NamedTuple):
+    destinations: List[str]
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    is_range: bool = False
+
+
+def analyze_message(text: str) -> MessageAnalysis:
+    """Destinations and trip dates mentioned in one user message."""
+    dates = parse_dates(text)
+    return MessageAnalysis(
+        destinations=extract_locations_from_text(text),
+        start_date=dates.start_date,
+        end_date=dates.end_date,
+        is_range=dates.is_range,
+    )
+
+
+def _message_key(message: BaseMessage) -> str:
+    # LangGraph's add_messages assigns ids; fall back to the text otherwise
+    return message.id or f"content:{message.content}"
+
+
+@dataclass
+class ConversationAnalyzer:
+    """Per-message analysis results, merged into conversation-level info.
+
+    Args:
+        analyses: Analysis of each user message, keyed by message id
+        order: Message ids in conversation order
+    """
+
+    analyses: Dict[str, MessageAnalysis] = field(default_factory=dict)
+    order: List[str] = field(default_factory=list)
+
+    def update(
+        self,
+        messages: Sequence[BaseMessage],
+        recent_turns: int = CONVERSATION_ANALYSIS_TURNS,
+    ) -> "ConversationAnalyzer":
+        """Analyze the user messages not seen yet and forget the ones that no
+        longer count (see the module docstring).
+
+        Args:
+            messages: The conversation as it is in the graph state
+            recent_turns: How many of the latest user messages count
+
+        Returns a new analyzer, so earlier graph states are never mutated.
+        """
+        # Messages after the last successful create_trip call
+        start = 0
+        tool_names = {}
+        for position, message in enumerate(messages):
+            if isinstance(message, AIMessage):
+                for tool_call in message.tool_calls:
+                    tool_names[tool_call["id"]] = tool_call["name"]
+            elif (
+                isinstance(message, ToolMessage)
+                and tool_names.get(message.tool_call_id) == "create_trip"
+                and str(message.content).startswith(_TRIP_CREATED)
+            ):
+                start = position + 1
+
+        # Only user messages, not AI responses or tool messages
+        recent = [
+            message
+            for message in messages[start:]
+            if isinstance(message, HumanMessage) and message.content
+        ][-recent_turns:]
+
+        analyses = {}
+        new_count = 0
+        for message in recent:
+            key = _message_key(message)
+            analysis = self.analyses.get(key)
+            if analysis is None:
+                analysis = analyze_message(message.content)
+                new_count += 1
+            analyses[key] = analysis
+
+        logger.debug(
+            "Analyzed %d new message(s), %d kept", new_count, len(analyses) - new_count
+        )
+        return ConversationAnalyzer(analyses=analyses, order=list(analyses))
+
+    def info(self) -> dict:
+        """Merged destinations and dates of the whole conversation.
+
+        Destinations keep their first-mention order. For dates, the first
+        message with an explicit range wins, then the first message with a
+        single date (7-day trip assumed).
+        """
+        destinations = {}
+        ranged = single = None
+        for key in self.order:
+            analysis = self.analyses[key]
+            for destination in analysis.destinations:
+                destinations.setdefault(normalize_location(destination), destination)
+            if analysis.start_date and analysis.end_date:
+                if analysis.is_range and ranged is None:
+                    ranged = analysis
+                elif single is None:
+                    single = analysis
+
+        dates = ranged or single
+        return {
+            "destinations": list(destinations.values()),
+            "start_date": dates.start_date if dates else "",
+            "end_date": dates.end_date if dates else "",
+            "has_destination": bool(destinations),
+            "has_dates": dates is not None,
+        }
@@ -0,0 +1,248 @@
+"""
+Single-pass date and date-range parser for trip requests.
+
+One precompiled regex scans the lowercased text once and yields every date it
+recognizes (ISO, numeric, "Month D[, YYYY]", "D Month [YYYY]", day ranges
+such as "July 1-10", and relative dates like "next week"). Ranges are then
+picked from adjacent dates joined by a connector ("to", "-", "until", ...).
+Results are memoized per (text, today), so re-parsing the same conversation
+on every agent step costs a dictionary lookup.
+
+Dates without a year use the current year, matching the old behaviour. In a
+range a missing year is taken from the other end, and an end that falls
+before the start rolls over into the next year ("Dec 28 to Jan 3").
+"""
+
+import os
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATE_PARSER_CACHE_SIZE = int(os.getenv("DATE_PARSER_CACHE_SIZE", "2048"))
+
+# Trip length assumed when only a start date is given
+DEFAULT_TRIP_DAYS = 7
+
+_MONTHS = {
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+}
+_MONTH = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?"
+    r"|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+)
+_ORDINAL = r"(?:st|nd|rd|th)?"
+_DAY_DASH = r"\s*(?:-|–|to|through|thru|until|till)\s*"
+
+_DATE_RE = re.compile(
+    rf"""
+    \b(?P<iso_y>\d{{4}})-(?P<iso_m>\d{{1,2}})-(?P<iso_d>\d{{1,2}})\b
+    | \b(?P<dm_d>\d{{1,2}}){_ORDINAL}
+        (?:{_DAY_DASH}(?P<dm_d2>\d{{1,2}}){_ORDINAL})?
+        \s+(?:of\s+)?(?P<dm_m>{_MONTH})\b\.?
+        (?:,?\s+(?P<dm_y>\d{{4}})\b)?
+    | \b(?P<num_a>\d{{1,2}})/(?P<num_b>\d{{1,2}})(?:/(?P<num_y>\d{{4}}|\d{{2}}))?\b
+    | \b(?P<md_m>{_MONTH})\b\.?\s+(?P<md_d>\d{{1,2}}){_ORDINAL}\b
+        (?:{_DAY_DASH}(?P<md_d2>\d{{1,2}}){_ORDINAL}\b(?!\s*/))?
+        (?:,?\s+(?P<md_y>\d{{4}})\b)?
+    | \b(?P<rel>today|tomorrow|next\s+week|next\s+month)\b
+    """,
+    re.VERBOSE,
+)
+
+# Text allowed between the two ends of a range
+_RANGE_JOIN_RE = re.compile(r"\s*(?:-|–|—|to|through|thru|until|till|and)\s*")
+
+
+class _Found(NamedTuple):
+    start: int
+    end: int
+    month: int
+    day: int
+    year: Optional[int]  # None when the text gave no year
+    day2: Optional[int]  # End day of a "July 1-10" style range
+    fixed: Optional[date]  # Relative dates resolve directly
+
+
+class ParsedDates(NamedTuple):
+    first_date: Optional[str]  # First date in the text
+    start_date: Optional[str]
+    end_date: Optional[str]
+    is_range: bool = False  # False when the end date is the assumed default
+
+
+def _relative(word: str, today: date) -> date:
+    if word == "today":
+        return today
+    if word == "tomorrow":
+        return today + timedelta(days=1)
+    if word.endswith("week"):
+        return today + timedelta(weeks=1)
+    return (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _to_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _scan(text: str, today: date):
+    for match in _DATE_RE.finditer(text):
+        group = match.group
+        start, end = match.span()
+        if group("iso_y"):
+            yield _Found(
+                start,
+                end,
+                int(group("iso_m")),
+                int(group("iso_d")),
+                int(group("iso_y")),
+                None,
+                None,
+            )
+        elif group("dm_d"):
+            yield _Found(
+                start,
+                end,
+                _MONTHS[group("dm_m")[:3]],
+                int(group("dm_d")),
+                int(group("dm_y")) if group("dm_y") else None,
+                int(group("dm_d2")) if group("dm_d2") else None,
+                None,
+            )
+        elif group("num_a"):
+            year = group("num_y")
+            if year:
+                year = int(year) + (2000 if len(year) == 2 else 0)
+            a, b = int(group("num_a")), int(group("num_b"))
+            # MM/DD first, DD/MM when the first number can't be a month
+            month, day = (a, b) if a <= 12 else (b, a)
+            yield _Found(start, end, month, day, year, None, None)
+        elif group("md_m"):
+            yield _Found(
+                start,
+                end,
+                _MONTHS[group("md_m")[:3]],
+                int(group("md_d")),
+                int(group("md_y")) if group("md_y") else None,
+                int(group("md_d2")) if group("md_d2") else None,
+                None,
+            )
+        else:
+            word = " ".join(group("rel").split())
+            yield _Found(start, end, 0, 0, None, None, _relative(word, today))
+
+
+def _resolve(found: _Found, year: int) -> Optional[date]:
+    if found.fixed is not None:
+        return found.fixed
+    return _to_date(found.year or year, found.month, found.day)
+
+
+def _resolve_range(
+    first: _Found, second: _Found, today: date
+) -> Optional[Tuple[date, date]]:
+    # A missing year comes from the other end of the range
+    start_year = first.year or second.year or today.year
+    end_year = second.year or start_year
+    start = _resolve(first, start_year)
+    end = _resolve(second, end_year)
+    if start is None or end is None:
+        return None
+    if end < start:
+        if second.year is None and second.fixed is None:
+            end = _to_date(end.year + 1, end.month, end.day)
+        elif first.year is None and first.fixed is None:
+            start = _to_date(start.year - 1, start.month, start.day)
+    if start is None or end is None or end < start:
+        return None
+    return start, end
+
+
+@lru_cache(maxsize=DATE_PARSER_CACHE_SIZE)
+def _parse(text: str, today: date) -> ParsedDates:
+    text = text.lower()
+    found = list(_scan(text, today))
+
+    first_date = None
+    for item in found:
+        first_date = _resolve(item, today.year)
+        if first_date is not None:
+            break
+
+    # Prefer the first range anywhere in the text, like the old parser did
+    for i, item in enumerate(found):
+        if item.day2 is not None:
+            span = _resolve_range(item, item._replace(day=item.day2, day2=None), today)
+        elif i + 1 < len(found) and _RANGE_JOIN_RE.fullmatch(
+            text[item.end : found[i + 1].start]
+        ):
+            span = _resolve_range(item, found[i + 1], today)
+        else:
+            continue
+        if span:
+            return ParsedDates(
+                first_date and first_date.isoformat(),
+                span[0].isoformat(),
+                span[1].isoformat(),
+                True,
+            )
+
+    if first_date is None:
+        return ParsedDates(None, None, None)
+    return ParsedDates(
+        first_date.isoformat(),
+        first_date.isoformat(),
+        (first_date + timedelta(days=DEFAULT_TRIP_DAYS)).isoformat(),
+    )
+
+
+def parse_dates(text: str, today: Optional[date] = None) -> ParsedDates:
+    """Find the first date and the trip date range in free text.
+
+    Args:
+        text: Message or conversation text
+        today: Reference date for relative and year-less dates
+            (defaults to today; part of the memoization key)
+
+    Returns:
+        ParsedDates with YYYY-MM-DD strings (or None). Without a range, the
+        end date is DEFAULT_TRIP_DAYS after the first date.
+    """
+    if not text or not isinstance(text, str):
+        return ParsedDates(None, None, None)
+    return _parse(text, today or date.today())
+
+
+def parse_date(text: str, today: Optional[date] = None) -> Optional[str]:
+    """First date in the text as YYYY-MM-DD, or None."""
+    return parse_dates(text, today).first_date
+
+
+def parse_trip_dates(
+    text: str, today: Optional[date] = None
+) -> Dict[str, Optional[str]]:
+    """Trip start and end dates as a fresh {"start_date", "end_date"} dict."""
+    parsed = parse_dates(text, today)
+    return {"start_date": parsed.start_date, "end_date": parsed.end_date}
+
+
+def cache_info():
+    """Hit/miss statistics of the memoized parser."""
+    return _parse.cache_info()
@@ -0,0 +1,271 @@
+"""
+Offline gazetteer: place names, aliases, coordinates and population.
+
+The gazetteer is compiled from a local CSV (data/gazetteer.csv) into a compact
+binary index that is memory-mapped on first use. A word trie built over the
+index keys finds every known place in a message in a single left-to-right
+pass, so extracting and geocoding places needs no network.
+
+Index layout (little-endian):
+    header  "<4sHII"   magic, version, place count, key count
+    places  "<ddIII"   lat, lng, population, name offset, name length
+    keys    "<III"     key offset, key length, place index (sorted by key)
+    strings            UTF-8 blob holding names and normalized keys
+
+Rebuild the index after editing the CSV with:
+    python gazetteer.py build [csv_path] [index_path]
+"""
+
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from typing import Dict, List, NamedTuple, Optional
+from dotenv import load_dotenv
+from weather_cache import normalize_location
+
+load_dotenv()
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GAZETTEER_CSV_PATH = os.getenv(
+    "GAZETTEER_CSV_PATH", os.path.join(_DATA_DIR, "gazetteer.csv")
+)
+GAZETTEER_INDEX_PATH = os.getenv(
+    "GAZETTEER_INDEX_PATH", os.path.join(_DATA_DIR, "gazetteer.idx")
+)
+
+_MAGIC = b"GZT1"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHII")
+_PLACE = struct.Struct("<ddIII")
+_KEY = struct.Struct("<III")
+
+# Words only (no punctuation) with their positions in the original text
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+class Place(NamedTuple):
+    name: str
+    lat: float
+    lng: float
+    population: int
+
+
+class PlaceMatch(NamedTuple):
+    place: Place
+    text: str  # Matched text as written in the message
+    start: int
+    end: int
+
+
+def build_index(
+    csv_path: str = GAZETTEER_CSV_PATH, index_path: str = GAZETTEER_INDEX_PATH
+) -> int:
+    """Compile the gazetteer CSV into the binary index.
+
+    The CSV needs name, aliases (pipe-separated), lat, lng and population
+    columns. When two places share a key, the more populous one wins.
+
+    Returns:
+        Number of places written
+    """
+    places = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            names = [row["name"]] + [
+                alias for alias in (row.get("aliases") or "").split("|") if alias
+            ]
+            places.append(
+                (
+                    row["name"],
+                    float(row["lat"]),
+                    float(row["lng"]),
+                    int(row.get("population") or 0),
+                    names,
+                )
+            )
+
+    keys: Dict[str, int] = {}
+    for index, (_, _, _, population, names) in enumerate(places):
+        for name in names:
+            key = normalize_location(name)
+            if not key:
+                continue
+            current = keys.get(key)
+            if current is None or places[current][3] < population:
+                keys[key] = index
+
+    strings = bytearray()
+
+    def add_string(value: str):
+        encoded = value.encode("utf-8")
+        offset = len(strings)
+        strings.extend(encoded)
+        return offset, len(encoded)
+
+    place_records = bytearray()
+    for name, lat, lng, population, _ in places:
+        place_records += _PLACE.pack(lat, lng, population, *add_string(name))
+
+    key_records = bytearray()
+    # Sort on the encoded bytes so lookups can bisect the raw index
+    for key in sorted(keys, key=lambda k: k.encode("utf-8")):
+        key_records += _KEY.pack(*add_string(key), keys[key])
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(places), len(keys)))
+        f.write(place_records)
+        f.write(key_records)
+        f.write(strings)
+    os.replace(tmp_path, index_path)
+    return len(places)
+
+
+class Gazetteer:
+    """Lazily loaded, memory-mapped gazetteer with a word-trie matcher.
+
+    Args:
+        index_path: Compiled index file
+        csv_path: Source CSV, used to (re)build a missing or outdated index
+    """
+
+    def __init__(
+        self,
+        index_path: str = GAZETTEER_INDEX_PATH,
+        csv_path: str = GAZETTEER_CSV_PATH,
+    ):
+        self.index_path = index_path
+        self.csv_path = csv_path
+        self._mm: Optional[mmap.mmap] = None
+        self._trie: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._mm is not None:
+                return
+            if not os.path.exists(self.index_path) or (
+                os.path.exists(self.csv_path)
+                and os.path.getmtime(self.csv_path) > os.path.getmtime(self.index_path)
+            ):
+                build_index(self.csv_path, self.index_path)
+
+            with open(self.index_path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, place_count, key_count = _HEADER.unpack_from(mm, 0)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"Unsupported gazetteer index: {self.index_path}")
+
+            self._place_count = place_count
+            self._key_count = key_count
+            self._places_offset = _HEADER.size
+            self._keys_offset = self._places_offset + place_count * _PLACE.size
+            self._strings_offset = self._keys_offset + key_count * _KEY.size
+            self._mm = mm
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return self._mm[start : start + length].decode("utf-8")
+
+    def _key_at(self, position: int):
+        key_offset, key_length, place_index = _KEY.unpack_from(
+            self._mm, self._keys_offset + position * _KEY.size
+        )
+        start = self._strings_offset + key_offset
+        return self._mm[start : start + key_length], place_index
+
+    def _place(self, place_index: int) -> Place:
+        lat, lng, population, name_offset, name_length = _PLACE.unpack_from(
+            self._mm, self._places_offset + place_index * _PLACE.size
+        )
+        return Place(self._string(name_offset, name_length), lat, lng, population)
+
+    def __len__(self) -> int:
+        self._load()
+        return self._place_count
+
+    def lookup(self, name: str) -> Optional[Place]:
+        """Exact (normalized) lookup of a place name or alias."""
+        self._load()
+        key = normalize_location(name).encode("utf-8")
+
+        # Binary search straight over the mapped key table
+        lo, hi = 0, self._key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._key_count:
+            candidate, place_index = self._key_at(lo)
+            if candidate == key:
+                return self._place(place_index)
+        return None
+
+    def _word_trie(self) -> dict:
+        # Nested dicts keyed by word; a None key holds the place index
+        if self._trie is None:
+            self._load()
+            trie: dict = {}
+            for position in range(self._key_count):
+                key, place_index = self._key_at(position)
+                node = trie
+                for word in key.decode("utf-8").split(" "):
+                    node = node.setdefault(word, {})
+                node[None] = place_index
+            self._trie = trie
+        return self._trie
+
+    def find(self, text: str) -> List[PlaceMatch]:
+        """Find known places in free text, longest match first, in one pass.
+
+        A match must start with a capitalized word ("Turkey", not "turkey"),
+        the same rule the old city-name regex relied on.
+        """
+        if not text:
+            return []
+        trie = self._word_trie()
+        tokens = [(m.group(0), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+        matches = []
+        i = 0
+        while i < len(tokens):
+            word, start, _ = tokens[i]
+            best = None
+            if word[0].isupper():
+                node = trie
+                j = i
+                while j < len(tokens):
+                    node = node.get(tokens[j][0].lower())
+                    if node is None:
+                        break
+                    j += 1
+                    if None in node:
+                        best = (j, node[None])
+            if best is None:
+                i += 1
+                continue
+            j, place_index = best
+            end = tokens[j - 1][2]
+            matches.append(
+                PlaceMatch(self._place(place_index), text[start:end], start, end)
+            )
+            i = j
+        return matches
+
+
+# Global gazetteer instance (loaded on first use)
+gazetteer = Gazetteer()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python gazetteer.py build [csv_path] [index_path]")
+        sys.exit(1)
+    count = build_index(*sys.argv[2:4])
+    print(f"✅ Built gazetteer index with {count} places")
@@ -0,0 +1,201 @@
+"""
+Persistent geocoding cache and batch geocoder.
+
+Resolved coordinates are stored in a local SQLite file keyed by normalized
+place name, so repeated destinations never hit Nominatim again. Places
+Nominatim could not find are negative-cached for a while instead of being
+retried on every call. Misses are geocoded through a shared, rate-limited
+Nominatim client that respects the 1 request/second usage policy.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from weather_cache import normalize_location
+from metrics import track_upstream
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_PATH = os.getenv(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite3"),
+)
+# Seconds before a "not found" answer is retried against Nominatim
+GEOCODE_NEGATIVE_TTL_SECONDS = float(
+    os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", str(7 * 24 * 3600))
+)
+GEOCODE_MIN_DELAY_SECONDS = float(os.getenv("GEOCODE_MIN_DELAY_SECONDS", "1.0"))
+GEOCODE_TIMEOUT_SECONDS = float(os.getenv("GEOCODE_TIMEOUT_SECONDS", "10"))
+
+Coordinates = Tuple[float, float]
+
+
+class GeocodeCache:
+    """SQLite-backed map of normalized place name -> coordinates (or not found).
+
+    Args:
+        path: SQLite file location (":memory:" works for throwaway caches)
+        negative_ttl: Seconds a "not found" entry stays valid
+    """
+
+    def __init__(
+        self,
+        path: str = GEOCODE_CACHE_PATH,
+        negative_ttl: float = GEOCODE_NEGATIVE_TTL_SECONDS,
+    ):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS geocodes (
+                    key TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    lat REAL,
+                    lng REAL,
+                    found INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )""")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[Coordinates]]:
+        """Look up normalized keys in one query.
+
+        Returns:
+            Dict of key -> coordinates, or key -> None for valid negative
+            entries. Keys that are unknown or whose negative entry expired are
+            left out.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = (
+                self._connection()
+                .execute(
+                    f"SELECT key, lat, lng, found, updated_at FROM geocodes "
+                    f"WHERE key IN ({placeholders})",
+                    keys,
+                )
+                .fetchall()
+            )
+
+        now = time.time()
+        cached = {}
+        for key, lat, lng, found, updated_at in rows:
+            if found:
+                cached[key] = (lat, lng)
+            elif now - updated_at < self.negative_ttl:
+                cached[key] = None
+        return cached
+
+    def put(self, key: str, name: str, coordinates: Optional[Coordinates]):
+        """Store a lookup result; None records a negative entry."""
+        lat, lng = coordinates if coordinates else (None, None)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?)",
+                (key, name, lat, lng, int(coordinates is not None), time.time()),
+            )
+            conn.commit()
+
+
+class BatchGeocoder:
+    """Geocode many place names at once: dedupe, serve cache hits, then
+    resolve the remaining names through a rate-limited Nominatim client.
+
+    Args:
+        cache: Persistent cache used for hits and to record new answers
+        min_delay_seconds: Minimum spacing between Nominatim requests
+    """
+
+    def __init__(
+        self,
+        cache: GeocodeCache,
+        min_delay_seconds: float = GEOCODE_MIN_DELAY_SECONDS,
+    ):
+        self.cache = cache
+        self.min_delay_seconds = min_delay_seconds
+        self._geocode = None
+        self._lock = threading.Lock()
+
+    def _rate_limited_geocode(self):
+        # One geolocator per process so the rate limit holds across callers
+        with self._lock:
+            if self._geocode is None:
+                # geopy (and the aiohttp it imports) is only needed on a miss
+                from geopy.extra.rate_limiter import RateLimiter
+                from geopy.geocoders import Nominatim
+
+                geolocator = Nominatim(user_agent="travel_planner")
+                self._geocode = RateLimiter(
+                    geolocator.geocode,
+                    min_delay_seconds=self.min_delay_seconds,
+                    max_retries=1,
+                    swallow_exceptions=False,
+                )
+            return self._geocode
+
+    def geocode_many(self, names: List[str]) -> Dict[str, Optional[Coordinates]]:
+        """Resolve place names to coordinates.
+
+        Args:
+            names: Place names, duplicates and case variants allowed
+
+        Returns:
+            Dict mapping each input name to (lat, lng), or None when the place
+            could not be found or Nominatim errored
+        """
+        keys = {name: normalize_location(name) for name in names}
+        resolved = self.cache.get_many(set(keys.values()))
+
+        misses = {}
+        for name, key in keys.items():
+            if key and key not in resolved and key not in misses:
+                misses[key] = name
+
+        if misses:
+            logger.info(
+                "Geocoding %d uncached location(s)",
+                len(misses),
+                extra={"locations": list(misses.values())},
+            )
+        geocode = self._rate_limited_geocode() if misses else None
+        for key, name in misses.items():
+            try:
+                with track_upstream("nominatim"):
+                    location_obj = geocode(name, timeout=GEOCODE_TIMEOUT_SECONDS)
+            except Exception as e:
+                # Transient failure: don't cache, the next trip will retry
+                logger.warning("Error geocoding %s: %s", name, e)
+                resolved[key] = None
+                continue
+            coordinates = (
+                (location_obj.latitude, location_obj.longitude)
+                if location_obj
+                else None
+            )
+            self.cache.put(key, name, coordinates)
+            resolved[key] = coordinates
+
+        return {name: resolved.get(key) for name, key in keys.items()}
+
+
+# Global instances
+geocode_cache = GeocodeCache()
+batch_geocoder = BatchGeocoder(geocode_cache)
@@ -0,0 +1,367 @@
+"""
+Token-budgeted conversation history for the agent.
+
+The chat node no longer sends every message of a thread to the model:
+
+- compact_history() (hot path, no I/O) keeps the current turn, then adds
+  earlier turns newest first while they fit HISTORY_TOKEN_BUDGET. Older
+  turns are represented by the thread's rolling summary.
+- After a turn finishes, HistoryCompactor folds every turn older than the
+  last HISTORY_KEEP_TURNS into that summary with a separate LLM call and
+  removes the folded messages from the checkpointed state. The user never
+  waits for it; if the summary lags behind, the budget still holds.
+
+Turns are cut at user messages, so an assistant tool call always travels
+with its tool results. Token counts use tiktoken once preload_encoding() has
+loaded its encoding at startup (tiktoken downloads it on first use) and a
+~4 characters/token estimate until then, or when it cannot be loaded.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import weakref
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from dotenv import load_dotenv
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COMPACTION = os.getenv("HISTORY_COMPACTION", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+# Fold only once this many turns have left the verbatim window
+HISTORY_FOLD_BATCH_TURNS = int(os.getenv("HISTORY_FOLD_BATCH_TURNS", "2"))
+HISTORY_TOKEN_MODEL = os.getenv("HISTORY_TOKEN_MODEL", "gpt-4o-mini")
+
+# Per-message overhead of the chat format (role, separators)
+_MESSAGE_OVERHEAD = 4
+# Long tool payloads are clipped in the transcript given to the summarizer
+_TRANSCRIPT_TOOL_CHARS = 600
+
+SUMMARY_PROMPT = """You maintain the running summary of a conversation between a user and Max, a travel assistant.
+Update the summary with the new messages below. Keep every destination, date, trip name, traveller preference,
+decision and tool outcome (trips created, destinations added) that later turns may rely on. Drop greetings and
+small talk. Answer with the summary only, at most 200 words."""
+
+
+class HistorySummary(NamedTuple):
+    text: str
+    turns: int  # Turns folded into the summary so far
+    tokens: int  # Prompt tokens those turns would have cost verbatim
+
+
+class CompactedHistory(NamedTuple):
+    messages: List[BaseMessage]  # Messages to send after the system prompt
+    tokens_before: int  # History tokens without compaction
+    tokens_after: int  # History tokens actually sent (summary included)
+    dropped_turns: int  # Unsummarized turns left out to stay in budget
+
+
+# tiktoken encoding, set by load_encoding(); None means estimate
+_encoding = None
+
+
+def load_encoding() -> bool:
+    """Load the tiktoken encoding for HISTORY_TOKEN_MODEL, once.
+
+    May download the encoding, so it runs at startup (preload_encoding), never
+    while counting tokens for a request.
+
+    Returns:
+        Whether token counts now use tiktoken
+    """
+    global _encoding
+    if _encoding is not None:
+        return True
+    try:
+        import tiktoken
+
+        _encoding = tiktoken.encoding_for_model(HISTORY_TOKEN_MODEL)
+    except Exception as e:
+        # Offline hosts keep the estimate
+        logger.warning("tiktoken unavailable (%s), estimating tokens", type(e).__name__)
+        return False
+    # Drop the estimates counted before the encoding was there
+    count_tokens.cache_clear()
+    return True
+
+
+def preload_encoding() -> threading.Thread:
+    """Load the tiktoken encoding in a background thread."""
+    thread = threading.Thread(target=load_encoding, name="tiktoken-load", daemon=True)
+    thread.start()
+    return thread
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Tokens in a piece of text (memoized; estimated until tiktoken is loaded)."""
+    if not text:
+        return 0
+    encoding = _encoding
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Prompt tokens of one chat message, tool calls included."""
+    content = message.content if isinstance(message.content, str) else ""
+    tokens = _MESSAGE_OVERHEAD + count_tokens(content)
+    # Only AI messages have tool calls; getattr on the others is slow in pydantic
+    tool_calls = message.tool_calls if isinstance(message, AIMessage) else ()
+    for tool_call in tool_calls:
+        tokens += count_tokens(f"{tool_call['name']}{tool_call['args']}")
+    return tokens
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a user message."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _complete(turn: List[BaseMessage]) -> List[BaseMessage]:
+    # A run cut off mid-turn can leave tool calls without results, which the
+    # API rejects; drop those calls from the prompt
+    answered = {m.tool_call_id for m in turn if isinstance(m, ToolMessage)}
+    return [
+        m
+        for m in turn
+        if not isinstance(m, AIMessage)
+        or not m.tool_calls
+        or all(call["id"] in answered for call in m.tool_calls)
+    ]
+
+
+def summary_message(summary: Optional[HistorySummary]) -> Optional[SystemMessage]:
+    """The rolling summary as a message placed ahead of the verbatim turns."""
+    if summary is None or not summary.text:
+        return None
+    return SystemMessage(
+        content=f"SUMMARY OF EARLIER CONVERSATION ({summary.turns} turns):\n"
+        f"{summary.text}"
+    )
+
+
+def compact_history(
+    messages: Sequence[BaseMessage],
+    summary: Optional[HistorySummary] = None,
+    budget: Optional[int] = None,
+) -> CompactedHistory:
+    """Fit the conversation into a token budget.
+
+    Args:
+        messages: Messages still in the thread state (not yet summarized)
+        summary: Rolling summary of the turns removed from the state
+        budget: Token budget for summary plus verbatim turns (defaults to
+            HISTORY_TOKEN_BUDGET, unlimited when compaction is disabled)
+
+    Returns:
+        CompactedHistory; the current turn is always kept, even over budget
+    """
+    if budget is None:
+        budget = HISTORY_TOKEN_BUDGET if HISTORY_COMPACTION else sys.maxsize
+    turns = [_complete(turn) for turn in split_turns(messages)]
+    turn_tokens = [sum(message_tokens(m) for m in turn) for turn in turns]
+    folded = summary_message(summary)
+    used = message_tokens(folded) if folded else 0
+
+    kept = 0
+    for tokens in reversed(turn_tokens):
+        if kept and used + tokens > budget:
+            break
+        used += tokens
+        kept += 1
+
+    compacted = [m for turn in turns[len(turns) - kept :] for m in turn]
+    if folded:
+        compacted.insert(0, folded)
+    return CompactedHistory(
+        messages=compacted,
+        tokens_before=sum(turn_tokens) + (summary.tokens if summary else 0),
+        tokens_after=used,
+        dropped_turns=len(turns) - kept,
+    )
+
+
+def _transcript(messages: Sequence[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else ""
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {content}")
+        elif isinstance(message, ToolMessage):
+            lines.append(
+                f"Tool {message.name or ''}: {content[:_TRANSCRIPT_TOOL_CHARS]}"
+            )
+        elif isinstance(message, AIMessage):
+            calls = ", ".join(c["name"] for c in message.tool_calls or [])
+            if content:
+                lines.append(f"Max: {content}")
+            if calls:
+                lines.append(f"Max called: {calls}")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """Folds old turns into a thread's rolling summary after each turn.
+
+    Args:
+        llm: Chat model used to write summaries (no tools bound)
+        keep_turns: Most recent turns that always stay verbatim
+        batch_turns: Turns beyond the window that trigger a fold
+    """
+
+    def __init__(
+        self,
+        llm,
+        keep_turns: int = HISTORY_KEEP_TURNS,
+        batch_turns: int = HISTORY_FOLD_BATCH_TURNS,
+    ):
+        self.llm = llm
+        self.keep_turns = keep_turns
+        self.batch_turns = max(1, batch_turns)
+        # One lock per thread: turns and fold updates never interleave
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.dropped_turns = 0
+        self.folds = 0
+        self.folded_turns = 0
+        self.fold_errors = 0
+        self.last_call: Dict[str, int] = {}
+
+    def lock(self, thread_id: str) -> asyncio.Lock:
+        """Lock held while a turn or a fold updates the thread."""
+        lock = self._locks.get(thread_id)
+        if lock is None:
+            lock = self._locks[thread_id] = asyncio.Lock()
+        return lock
+
+    def record(self, system_tokens: int, history: CompactedHistory):
+        """Log and count the prompt size of one model call (a turn with tools
+        makes several)."""
+        before = system_tokens + history.tokens_before
+        after = system_tokens + history.tokens_after
+        self.calls += 1
+        self.tokens_before += before
+        self.tokens_after += after
+        self.dropped_turns += history.dropped_turns
+        self.last_call = {"prompt_tokens_before": before, "prompt_tokens_after": after}
+        logger.info(
+            "Prompt tokens",
+            extra={
+                "prompt_tokens_before": before,
+                "prompt_tokens_after": after,
+                "turns_awaiting_summary": history.dropped_turns,
+            },
+        )
+
+    def foldable(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Messages of the turns that should move into the summary."""
+        turns = split_turns(messages)
+        old = turns[: max(0, len(turns) - self.keep_turns)]
+        if len(old) < self.batch_turns:
+            return []
+        return [m for turn in old for m in turn]
+
+    def schedule(self, app, config: dict):
+        """Fold the thread in the background once the current turn is done."""
+        if not HISTORY_COMPACTION:
+            return
+        thread_id = config["configurable"]["thread_id"]
+        running = self._tasks.get(thread_id)
+        if running is not None and not running.done():
+            return
+        task = asyncio.create_task(self._fold(app, config))
+        self._tasks[thread_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(thread_id, None))
+
+    async def _fold(self, app, config: dict):
+        thread_id = config["configurable"]["thread_id"]
+        try:
+            values = (await app.aget_state(config)).values
+            old = self.foldable(values.get("messages", []))
+            if not old:
+                return
+            previous: Optional[HistorySummary] = values.get("history_summary")
+
+            # The model call happens outside the lock; a new turn may run
+            # meanwhile and simply sees the old summary
+            prompt = SUMMARY_PROMPT
+            if previous:
+                prompt += f"\n\nCURRENT SUMMARY:\n{previous.text}"
+            response = await self.llm.ainvoke(
+                [
+                    SystemMessage(content=prompt),
+                    HumanMessage(content=f"NEW MESSAGES:\n{_transcript(old)}"),
+                ]
+            )
+            turns = len(split_turns(old))
+            summary = HistorySummary(
+                text=response.content.strip(),
+                turns=(previous.turns if previous else 0) + turns,
+                tokens=(previous.tokens if previous else 0)
+                + sum(message_tokens(m) for m in old),
+            )
+
+            async with self.lock(thread_id):
+                await app.aupdate_state(
+                    config,
+                    {
+                        "history_summary": summary,
+                        "messages": [RemoveMessage(id=m.id) for m in old],
+                    },
+                    as_node="chat",
+                )
+            self.folds += 1
+            self.folded_turns += turns
+            logger.info("Folded %d turn(s) of %s into the summary", turns, thread_id)
+        except Exception:
+            self.fold_errors += 1
+            logger.exception("History fold failed for %s", thread_id)
+
+    async def drain(self):
+        """Wait for the background folds that are still running."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Prompt-token totals before/after compaction and fold counters."""
+        return {
+            "model_calls": self.calls,
+            "prompt_tokens_before": self.tokens_before,
+            "prompt_tokens_after": self.tokens_after,
+            "dropped_turns": self.dropped_turns,
+            "folds": self.folds,
+            "folded_turns": self.folded_turns,
+            "fold_errors": self.fold_errors,
+            "running_folds": len(self._tasks),
+            "last_call": self.last_call,
+        }
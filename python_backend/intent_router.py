@@ -0,0 +1,177 @@
+"""
+Rule-based fast path for simple lookups.
+
+"Weather in Tokyo" or "show my trips" normally costs two model calls: one to
+pick the tool and one to phrase its result. IntentRouter recognizes a few
+such requests with strict patterns, so the agent can call the tool directly
+and answer from a template.
+
+Only whole-message matches count: every place named must be recognized by
+extract_locations_from_text, and anything else in the message ("... next
+week", "... and book a hotel") sends the turn to the model as before.
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Dict, NamedTuple, Optional
+from dotenv import load_dotenv
+from metrics import INTENT_ROUTER_TURNS
+from trip_utils import extract_locations_from_text
+from weather_cache import normalize_location
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "true").lower() in ("1", "true", "yes")
+
+_END = r"\s*[?.!]*\s*$"
+_ASK = r"(?:(?:can|could|would)\s+you\s+)?(?:please\s+)?"
+
+_WEATHER_PATTERNS = [
+    # "what's the weather like in Tokyo?", "weather forecast for Paris and Rome"
+    re.compile(
+        rf"^{_ASK}(?:(?:tell\s+me|check)\s+)?"
+        r"(?:(?:what|how)(?:'?s|\s+is)\s+)?(?:the\s+)?(?:current\s+)?"
+        r"weather(?:\s+forecast)?(?:\s+like)?\s+(?:in|for|at)\s+(?P<places>.+?)" + _END,
+        re.IGNORECASE,
+    ),
+    # "Tokyo weather"
+    re.compile(r"^(?P<places>[^?.!]+?)\s+weather(?:\s+forecast)?" + _END, re.I),
+]
+
+_TRIPS_PATTERNS = [
+    # "show me my trips", "can you list all my trips?"
+    re.compile(
+        rf"^{_ASK}(?:show|list|display|give)\s+(?:me\s+)?(?:all\s+)?(?:of\s+)?"
+        r"my\s+trips" + _END,
+        re.IGNORECASE,
+    ),
+    # "what are my trips?", "what trips do I have?", "my trips"
+    re.compile(
+        r"^(?:what\s+(?:are|is)\s+my\s+trips|what\s+trips\s+do\s+i\s+have|my\s+trips)"
+        + _END,
+        re.IGNORECASE,
+    ),
+]
+
+_PLACE_SEPARATORS = re.compile(r"\s*(?:,|&|\band\b)\s*", re.IGNORECASE)
+
+
+class Intent(NamedTuple):
+    name: str  # weather or trips
+    tool: str  # Tool to call
+    args: dict  # Tool arguments (user_id is added by the tool node)
+
+
+def _weather_intent(text: str) -> Optional[Intent]:
+    for pattern in _WEATHER_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            break
+    else:
+        return None
+
+    parts = [p for p in _PLACE_SEPARATORS.split(match.group("places")) if p]
+    found = extract_locations_from_text(text)
+    # Every named part must be a place, and nothing else may be named
+    if not parts or {normalize_location(p) for p in parts} != {
+        normalize_location(place) for place in found
+    }:
+        return None
+    return Intent("weather", "search_weather", {"locations": ", ".join(found)})
+
+
+def _trips_intent(text: str) -> Optional[Intent]:
+    if any(pattern.match(text) for pattern in _TRIPS_PATTERNS):
+        return Intent("trips", "get_trip_details", {})
+    return None
+
+
+class IntentRouter:
+    """Matches simple requests and phrases their tool results.
+
+    Args:
+        enabled: Route at all (defaults to INTENT_ROUTER)
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = INTENT_ROUTER if enabled is None else enabled
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.hits: Dict[str, int] = {}
+        self.fallbacks: Dict[str, int] = {}
+        self.fast_path_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def match(self, text: str) -> Optional[Intent]:
+        """The intent of a message, or None if the model should handle it."""
+        if not self.enabled or not text:
+            return None
+        text = text.strip()
+        return _trips_intent(text) or _weather_intent(text)
+
+    def answer(self, intent: Intent, tool_result: str) -> Optional[str]:
+        """Templated reply for a tool result; None if the result is unusable."""
+        if tool_result.startswith(("Error", "Could not")):
+            return None
+        if intent.name == "weather":
+            places = intent.args["locations"]
+            return (
+                f"Here's the current weather and forecast for {places}:\n{tool_result}"
+            )
+        if intent.name == "trips":
+            if tool_result.startswith("You don't have any trips"):
+                return (
+                    f"{tool_result} Tell me where and when you'd like to go "
+                    "and I'll create one for you."
+                )
+            return f"{tool_result}Want me to add a destination or plan a new trip?"
+        return None
+
+    def record(self, intent: Optional[str], outcome: str, seconds: float = 0.0):
+        """Count one routed turn.
+
+        Args:
+            intent: Matched intent, None when nothing matched
+            outcome: hit, no_match or tool_failed
+            seconds: Time the fast path took (hits only)
+        """
+        INTENT_ROUTER_TURNS.inc(intent or "none", outcome)
+        with self._lock:
+            self.turns += 1
+            if outcome == "hit":
+                self.hits[intent] = self.hits.get(intent, 0) + 1
+                self.fast_path_seconds += seconds
+            else:
+                self.fallbacks[outcome] = self.fallbacks.get(outcome, 0) + 1
+
+    def record_llm_call(self, seconds: float):
+        """Time of a model call, to estimate what the fast path saves."""
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def stats(self) -> dict:
+        """Hit rate per intent and the model time the hits avoided."""
+        with self._lock:
+            hits = sum(self.hits.values())
+            avg_llm = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+            return {
+                "enabled": self.enabled,
+                "turns": self.turns,
+                "hits": hits,
+                "hit_rate": round(hits / self.turns, 3) if self.turns else 0.0,
+                "by_intent": dict(self.hits),
+                "fallbacks": dict(self.fallbacks),
+                "avg_fast_path_ms": (
+                    round(self.fast_path_seconds / hits * 1000, 1) if hits else 0.0
+                ),
+                "avg_llm_call_ms": round(avg_llm * 1000, 1),
+                # A hit replaces a tool-choosing and an answer-writing call
+                "llm_calls_saved": 2 * hits,
+                "estimated_seconds_saved": round(2 * hits * avg_llm, 2),
+            }
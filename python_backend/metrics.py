@@ -0,0 +1,248 @@
+"""
+In-process metrics exposed in the Prometheus text format (GET /metrics).
+
+Counters, gauges and histograms with a fixed set of labels, kept per worker
+process (scrape each worker, or sum them in Prometheus). Recording is a lock
+and a bisect, cheap enough to stay on in production; nothing is formatted
+until a scrape renders the registry.
+
+The metrics the backend records are defined at the bottom of this module.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ContextDecorator
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from a cache hit to a slow model call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _check(self, labels: Tuple[str, ...]):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in values
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. open streams)."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # A fresh timer per decorated call, so concurrent calls don't share it
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds) in cumulative buckets.
+
+    Args:
+        name: Metric name, ending in _seconds for latencies
+        help: One-line description
+        labelnames: Label names; observe() takes the values in this order
+        buckets: Upper bounds, ascending (+Inf is added)
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [per-bucket counts (not cumulative), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        self._check(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager / decorator observing the elapsed time."""
+        self._check(labels)
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(e[0]), e[1]) for labels, e in self._values.items()]
+        lines = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class track_upstream(ContextDecorator):
+    """Time one upstream call; an exception counts as outcome="error".
+
+    Args:
+        upstream: Service name (serpapi, nominatim, ...)
+    """
+
+    def __init__(self, upstream: str):
+        self.upstream = upstream
+
+    def _recreate_cm(self):
+        return track_upstream(self.upstream)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "ok" if exc_type is None else "error"
+        UPSTREAM_SECONDS.observe(
+            time.perf_counter() - self.start, self.upstream, outcome
+        )
+        return False
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# Metrics recorded by the backend
+GRAPH_NODE_SECONDS = Histogram(
+    "agent_graph_node_seconds", "Time spent in each LangGraph node", ["node"]
+)
+LLM_CALL_SECONDS = Histogram(
+    "agent_llm_call_seconds", "Chat model calls made by the chat node"
+)
+TOOL_CALL_SECONDS = Histogram(
+    "agent_tool_call_seconds", "Agent tool executions", ["tool", "outcome"]
+)
+TOOL_TIMEOUTS = Counter(
+    "agent_tool_timeouts_total", "Tool calls abandoned after their timeout", ["tool"]
+)
+INTENT_ROUTER_TURNS = Counter(
+    "agent_intent_router_turns_total",
+    "Turns seen by the intent fast path (outcome: hit, no_match, tool_failed)",
+    ["intent", "outcome"],
+)
+SEARCH_CACHE_REQUESTS = Counter(
+    "search_cache_requests_total",
+    "SerpAPI tool lookups (hit or miss)",
+    ["tool", "result"],
+)
+WEATHER_PREFETCH_LOCATIONS = Counter(
+    "weather_prefetch_locations_total",
+    "Upcoming-trip locations seen by the prefetch job (fetched, fresh, failed)",
+    ["result"],
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_seconds",
+    "Calls to external services (one per attempt)",
+    ["upstream", "outcome"],
+)
+CHAT_STREAM_SECONDS = Histogram(
+    "chat_stream_seconds", "Duration of /chat-trip responses"
+)
+CHAT_FIRST_TOKEN_SECONDS = Histogram(
+    "chat_time_to_first_token_seconds",
+    "From /chat-trip request to the first response frame",
+)
+CHAT_ACTIVE_STREAMS = Gauge("chat_active_streams", "/chat-trip responses in progress")
+CHAT_STREAM_TOKENS = Counter("chat_stream_tokens_total", "Tokens streamed to clients")
@@ -1,7 +1,8 @@
 """
-Pydantic models for type safety and validation.
+Pydantic models for type safety and validation, and typed weather records.
 """
 
+from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
@@ -47,6 +48,7 @@ class ChatRequest(BaseModel):
 
     user_input: str
     user_id: str
+    thread_id: Optional[str] = None  # Defaults to one conversation per user
 
 
 class WeatherRequest(BaseModel):
@@ -55,23 +57,142 @@ class WeatherRequest(BaseModel):
     locations: List[str]
 
 
-class WeatherData(BaseModel):
-    """Weather data model"""
+class TripWeatherItem(BaseModel):
+    """One trip of a batch weather request"""
+
+    trip_id: Optional[str] = None
+    title: Optional[str] = None
+    locations: List[LocationData] = []
+
+
+class TripsWeatherRequest(BaseModel):
+    """Batch trip weather request model"""
+
+    trips: List[TripWeatherItem]
+    user_id: Optional[str] = None
+
+
+class RouteRequest(BaseModel):
+    """Route optimization request model"""
+
+    locations: List[LocationData]
+    keep_start: bool = True  # Keep the first location first
+    round_trip: bool = False  # Come back to the first location at the end
+
+
+class NearbyRequest(BaseModel):
+    """Nearby locations request model: a point (lat/lng) or a place name"""
+
+    user_id: str
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    place: Optional[str] = None
+    radius_km: Optional[float] = None  # Without a radius: the k nearest
+    k: int = 10  # At most this many results
+
+
+class NearbyResult(BaseModel):
+    """One of the user's trip locations near the requested point"""
+
+    name: str
+    lat: float
+    lng: float
+    trip_id: Optional[str] = None
+    trip_title: Optional[str] = None
+    distance_km: float
+
+
+class NearbyResponse(BaseModel):
+    """Nearby locations response model"""
+
+    center: Optional[LocationData] = None
+    results: List[NearbyResult] = []
+    error: Optional[str] = None
+
+
+class RouteResponse(BaseModel):
+    """Route optimization response model"""
+
+    order: List[int] = []  # Indices into the request's locations
+    locations: List[LocationData] = []
+    total_km: float = 0.0
+    original_km: float = 0.0
+    saved_km: float = 0.0
+    unplaced: List[str] = []  # Locations without coordinates, left at the end
+    error: Optional[str] = None
+
+
+# Weather records are slotted dataclasses rather than Pydantic models: one is
+# built per location and forecast day on every lookup and kept in the weather
+# cache, and orjson serializes dataclasses directly (see ORJSONResponse).
+
+
+@dataclass(slots=True)
+class WeatherData:
+    """Current conditions at one location"""
 
     location: str
-    temperature_f: Optional[float] = None
-    temperature_c: Optional[float] = None
+    temperature_f: Optional[int] = None
+    temperature_c: Optional[int] = None
     condition: Optional[str] = None
     humidity: Optional[str] = None
     wind: Optional[str] = None
 
 
-class ForecastDay(BaseModel):
+@dataclass(slots=True)
+class ForecastDay:
     """Forecast day model"""
 
-    day: str
+    day: Optional[str] = None
     condition: Optional[str] = None
-    high_f: Optional[float] = None
-    low_f: Optional[float] = None
-    high_c: Optional[float] = None
-    low_c: Optional[float] = None
+    high_f: Optional[int] = None
+    high_c: Optional[int] = None
+    low_f: Optional[int] = None
+    low_c: Optional[int] = None
+
+
+@dataclass(slots=True)
+class LocationWeather:
+    """Current conditions and forecast for one location"""
+
+    current: WeatherData
+    forecast: List[ForecastDay] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LocationWeather":
+        """Rebuild a record from its JSON form (dataclasses.asdict)."""
+        return cls(
+            WeatherData(**data["current"]),
+            [ForecastDay(**day) for day in data.get("forecast", [])],
+        )
+
+
+@dataclass(slots=True)
+class WeatherResponse:
+    """Weather for a list of locations (/trip-weather, search_weather)"""
+
+    locations: List[LocationWeather] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)  # Missed the deadline
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class TripWeather:
+    """Weather for the locations of one trip of a batch"""
+
+    trip_id: Optional[str] = None
+    title: Optional[str] = None
+    locations: List[LocationWeather] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class TripsWeatherResponse:
+    """Batch trip weather response model (/trips-weather)"""
+
+    trips: List[TripWeather] = field(default_factory=list)
+    requested_locations: int = 0
+    unique_locations: int = 0
+    upstream_calls_saved: int = 0
+    error: Optional[str] = None
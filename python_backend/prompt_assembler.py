@@ -0,0 +1,137 @@
+"""
+Prompt layout that keeps the request prefix identical across calls.
+
+Providers cache prompts by exact prefix (OpenAI from 1024 tokens, in 128-token
+steps), and the tool schemas bound to the model come first. PromptAssembler
+therefore builds the static instructions once and orders every call as:
+
+    [tool schemas] [static instructions] [rolling summary] [turns...] [context]
+
+Everything that varies per user or per call (conversation analysis, the
+user's trips) lives in the trailing context message, so the instructions
+and the already-seen turns stay a reusable prefix. For each call it reports
+how many prompt tokens are shared with the thread's previous call.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from history_compactor import count_tokens, message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Threads whose last prompt is remembered for the prefix metric
+_MAX_THREADS = 1024
+
+
+class AssembledPrompt(NamedTuple):
+    messages: List[BaseMessage]
+    total_tokens: int  # Tool schemas included
+    static_tokens: int  # Tool schemas + instructions
+    stable_tokens: int  # Prefix shared with the thread's previous call
+
+
+def _fingerprint(message: BaseMessage) -> Tuple:
+    return (
+        message.type,
+        message.content if isinstance(message.content, str) else repr(message.content),
+        repr(isinstance(message, AIMessage) and message.tool_calls or ()),
+    )
+
+
+class PromptAssembler:
+    """Builds model inputs with a byte-identical static prefix.
+
+    Args:
+        instructions: System prompt text; must not contain per-call data
+        tools: Tools bound to the model, counted as part of the prefix
+    """
+
+    def __init__(self, instructions: str, tools: Sequence = ()):
+        self.system_message = SystemMessage(content=instructions)
+        self._schemas = json.dumps([convert_to_openai_tool(t) for t in tools])
+        self._lock = threading.Lock()
+        # thread -> message fingerprints of its last prompt
+        self._previous: "OrderedDict[str, List[Tuple]]" = OrderedDict()
+        self.calls = 0
+        self.total_tokens = 0
+        self.stable_tokens = 0
+        self.last_call: dict = {}
+
+    @property
+    def static_tokens(self) -> int:
+        """Tokens of the tool schemas and instructions (memoized by count_tokens)."""
+        return count_tokens(self._schemas) + message_tokens(self.system_message)
+
+    def assemble(
+        self,
+        history: Sequence[BaseMessage],
+        context: Optional[str] = None,
+        thread_id: Optional[str] = None,
+    ) -> AssembledPrompt:
+        """Lay out one model call.
+
+        Args:
+            history: Summary and conversation turns, oldest first
+            context: Per-call data, sent after the conversation
+            thread_id: Conversation the call belongs to (for the metric)
+
+        Returns:
+            AssembledPrompt with the messages and prefix token counts
+        """
+        messages = [self.system_message, *history]
+        if context:
+            messages.append(SystemMessage(content=context))
+
+        fingerprints = [_fingerprint(m) for m in messages]
+        running = []
+        static_tokens = self.static_tokens
+        total = static_tokens - message_tokens(self.system_message)
+        for message in messages:
+            total += message_tokens(message)
+            running.append(total)
+
+        with self._lock:
+            previous = self._previous.pop(thread_id, None) if thread_id else None
+            shared = 0
+            if previous is not None:
+                for mine, theirs in zip(fingerprints, previous):
+                    if mine != theirs:
+                        break
+                    shared += 1
+            # The instructions are shared with every other call as well
+            stable = running[shared - 1] if shared else static_tokens
+            if thread_id:
+                self._previous[thread_id] = fingerprints
+                while len(self._previous) > _MAX_THREADS:
+                    self._previous.popitem(last=False)
+            self.calls += 1
+            self.total_tokens += total
+            self.stable_tokens += stable
+            self.last_call = {"prompt_tokens": total, "stable_prefix_tokens": stable}
+
+        logger.info(
+            "Prompt prefix",
+            extra={"prompt_tokens": total, "stable_prefix_tokens": stable},
+        )
+        return AssembledPrompt(messages, total, static_tokens, stable)
+
+    def stats(self) -> dict:
+        """Share of prompt tokens that repeat a cacheable prefix."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "static_prefix_tokens": self.static_tokens,
+                "prompt_tokens": self.total_tokens,
+                "stable_prefix_tokens": self.stable_tokens,
+                "stable_ratio": (
+                    round(self.stable_tokens / self.total_tokens, 3)
+                    if self.total_tokens
+                    else 0.0
+                ),
+                "last_call": self.last_call,
+            }
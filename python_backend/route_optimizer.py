@@ -0,0 +1,200 @@
+"""
+Visiting order for the stops of a trip.
+
+Builds a haversine distance matrix with NumPy broadcasting, then improves a
+nearest-neighbour tour with 2-opt. Each 2-opt step scores every possible
+segment end for a segment start in one vectorized expression, so a pass is
+n NumPy operations instead of n^2 Python iterations; hundreds of stops take
+milliseconds.
+
+By default the first stop stays first (usually where the traveller arrives)
+and the route does not return to it. Stops without coordinates (0, 0 is what
+a failed geocode leaves behind) are kept at the end in their original order.
+"""
+
+import logging
+from typing import List, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Ignore "improvements" smaller than this (floating point noise), in km
+_MIN_GAIN_KM = 1e-9
+
+
+def haversine_matrix(lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+    """Great-circle distances in km between every pair of points.
+
+    Args:
+        lats: Latitudes in degrees
+        lngs: Longitudes in degrees
+
+    Returns:
+        Symmetric (n, n) matrix with zeros on the diagonal
+    """
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lng = np.radians(np.asarray(lngs, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def route_length(dist: np.ndarray, order: Sequence[int], round_trip=False) -> float:
+    """Length of a route through the stops in the given order."""
+    order = np.asarray(order)
+    if len(order) < 2:
+        return 0.0
+    total = dist[order[:-1], order[1:]].sum()
+    if round_trip:
+        total += dist[order[-1], order[0]]
+    return float(total)
+
+
+def nearest_neighbour(dist: np.ndarray, start: int = 0) -> np.ndarray:
+    """Greedy tour: always go to the closest stop not visited yet."""
+    n = len(dist)
+    order = np.empty(n, dtype=np.intp)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for step in range(n):
+        order[step] = current
+        visited[current] = True
+        if step < n - 1:
+            row = np.where(visited, np.inf, dist[current])
+            current = int(np.argmin(row))
+    return order
+
+
+def two_opt(
+    dist: np.ndarray,
+    order: Sequence[int],
+    keep_start: bool = True,
+    round_trip: bool = False,
+    max_passes: int = 50,
+) -> np.ndarray:
+    """Improve a route by reversing segments while that makes it shorter.
+
+    Args:
+        dist: Symmetric (n, n) distance matrix
+        order: Initial visiting order
+        keep_start: Never move the first stop
+        round_trip: The route returns to its first stop
+        max_passes: Stop after this many passes over all segment starts
+
+    Returns:
+        The improved order
+    """
+    n = len(order)
+    if n < 3:
+        return np.asarray(order, dtype=np.intp)
+
+    # A free end (or start) is modelled as a dummy stop at distance 0 from
+    # everything, so every segment has a stop before and after it
+    dummy = n
+    padded = np.zeros((n + 1, n + 1))
+    padded[:n, :n] = dist
+    order = list(order)
+    if round_trip:
+        path, lo = order + [order[0]], 1
+    elif keep_start:
+        path, lo = order + [dummy], 1
+    else:
+        path, lo = [dummy] + order + [dummy], 1
+    path = np.asarray(path, dtype=np.intp)
+    hi = len(path) - 2  # Last index a segment may end at
+    # edge[k] = length of the leg path[k] -> path[k + 1]
+    edge = padded[path[:-1], path[1:]]
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(lo, hi):
+            # Reverse path[i..j]: legs (i-1, i) and (j, j+1) become
+            # (i-1, j) and (i, j+1); score every j > i at once
+            ends, after = path[i + 1 : hi + 1], path[i + 2 : hi + 2]
+            gain = (
+                edge[i - 1]
+                + edge[i + 1 : hi + 1]
+                - padded[path[i - 1]][ends]
+                - padded[path[i]][after]
+            )
+            best = int(np.argmax(gain))
+            if gain[best] > _MIN_GAIN_KM:
+                j = i + 1 + best
+                path[i : j + 1] = path[i : j + 1][::-1].copy()
+                # Legs inside the segment are the same, in reverse (symmetric)
+                edge[i:j] = edge[i:j][::-1].copy()
+                edge[i - 1] = padded[path[i - 1], path[i]]
+                edge[j] = padded[path[j], path[j + 1]]
+                improved = True
+        if not improved:
+            break
+
+    path = path[path != dummy]
+    return path[:n]
+
+
+def optimize_route(
+    stops: List[dict],
+    keep_start: bool = True,
+    round_trip: bool = False,
+) -> dict:
+    """Suggest a visiting order for a trip's stops.
+
+    Args:
+        stops: Stops with "lat" and "lng" (and any other keys, e.g. name)
+        keep_start: Keep the first stop first
+        round_trip: Score the route as returning to its first stop
+
+    Returns:
+        {"order": indices into stops, "stops": stops in that order,
+        "total_km", "original_km", "saved_km", "unplaced": names of stops
+        without coordinates (appended at the end)}
+    """
+    placed = [
+        i
+        for i, stop in enumerate(stops)
+        if stop.get("lat") is not None
+        and stop.get("lng") is not None
+        and (stop["lat"], stop["lng"]) != (0, 0)
+    ]
+    placed_set = set(placed)
+    unplaced = [i for i in range(len(stops)) if i not in placed_set]
+
+    order: List[int] = placed
+    total = original = 0.0
+    if len(placed) >= 2:
+        dist = haversine_matrix(
+            [stops[i]["lat"] for i in placed], [stops[i]["lng"] for i in placed]
+        )
+        original = route_length(dist, range(len(placed)), round_trip)
+        best = two_opt(
+            dist,
+            nearest_neighbour(dist, start=0),
+            keep_start=keep_start,
+            round_trip=round_trip,
+        )
+        total = route_length(dist, best, round_trip)
+        # Never suggest something worse than what the user already has
+        if total > original:
+            best, total = np.arange(len(placed)), original
+        order = [placed[k] for k in best]
+
+    order += unplaced
+    logger.debug(
+        "Route optimized",
+        extra={"stops": len(stops), "total_km": round(total, 1)},
+    )
+    return {
+        "order": order,
+        "stops": [stops[i] for i in order],
+        "total_km": round(total, 1),
+        "original_km": round(original, 1),
+        "saved_km": round(original - total, 1),
+        "unplaced": [stops[i].get("name", "") for i in unplaced],
+    }
@@ -0,0 +1,301 @@
+"""
+Persistent cache for the SerpAPI search tools.
+
+Queries like "romantic travel recommendations Paris" repeat across users, and
+each one is a paid SerpAPI call of a second or more. SearchCache keeps the
+answers in a local SQLite file, keyed by a hash of the tool, the engine and
+the normalized query, with a TTL per tool.
+
+Only the fields a tool actually reads are stored (e.g. title/rating/address/
+description of the first 5 local_results), which is a few hundred bytes
+instead of the tens of KB of a full SerpAPI payload. Results carrying an
+"error" are never cached.
+
+With SEARCH_CACHE_WARM_TOP > 0, startup refreshes the most requested entries
+that have expired, so the first users after a restart get hits.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from dotenv import load_dotenv
+from serpapi import GoogleSearch
+from metrics import SEARCH_CACHE_REQUESTS, track_upstream
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE = os.getenv("SEARCH_CACHE", "true").lower() in ("1", "true", "yes")
+SEARCH_CACHE_PATH = os.getenv(
+    "SEARCH_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_cache.sqlite3"),
+)
+# Expired entries are kept this long (for warming) before being deleted
+SEARCH_CACHE_KEEP_EXPIRED_SECONDS = float(
+    os.getenv("SEARCH_CACHE_KEEP_EXPIRED_SECONDS", str(30 * 24 * 3600))
+)
+# Expired entries refreshed on startup, most requested first (0 = off)
+SEARCH_CACHE_WARM_TOP = int(os.getenv("SEARCH_CACHE_WARM_TOP", "0"))
+
+
+class SearchSpec(NamedTuple):
+    field: str  # Top-level key of the SerpAPI result the tool reads
+    keys: Optional[Tuple[str, ...]]  # Item keys kept (None = whole items)
+    limit: Optional[int]  # Items kept (None = all)
+    ttl: float  # Seconds an answer stays fresh
+
+
+def _ttl(tool: str, default_hours: float) -> float:
+    return float(
+        os.getenv(f"SEARCH_CACHE_TTL_{tool.upper()}", str(default_hours * 3600))
+    )
+
+
+# What each tool reads from its results, and how long results stay valid
+SEARCH_SPECS: Dict[str, SearchSpec] = {
+    "search_places": SearchSpec(
+        "local_results",
+        ("title", "rating", "address", "description"),
+        5,
+        _ttl("search_places", 7 * 24),
+    ),
+    "search_trip_planning": SearchSpec(
+        "trip_planning", None, None, _ttl("search_trip_planning", 24)
+    ),
+    "get_travel_recommendations": SearchSpec(
+        "organic_results",
+        ("title", "snippet"),
+        5,
+        _ttl("get_travel_recommendations", 3 * 24),
+    ),
+}
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(query.lower().split())
+
+
+def search_key(tool: str, engine: str, query: str) -> str:
+    """Content address of a search; the tool is part of it since projections differ."""
+    text = f"{tool}\n{engine}\n{normalize_query(query)}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def project(spec: SearchSpec, results: dict) -> dict:
+    """Keep only the part of a SerpAPI result the tool reads."""
+    value = results.get(spec.field)
+    if isinstance(value, list):
+        value = value[: spec.limit] if spec.limit else value
+        if spec.keys:
+            value = [
+                {k: item[k] for k in spec.keys if k in item}
+                for item in value
+                if isinstance(item, dict)
+            ]
+    return {spec.field: value} if value is not None else {}
+
+
+class SearchCache:
+    """SQLite-backed cache of projected SerpAPI results.
+
+    Args:
+        path: SQLite file location (":memory:" works for throwaway caches)
+        specs: Projection and TTL per tool
+        enabled: Read and write the cache at all (defaults to SEARCH_CACHE)
+    """
+
+    def __init__(
+        self,
+        path: str = SEARCH_CACHE_PATH,
+        specs: Optional[Dict[str, SearchSpec]] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.path = path
+        self.specs = specs or SEARCH_SPECS
+        self.enabled = SEARCH_CACHE if enabled is None else enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.bytes_saved = 0  # Full payload size minus what was stored
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS searches (
+                    key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    engine TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )""")
+            conn.execute(
+                "DELETE FROM searches WHERE expires_at < ?",
+                (time.time() - SEARCH_CACHE_KEEP_EXPIRED_SECONDS,),
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[dict]:
+        """The cached projection for a key if it is still fresh."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT payload FROM searches WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE searches SET hits = hits + 1 WHERE key = ?", (key,)
+                )
+                conn.commit()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key: str, tool: str, engine: str, query: str, payload: dict) -> int:
+        """Store a projection for the tool's TTL, keeping its request count.
+
+        Returns:
+            Size of the stored payload in bytes
+        """
+        now = time.time()
+        text = json.dumps(payload, separators=(",", ":"))
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                """INSERT INTO searches
+                    (key, tool, engine, query, payload, fetched_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET payload = excluded.payload,
+                    fetched_at = excluded.fetched_at,
+                    expires_at = excluded.expires_at""",
+                (
+                    key,
+                    tool,
+                    engine,
+                    query,
+                    text,
+                    now,
+                    now + self.specs[tool].ttl,
+                ),
+            )
+            conn.commit()
+        return len(text)
+
+    def _fetch(self, tool: str, params: dict) -> dict:
+        """Run the search and store its projection (errors are not cached)."""
+        spec = self.specs[tool]
+        with track_upstream("serpapi"):
+            results = GoogleSearch(params).get_dict()
+        if "error" in results:
+            with self._lock:
+                self.errors += 1
+            return results
+        payload = project(spec, results)
+        if self.enabled:
+            key = search_key(tool, params["engine"], params["q"])
+            stored = self.put(key, tool, params["engine"], params["q"], payload)
+            full = len(json.dumps(results, separators=(",", ":")))
+            with self._lock:
+                self.bytes_saved += full - stored
+        return payload
+
+    def search(self, tool: str, params: dict) -> dict:
+        """SerpAPI results for a tool, from the cache when fresh.
+
+        Args:
+            tool: Name of the calling tool (selects projection and TTL)
+            params: GoogleSearch parameters with at least "q" and "engine"
+
+        Returns:
+            The projected result, or the raw result if SerpAPI reported an error
+        """
+        if self.enabled:
+            key = search_key(tool, params["engine"], params["q"])
+            cached = self.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                SEARCH_CACHE_REQUESTS.inc(tool, "hit")
+                return cached
+        with self._lock:
+            self.misses += 1
+        SEARCH_CACHE_REQUESTS.inc(tool, "miss")
+        return self._fetch(tool, params)
+
+    def warm(self, limit: int = SEARCH_CACHE_WARM_TOP) -> int:
+        """Refresh the most requested expired entries.
+
+        Args:
+            limit: Entries to refresh at most
+
+        Returns:
+            Number of entries refreshed
+        """
+        if not self.enabled or limit <= 0:
+            return 0
+        with self._lock:
+            rows: List[tuple] = (
+                self._connection()
+                .execute(
+                    "SELECT tool, engine, query FROM searches WHERE expires_at <= ? "
+                    "ORDER BY hits DESC LIMIT ?",
+                    (time.time(), limit),
+                )
+                .fetchall()
+            )
+        refreshed = 0
+        for tool, engine, query in rows:
+            if tool not in self.specs:
+                continue
+            params = {
+                "q": query,
+                "engine": engine,
+                "api_key": os.getenv("SERPAPI_API_KEY"),
+            }
+            try:
+                if "error" not in self._fetch(tool, params):
+                    refreshed += 1
+            except Exception:
+                logger.exception("Search cache warm-up failed for %r", query)
+        logger.info("Search cache warmed", extra={"refreshed": refreshed})
+        return refreshed
+
+    def stats(self) -> dict:
+        """Hit/miss counters, entry count and size on disk."""
+        with self._lock:
+            entries, size = (
+                self._connection()
+                .execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM searches"
+                )
+                .fetchone()
+            )
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "payload_bytes": size,
+                "bytes_saved_by_projection": self.bytes_saved,
+            }
+
+
+# Global instance
+search_cache = SearchCache()
@@ -1,82 +1,309 @@
 from serpapi import GoogleSearch
+import logging
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
 from ToolLogger import tool_logger
+from weather_cache import normalize_location, weather_cache
+from metrics import track_upstream
+from models import (
+    ForecastDay,
+    LocationWeather,
+    TripsWeatherResponse,
+    TripWeather,
+    WeatherData,
+    WeatherResponse,
+)
+from services.http_client import run_blocking
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
-def search_weather(query: list[str]) -> dict:
+# Fan-out configuration: how many SerpAPI calls may run at once, how long the
+# whole lookup may take, and how long a single HTTP request may take.
+WEATHER_MAX_WORKERS = int(os.getenv("WEATHER_MAX_WORKERS", "8"))
+WEATHER_DEADLINE_SECONDS = float(os.getenv("WEATHER_DEADLINE_SECONDS", "8"))
+WEATHER_REQUEST_TIMEOUT_SECONDS = float(
+    os.getenv("WEATHER_REQUEST_TIMEOUT_SECONDS", "6")
+)
+
+# Shared across requests so the worker limit is global to the process
+_executor = ThreadPoolExecutor(
+    max_workers=WEATHER_MAX_WORKERS, thread_name_prefix="weather"
+)
+
+
+def _parse_int(value) -> Optional[int]:
+    """SerpAPI temperatures are strings ("68"); parse them once."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _celsius(fahrenheit: Optional[int]) -> Optional[int]:
+    return None if fahrenheit is None else (fahrenheit - 32) * 5 // 9
+
+
+def _parse_weather(location: str, results: dict) -> Optional[LocationWeather]:
+    """Turn a SerpAPI answer_box into a typed current/forecast record."""
+    answer_box = results.get("answer_box", {})
+    if not answer_box or "weather" not in answer_box:
+        return None
+
+    temp_f = _parse_int(answer_box.get("temperature"))
+    current_weather = WeatherData(
+        answer_box.get("location", location),
+        temp_f,
+        _celsius(temp_f),
+        answer_box.get("weather"),
+        answer_box.get("humidity"),
+        answer_box.get("wind"),
+    )
+    forecast_data = []
+    for day_forecast in answer_box.get("forecast", [])[:5]:  # Get up to 5 days
+        temperature = day_forecast.get("temperature", {})
+        high_f = _parse_int(temperature.get("high"))
+        low_f = _parse_int(temperature.get("low"))
+        # Positional: field order is day, condition, high_f/c, low_f/c
+        forecast_data.append(
+            ForecastDay(
+                day_forecast.get("day"),
+                day_forecast.get("weather"),
+                high_f,
+                _celsius(high_f),
+                low_f,
+                _celsius(low_f),
+            )
+        )
+    return LocationWeather(current_weather, forecast_data)
+
+
+def _query_serpapi_weather(location: str) -> Optional[LocationWeather]:
+    """Run a single SerpAPI weather query for one location, bypassing the cache."""
+    weather_query = f"weather {location}"  # Simpler query works better
+    params = {
+        "q": weather_query,
+        "engine": "google",
+        "api_key": os.getenv("SERPAPI_API_KEY"),
+    }
+    search = GoogleSearch(params)
+    search.timeout = WEATHER_REQUEST_TIMEOUT_SECONDS
+    with track_upstream("serpapi"):
+        results = search.get_dict()
+
+    # Log for debugging
+    tool_logger.log_tool_result(
+        tool_name="search_weather",
+        query=weather_query,
+        result=results,
+        success=True,
+    )
+
+    weather = _parse_weather(location, results)
+    if weather is None:
+        logger.warning("No weather answer box for %s", location)
+    return weather
+
+
+def fetch_location_weather(location: str) -> Optional[LocationWeather]:
+    """Get the weather for one location, served from the weather cache when hot.
+
+    Args:
+        location: Location name to search the weather for
+
+    Returns:
+        Parsed weather entry or None if SerpAPI returned no weather answer box
+    """
+    return weather_cache.get_or_fetch(location, _query_serpapi_weather)
+
+
+def refresh_location_weather(
+    location: str, ttl: Optional[float] = None
+) -> Optional[LocationWeather]:
+    """Fetch one location from SerpAPI and store it, even over a stale entry.
+
+    Joins a lookup of the same location already in flight (a user's request or
+    a stale refresh) instead of sending a second SerpAPI request.
+
+    Args:
+        location: Location name to search the weather for
+        ttl: TTL of the new entry (cache default otherwise)
+
+    Returns:
+        Parsed weather entry or None if SerpAPI returned no weather answer box
+    """
+    return weather_cache.refresh(location, _query_serpapi_weather, ttl)
+
+
+def _fan_out(
+    query: List[str], max_workers: Optional[int], deadline: Optional[float]
+) -> Tuple[List[Optional[LocationWeather]], List[str]]:
+    """Fetch every location concurrently until the deadline.
+
+    Returns:
+        Weather per location in input order (None if it failed, had no answer
+        box or timed out) and the locations that timed out
+    """
+    max_workers = max(1, min(max_workers or WEATHER_MAX_WORKERS, WEATHER_MAX_WORKERS))
+    deadline = WEATHER_DEADLINE_SECONDS if deadline is None else deadline
+    expires_at = time.monotonic() + deadline
+
+    futures = [None] * len(query)
+    pending = set()
+    next_index = 0
+
+    # Keep at most max_workers lookups in flight, topping up as they finish
+    while next_index < len(query) or pending:
+        while next_index < len(query) and len(pending) < max_workers:
+            future = _executor.submit(fetch_location_weather, query[next_index])
+            futures[next_index] = future
+            pending.add(future)
+            next_index += 1
+
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            break
+        _, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+    results: List[Optional[LocationWeather]] = []
+    timed_out = []
+    for location, future in zip(query, futures):
+        if future is None or not future.done():
+            if future is not None:
+                future.cancel()
+            timed_out.append(location)
+            results.append(None)
+            continue
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logger.warning("Weather lookup failed for %s: %s", location, e)
+            results.append(None)
+
+    if timed_out:
+        logger.warning("Weather lookup timed out for %s", timed_out)
+    return results, timed_out
+
+
+def _weather_response(
+    weather: List[Optional[LocationWeather]], timed_out: List[str]
+) -> WeatherResponse:
+    weather_data = [entry for entry in weather if entry]
+    if not weather_data:
+        return WeatherResponse(
+            timed_out=timed_out,
+            error="Could not fetch weather data for any locations",
+        )
+    return WeatherResponse(weather_data, timed_out)
+
+
+def search_weather(
+    query: List[str],
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> WeatherResponse:
     """Search the web for the weather in the locations of the trip.
 
+    Locations are fetched concurrently. Whatever finishes before the deadline
+    is returned in input order; locations still pending are listed under
+    "timed_out".
+
     Args:
         query: list[str] - The list of locations to search for weather.
+        max_workers: Maximum number of lookups in flight for this call
+            (defaults to WEATHER_MAX_WORKERS, 1 means sequential).
+        deadline: Seconds to wait for the whole lookup
+            (defaults to WEATHER_DEADLINE_SECONDS).
     """
-    print(
-        f"========================= USING TOOL: Searching for weather in {query} =========================\n"
-    )
-    weather_data = []
-    for location in query:
-        weather_query = f"weather {location}"  # Simpler query works better
-        params = {
-            "q": weather_query,
-            "engine": "google",
-            "api_key": os.getenv("SERPAPI_API_KEY"),
-        }
-        search = GoogleSearch(params)
-        results = search.get_dict()
+    logger.info("Weather lookup", extra={"locations": query})
+    weather, timed_out = _fan_out(query, max_workers, deadline)
+    return _weather_response(weather, timed_out)
 
-        # Log for debugging
-        tool_logger.log_tool_result(
-            tool_name="search_weather",
-            query=weather_query,
-            result=results,
-            success=True,
-        )
 
-        answer_box = results.get("answer_box", {})
-        if answer_box and "weather" in answer_box:
-            temp_f = answer_box.get("temperature")
-            try:
-                temp_c = (int(temp_f) - 32) * 5 // 9
-            except (ValueError, TypeError):
-                temp_c = None
-            current_weather = {
-                "location": answer_box.get("location", location),
-                "temperature_f": temp_f,
-                "temperature_c": temp_c,
-                "condition": answer_box.get("weather"),
-                "humidity": answer_box.get("humidity"),
-                "wind": answer_box.get("wind"),
-            }
-            forecast_data = []
-            forecast_list = answer_box.get("forecast", [])
-            if forecast_list:
-                for day_forecast in forecast_list[:5]:  # Get up to 5 days
-                    forecast_data.append(
-                        {
-                            "day": day_forecast.get("day"),
-                            "condition": day_forecast.get("weather"),
-                            "high_f": day_forecast.get("temperature", {}).get("high"),
-                            "high_c": (
-                                int(day_forecast.get("temperature", {}).get("high"))
-                                - 32
-                            )
-                            * 5
-                            // 9,
-                            "low_f": day_forecast.get("temperature", {}).get("low"),
-                            "low_c": (
-                                int(day_forecast.get("temperature", {}).get("low")) - 32
-                            )
-                            * 5
-                            // 9,
-                        }
-                    )
-            weather_data.append({"current": current_weather, "forecast": forecast_data})
+def search_trips_weather(
+    trips: List[dict],
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> TripsWeatherResponse:
+    """Weather for several trips, looking up each distinct location once.
+
+    Locations are normalized ("Paris, France " and "paris france" are one
+    lookup) and deduplicated across all trips, fetched in a single concurrent
+    fan-out, then fanned back out to every trip that names them.
+
+    Args:
+        trips: Trips with "locations" (list of names) and optionally
+            trip_id and title, which are echoed back
+        max_workers: Maximum number of lookups in flight
+        deadline: Seconds to wait for the whole batch
+
+    Returns:
+        The trips in input order, each with its locations (or error) and
+        timed_out as search_weather returns them, plus the requested/unique
+        location counts and the upstream calls saved
+    """
+    unique: Dict[str, str] = {}  # Normalized key -> first spelling seen
+    trip_keys: List[List[Tuple[str, str]]] = []
+    for trip in trips:
+        names = [n.strip() for n in trip.get("locations", []) if n and n.strip()]
+        keys = [(name, normalize_location(name)) for name in names]
+        for name, key in keys:
+            unique.setdefault(key, name)
+        trip_keys.append(keys)
+
+    requested = sum(len(keys) for keys in trip_keys)
+    logger.info(
+        "Trips weather lookup",
+        extra={"trips": len(trips), "requested": requested, "unique": len(unique)},
+    )
+    weather, timed_out = _fan_out(list(unique.values()), max_workers, deadline)
+    by_key = dict(zip(unique, weather))
+    timed_out_keys = {normalize_location(name) for name in timed_out}
+
+    results = []
+    for trip, keys in zip(trips, trip_keys):
+        result = TripWeather(trip.get("trip_id"), trip.get("title"))
+        if not keys:
+            result.error = "No locations provided"
         else:
-            print(f"No answer_box with weather found for {location}")
+            trip_timed_out = [name for name, key in keys if key in timed_out_keys]
+            response = _weather_response(
+                [by_key[key] for _, key in keys], trip_timed_out
+            )
+            result.locations = response.locations
+            result.timed_out = response.timed_out
+            result.error = response.error
+        results.append(result)
+
+    return TripsWeatherResponse(
+        trips=results,
+        requested_locations=requested,
+        unique_locations=len(unique),
+        upstream_calls_saved=requested - len(unique),
+    )
+
+
+async def search_weather_async(
+    query: List[str],
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> WeatherResponse:
+    """Awaitable search_weather for async endpoints.
+
+    The SerpAPI client library is synchronous, so the lookup runs on the shared
+    blocking pool instead of the event loop.
+    """
+    return await run_blocking(search_weather, query, max_workers, deadline)
 
-    if not weather_data:
-        return {"error": "Could not fetch weather data for any locations"}
 
-    return {"locations": weather_data}
+async def search_trips_weather_async(
+    trips: List[dict],
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> TripsWeatherResponse:
+    """Awaitable search_trips_weather for async endpoints."""
+    return await run_blocking(search_trips_weather, trips, max_workers, deadline)
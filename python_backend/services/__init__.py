@@ -2,6 +2,32 @@
 Services package for business logic layer.
 """
 
+from .http_client import (
+    anextjs_request,
+    close_async_client,
+    get_async_client,
+    http_stats,
+    nextjs_request,
+    run_blocking,
+)
 from .trip_service import TripService
+from .trip_snapshot import (
+    TripSnapshot,
+    invalidate_user_trips,
+    load_user_trips,
+    use_trip_snapshot,
+)
 
-__all__ = ["TripService"]
+__all__ = [
+    "TripService",
+    "TripSnapshot",
+    "load_user_trips",
+    "invalidate_user_trips",
+    "use_trip_snapshot",
+    "get_async_client",
+    "close_async_client",
+    "run_blocking",
+    "nextjs_request",
+    "anextjs_request",
+    "http_stats",
+]
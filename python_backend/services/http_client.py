@@ -0,0 +1,245 @@
+"""
+Shared HTTP plumbing for calls to the Next.js API and other upstreams.
+
+Async endpoints must never block the event loop: one slow upstream call would
+stall every other user's token stream. Network calls made from async code go
+through the pooled async client below. Anything that is still synchronous
+(the SerpAPI client library, LangChain tools) is pushed onto a dedicated,
+bounded thread pool with run_blocking().
+
+Synchronous callers (agent tools, TripService) use nextjs_request(), which
+reuses keep-alive connections from one pooled requests.Session, applies
+per-endpoint timeouts, retries idempotent calls with jittered backoff and
+records per-endpoint latency.
+"""
+
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from metrics import UPSTREAM_SECONDS
+
+load_dotenv()
+
+NEXTJS_API_BASE = os.getenv("NEXTJS_API_BASE", "http://localhost:3000")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.2"))
+BLOCKING_MAX_WORKERS = int(os.getenv("BLOCKING_MAX_WORKERS", "32"))
+
+# Per-endpoint timeouts in seconds; the longest matching path prefix wins
+ENDPOINT_TIMEOUTS = {
+    "/api/ai/trips/create": 15.0,
+    "/api/ai/trips": 5.0,
+    "/api/trips": 10.0,
+}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+
+T = TypeVar("T")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_async_client: Optional[httpx.AsyncClient] = None
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_MAX_WORKERS, thread_name_prefix="blocking-io"
+)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled async HTTP client (created on first use)."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """Close the shared async client; called on application shutdown."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run synchronous code off the event loop and await its result.
+
+    Args:
+        func: Blocking callable (HTTP via requests, SerpAPI, geocoding, ...)
+        *args, **kwargs: Arguments forwarded to func
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _blocking_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+class _EndpointStats:
+    __slots__ = ("count", "errors", "retries", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+
+_stats: Dict[str, _EndpointStats] = {}
+_stats_lock = threading.Lock()
+
+
+def record_latency(endpoint: str, seconds: float, ok: bool = True):
+    """Record one upstream call (one attempt) for an endpoint."""
+    UPSTREAM_SECONDS.observe(seconds, "nextjs", "ok" if ok else "error")
+    with _stats_lock:
+        stats = _stats.get(endpoint)
+        if stats is None:
+            stats = _stats[endpoint] = _EndpointStats()
+        stats.count += 1
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        if not ok:
+            stats.errors += 1
+
+
+def _record_retry(endpoint: str):
+    with _stats_lock:
+        _stats[endpoint].retries += 1
+
+
+def http_stats() -> dict:
+    """Per-endpoint call counts, errors, retries and latency."""
+    with _stats_lock:
+        return {
+            endpoint: {
+                "count": stats.count,
+                "errors": stats.errors,
+                "retries": stats.retries,
+                "avg_ms": round(stats.total_seconds / stats.count * 1000, 1),
+                "max_ms": round(stats.max_seconds * 1000, 1),
+            }
+            for endpoint, stats in _stats.items()
+        }
+
+
+def endpoint_timeout(path: str) -> float:
+    """Timeout for a Next.js API path (longest configured prefix wins)."""
+    matches = [prefix for prefix in ENDPOINT_TIMEOUTS if path.startswith(prefix)]
+    if not matches:
+        return HTTP_TIMEOUT_SECONDS
+    return ENDPOINT_TIMEOUTS[max(matches, key=len)]
+
+
+def _backoff_delay(attempt: int) -> float:
+    # Full jitter: spread retries so callers don't hammer Next.js in lockstep
+    return random.uniform(0, HTTP_BACKOFF_SECONDS * (2**attempt))
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled requests.Session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=HTTP_MAX_KEEPALIVE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def nextjs_request(
+    method: str,
+    path: str,
+    endpoint: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> requests.Response:
+    """Call the Next.js API over the shared keep-alive session.
+
+    Idempotent methods are retried on connection errors, timeouts and
+    502/503/504 responses with jittered exponential backoff.
+
+    Args:
+        method: HTTP method
+        path: API path, e.g. "/api/ai/trips"
+        endpoint: Label for latency stats when the path contains ids
+            (defaults to path)
+        timeout: Override for the per-endpoint timeout
+        **kwargs: Forwarded to requests (params, json, ...)
+
+    Returns:
+        The final response; the last exception is raised if every attempt failed
+    """
+    endpoint = endpoint or path
+    timeout = timeout or endpoint_timeout(path)
+    attempts = 1 + (HTTP_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0)
+
+    for attempt in range(attempts):
+        start = time.perf_counter()
+        try:
+            response = get_session().request(
+                method, f"{NEXTJS_API_BASE}{path}", timeout=timeout, **kwargs
+            )
+        except requests.RequestException:
+            record_latency(endpoint, time.perf_counter() - start, ok=False)
+            if attempt + 1 >= attempts:
+                raise
+        else:
+            record_latency(
+                endpoint, time.perf_counter() - start, ok=response.status_code < 500
+            )
+            if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                return response
+        _record_retry(endpoint)
+        time.sleep(_backoff_delay(attempt))
+
+
+async def anextjs_request(
+    method: str,
+    path: str,
+    endpoint: Optional[str] = None,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> httpx.Response:
+    """Async counterpart of nextjs_request using the pooled async client."""
+    endpoint = endpoint or path
+    timeout = timeout or endpoint_timeout(path)
+    attempts = 1 + (HTTP_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0)
+
+    for attempt in range(attempts):
+        start = time.perf_counter()
+        try:
+            response = await get_async_client().request(
+                method, f"{NEXTJS_API_BASE}{path}", timeout=timeout, **kwargs
+            )
+        except httpx.HTTPError:
+            record_latency(endpoint, time.perf_counter() - start, ok=False)
+            if attempt + 1 >= attempts:
+                raise
+        else:
+            record_latency(
+                endpoint, time.perf_counter() - start, ok=response.status_code < 500
+            )
+            if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                return response
+        _record_retry(endpoint)
+        await asyncio.sleep(_backoff_delay(attempt))
@@ -3,62 +3,122 @@ Service layer for trip-related operations.
 Handles communication with Next.js API for trip data.
 """
 
-import os
-import requests
-from typing import Optional
-from dotenv import load_dotenv
+import logging
+from typing import List, Optional
+from .http_client import anextjs_request, nextjs_request
 
-load_dotenv()
-
-NEXTJS_API_BASE = os.getenv("NEXTJS_API_BASE", "http://localhost:3000")
+logger = logging.getLogger(__name__)
 
 
 class TripService:
     """Service for trip data operations"""
 
     @staticmethod
-    def fetch_user_trips(user_id: str) -> Optional[str]:
+    def format_trips_context(trips: Optional[List[dict]]) -> Optional[str]:
         """
-        Fetch user trips and format as context string for the AI.
+        Format trips as a context string for the AI.
+
+        Args:
+            trips: Trips as returned by /api/ai/trips
+
+        Returns:
+            Formatted string of trip data or None if there are no trips
+        """
+        if not trips:
+            return None
+
+        # Format trips for AI context
+        trips_text = f"You have {len(trips)} trip(s):\n\n"
+        for i, trip in enumerate(trips, 1):
+            trips_text += f"{i}. {trip['title']}\n"
+            trips_text += f"   Description: {trip['description']}\n"
+            trips_text += (
+                f"   Dates: {trip['startDate'][:10]} to {trip['endDate'][:10]}\n"
+            )
+            if trip.get("locations"):
+                location_names = [loc["name"] for loc in trip["locations"]]
+                trips_text += f"   Locations: {', '.join(location_names)}\n"
+            trips_text += "\n"
+
+        return trips_text
+
+    @staticmethod
+    def fetch_trips(user_id: str) -> Optional[List[dict]]:
+        """
+        Fetch the user's trips as returned by /api/ai/trips.
+
+        Blocking; async endpoints should use afetch_trips instead.
 
         Args:
             user_id: The user's ID
 
         Returns:
-            Formatted string of trip data or None if error
+            List of trips (possibly empty) or None if error
         """
         try:
-            response = requests.get(
-                f"{NEXTJS_API_BASE}/api/ai/trips",
-                params={"userId": user_id},
-                timeout=5,
+            response = nextjs_request(
+                "GET", "/api/ai/trips", params={"userId": user_id}
             )
 
             if response.status_code != 200:
-                print(f"Error fetching trips: {response.status_code}")
+                logger.warning("Error fetching trips: %s", response.status_code)
                 return None
 
-            data = response.json()
-            trips = data.get("trips", [])
+            return response.json().get("trips", [])
+
+        except Exception:
+            logger.exception("fetch_trips failed")
+            return None
+
+    @staticmethod
+    async def afetch_trips(user_id: str) -> Optional[List[dict]]:
+        """
+        Async version of fetch_trips using the shared pooled client.
+
+        Args:
+            user_id: The user's ID
+
+        Returns:
+            List of trips (possibly empty) or None if error
+        """
+        try:
+            response = await anextjs_request(
+                "GET", "/api/ai/trips", params={"userId": user_id}
+            )
 
-            if not trips:
+            if response.status_code != 200:
+                logger.warning("Error fetching trips: %s", response.status_code)
                 return None
 
-            # Format trips for AI context
-            trips_text = f"You have {len(trips)} trip(s):\n\n"
-            for i, trip in enumerate(trips, 1):
-                trips_text += f"{i}. {trip['title']}\n"
-                trips_text += f"   Description: {trip['description']}\n"
-                trips_text += (
-                    f"   Dates: {trip['startDate'][:10]} to {trip['endDate'][:10]}\n"
-                )
-                if trip.get("locations"):
-                    location_names = [loc["name"] for loc in trip["locations"]]
-                    trips_text += f"   Locations: {', '.join(location_names)}\n"
-                trips_text += "\n"
-
-            return trips_text
-
-        except Exception as e:
-            print(f"Error in fetch_user_trips: {e}")
+            return response.json().get("trips", [])
+
+        except Exception:
+            logger.exception("afetch_trips failed")
             return None
+
+    @staticmethod
+    def fetch_user_trips(user_id: str) -> Optional[str]:
+        """
+        Fetch user trips and format as context string for the AI.
+
+        Args:
+            user_id: The user's ID
+
+        Returns:
+            Formatted string of trip data or None if error
+        """
+        return TripService.format_trips_context(TripService.fetch_trips(user_id))
+
+    @staticmethod
+    async def afetch_user_trips(user_id: str) -> Optional[str]:
+        """
+        Async version of fetch_user_trips.
+
+        Args:
+            user_id: The user's ID
+
+        Returns:
+            Formatted string of trip data or None if error
+        """
+        trips = await TripService.afetch_trips(user_id)
+        return TripService.format_trips_context(trips)
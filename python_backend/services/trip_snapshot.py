@@ -0,0 +1,81 @@
+"""
+Request-scoped snapshot of a user's trips.
+
+/chat-trip fetches the user's trips once and carries them through the agent
+loop in AgentState. Tools read trips from the snapshot instead of calling
+/api/ai/trips again; tools that create or change trips invalidate it so the
+next read refetches once.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from .trip_service import TripService
+
+
+class TripSnapshot:
+    """Trips of one user, fetched at most once per invalidation.
+
+    Args:
+        user_id: Owner of the trips
+        trips: Already fetched trips, or None to fetch lazily on first read
+    """
+
+    def __init__(self, user_id: str, trips: Optional[List[dict]] = None):
+        self.user_id = user_id
+        self._trips = trips
+        self._lock = threading.Lock()
+        self.fetch_count = 0
+
+    def get_trips(self) -> Optional[List[dict]]:
+        """Return the user's trips, fetching them if the snapshot is empty.
+
+        Returns:
+            List of trips, or None if they could not be fetched
+        """
+        with self._lock:
+            if self._trips is None:
+                self._trips = TripService.fetch_trips(self.user_id)
+                self.fetch_count += 1
+            return self._trips
+
+    def invalidate(self):
+        """Forget the cached trips after a mutation."""
+        with self._lock:
+            self._trips = None
+
+
+# Snapshot of the agent run currently executing tools (set by CustomToolNode)
+_current_snapshot: ContextVar[Optional[TripSnapshot]] = ContextVar(
+    "trip_snapshot", default=None
+)
+
+
+@contextmanager
+def use_trip_snapshot(snapshot: Optional[TripSnapshot]):
+    """Make a snapshot visible to load_user_trips() for the duration of a block."""
+    token = _current_snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _current_snapshot.reset(token)
+
+
+def load_user_trips(user_id: str) -> Optional[List[dict]]:
+    """Trips for a user, from the active snapshot when it belongs to that user.
+
+    Returns:
+        List of trips, or None if they could not be fetched
+    """
+    snapshot = _current_snapshot.get()
+    if snapshot is not None and snapshot.user_id == user_id:
+        return snapshot.get_trips()
+    return TripService.fetch_trips(user_id)
+
+
+def invalidate_user_trips(user_id: str):
+    """Invalidate the active snapshot after the user's trips changed."""
+    snapshot = _current_snapshot.get()
+    if snapshot is not None and snapshot.user_id == user_id:
+        snapshot.invalidate()
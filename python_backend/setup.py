@@ -1,16 +1,73 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from agent import generate_ai_response_stream_async
-from models import ChatRequest, WeatherRequest
-from services.trip_service import TripService
-from search_weather import search_weather
-import json
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from agent_loader import AGENT_WARMUP, agent_loader
+from models import (
+    ChatRequest,
+    LocationData,
+    NearbyRequest,
+    NearbyResponse,
+    NearbyResult,
+    RouteRequest,
+    RouteResponse,
+    TripsWeatherRequest,
+    TripsWeatherResponse,
+    WeatherRequest,
+    WeatherResponse,
+)
+from services import (
+    TripService,
+    TripSnapshot,
+    close_async_client,
+    http_stats,
+    run_blocking,
+)
+from search_weather import search_trips_weather_async, search_weather_async
+from weather_cache import weather_cache
+from weather_prefetch import weather_prefetcher
+from app_logging import RequestIdMiddleware, setup_logging
+from sse_writer import sse_writer
+from search_cache import SEARCH_CACHE_WARM_TOP, search_cache
+import metrics
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+async def generate_ai_response_stream_async(**kwargs):
+    """The agent's token stream; loads the agent on first use."""
+    agent = await agent_loader.get()
+    async for token in agent.generate_ai_response_stream_async(**kwargs):
+        yield token
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the agent now (AGENT_WARMUP=startup) or alongside serving
+    warmup = agent_loader.warm()
+    if warmup is not None and AGENT_WARMUP == "startup":
+        await warmup
+    # Refresh popular expired search results without delaying startup
+    if SEARCH_CACHE_WARM_TOP > 0:
+        search_warmup = asyncio.ensure_future(run_blocking(search_cache.warm))
+        search_warmup.add_done_callback(lambda t: t.cancelled() or t.exception())
+    # Prefetch weather for upcoming trips (one job at a time across workers)
+    prefetch = asyncio.ensure_future(weather_prefetcher.run())
+    yield
+    prefetch.cancel()
+    # Release pooled upstream connections on shutdown
+    await close_async_client()
+
 
 app = FastAPI(
     title="Travel Planner AI API",
     description="AI-powered travel planning assistant API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -23,6 +80,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tag every log record of a request with its id (X-Request-ID)
+app.add_middleware(RequestIdMiddleware)
+
 
 @app.post("/chat-trip", summary="Chat with AI travel assistant")
 async def chat_trip(request: ChatRequest):
@@ -30,80 +90,256 @@ async def chat_trip(request: ChatRequest):
     Stream chat responses from the AI travel assistant.
     Fetches user's trip data and passes it as context to the AI.
     """
-    print(f"\n{'='*80}")
-    print(f"🌐 FASTAPI CHAT ENDPOINT HIT")
-    print(f"User ID: {request.user_id}")
-    print(f"User input: '{request.user_input}'")
-    print(f"{'='*80}")
+    started = time.perf_counter()
+    logger.info("Chat request", extra={"user_id": request.user_id})
+    weather_prefetcher.note_user(request.user_id)
 
     # Fetch user's trips using the service layer
-    print(f"FETCHING USER TRIPS...")
-    user_trips_data = TripService.fetch_user_trips(request.user_id)
-    print(f"USER TRIPS DATA: {bool(user_trips_data)}")
-    if user_trips_data:
-        print(f"RIPS PREVIEW: {user_trips_data[:200]}...")
-
-    async def generate_stream():
-        try:
-            print(f"STARTING STREAM GENERATION...")
-            async for token in generate_ai_response_stream_async(
-                user_input=request.user_input,
-                user_id=request.user_id,
-                user_trips=user_trips_data,
-            ):
-                if token:  # Ensure we don't send empty data
-                    print(f"STREAMING TOKEN: '{token}'")
-                    yield f"data: {json.dumps({'ai_response': token})}\n\n"
-        except Exception as e:
-            print(f"STREAM ERROR: {e}")
-            import traceback
-
-            traceback.print_exc()
-            yield f"data: {json.dumps({'ai_response': f'Error: {e}'})}\n\n"
-
-    return StreamingResponse(generate_stream(), media_type="text/event-stream")
-
-
-@app.post("/trip-weather", summary="Get weather for trip locations")
+    # One fetch serves the whole agent loop; tools read from the snapshot
+    trips = await TripService.afetch_trips(request.user_id)
+    trip_snapshot = TripSnapshot(request.user_id, trips)
+    user_trips_data = TripService.format_trips_context(trips)
+    logger.debug("User trips: %s", user_trips_data)
+
+    tokens = generate_ai_response_stream_async(
+        user_input=request.user_input,
+        user_id=request.user_id,
+        user_trips=user_trips_data,
+        trip_snapshot=trip_snapshot,
+        thread_id=request.thread_id,
+    )
+    # Tokens are coalesced into frames; heartbeats keep idle streams open
+    return StreamingResponse(
+        sse_writer.stream(tokens, started=started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Weather records are dataclasses that orjson encodes directly; returning the
+# response skips FastAPI's generic encoder (response_model documents the shape)
+@app.post(
+    "/trip-weather",
+    summary="Get weather for trip locations",
+    response_model=WeatherResponse,
+    response_class=ORJSONResponse,
+)
 async def get_trip_weather(request: dict):
     """
     Get weather information for all locations in a trip.
     """
-    print(f"Received trip weather request: {request}")
-
     try:
+        weather_prefetcher.note_user(request.get("user_id"))
         # Extract location names from the request
         locations = request.get("locations", [])
-        print(f"Locations received: {locations}")
 
         if not locations:
-            print("No locations provided in request")
-            return {"error": "No locations provided"}
+            logger.warning("No locations provided in trip weather request")
+            return ORJSONResponse(WeatherResponse(error="No locations provided"))
 
         # Convert to list of location names
         location_names = [loc.get("name", "") for loc in locations if loc.get("name")]
-        print(f"Location names extracted: {location_names}")
-
         if not location_names:
-            print("No valid location names found")
-            return {"error": "No valid location names found"}
+            logger.warning("No valid location names in trip weather request")
+            return ORJSONResponse(
+                WeatherResponse(error="No valid location names found")
+            )
 
         # Get weather data
-        print(f"Calling search_weather with: {location_names}")
-        weather_data = search_weather(location_names)
-        print(f"Weather data received: {weather_data}")
+        logger.info("Trip weather", extra={"locations": location_names})
+        weather_data = await search_weather_async(location_names)
+        logger.debug("Weather data: %s", weather_data)
 
-        return weather_data
+        return ORJSONResponse(weather_data)
+
+    except Exception as e:
+        logger.exception("Trip weather failed")
+        return ORJSONResponse(
+            WeatherResponse(error=f"Failed to fetch weather: {str(e)}")
+        )
+
+
+@app.post(
+    "/trips-weather",
+    summary="Get weather for many trips at once",
+    response_model=TripsWeatherResponse,
+    response_class=ORJSONResponse,
+)
+async def get_trips_weather(request: TripsWeatherRequest):
+    """
+    Get weather for the locations of several trips in one call.
+    Each distinct location is looked up once and shared by every trip naming it.
+    """
+    weather_prefetcher.note_user(request.user_id)
+    trips = [
+        {
+            "trip_id": trip.trip_id,
+            "title": trip.title,
+            "locations": [loc.name for loc in trip.locations],
+        }
+        for trip in request.trips
+    ]
+    if not trips:
+        return ORJSONResponse(TripsWeatherResponse(error="No trips provided"))
+    try:
+        return ORJSONResponse(await search_trips_weather_async(trips))
+    except Exception as e:
+        logger.exception("Trips weather failed")
+        return ORJSONResponse(
+            TripsWeatherResponse(error=f"Failed to fetch weather: {str(e)}")
+        )
+
+
+@app.post(
+    "/optimize-route",
+    summary="Suggest a visiting order for trip locations",
+    response_model=RouteResponse,
+)
+async def optimize_route_endpoint(request: RouteRequest):
+    """
+    Reorder a trip's locations to shorten the distance travelled between them.
+    Locations without coordinates are kept at the end.
+    """
+    if not request.locations:
+        return RouteResponse(error="No locations provided")
+    # Imported here so NumPy is only loaded once a route is requested
+    from route_optimizer import optimize_route
 
+    try:
+        result = await run_blocking(
+            optimize_route,
+            [loc.model_dump() for loc in request.locations],
+            request.keep_start,
+            request.round_trip,
+        )
     except Exception as e:
-        print(f"Error in trip-weather endpoint: {e}")
-        import traceback
+        logger.exception("Route optimization failed")
+        return RouteResponse(error=f"Failed to optimize route: {str(e)}")
+    return RouteResponse(
+        order=result["order"],
+        locations=result["stops"],
+        total_km=result["total_km"],
+        original_km=result["original_km"],
+        saved_km=result["saved_km"],
+        unplaced=result["unplaced"],
+    )
+
+
+@app.post(
+    "/nearby",
+    summary="Find the user's trip locations near a point or place",
+    response_model=NearbyResponse,
+)
+async def get_nearby(request: NearbyRequest):
+    """
+    The user's trip locations within radius_km of a point (or place name),
+    or the k nearest ones when no radius is given. Closest first.
+    """
+    # Imported here so NumPy is only loaded once a lookup is requested
+    from spatial_index import resolve_place, spatial_index
+
+    if request.place:
+        coordinates = await run_blocking(resolve_place, request.place)
+        if coordinates is None:
+            return NearbyResponse(error=f"Could not find '{request.place}'")
+    elif request.lat is not None and request.lng is not None:
+        coordinates = (request.lat, request.lng)
+    else:
+        return NearbyResponse(error="Provide lat and lng, or a place")
+    lat, lng = coordinates
+
+    index = spatial_index.get(request.user_id)
+    if index is None:
+        trips = await TripService.afetch_trips(request.user_id)
+        if trips is None:
+            return NearbyResponse(error="Failed to fetch trips")
+        index = await run_blocking(spatial_index.build, request.user_id, trips)
+
+    if request.radius_km is not None:
+        found = index.within(lat, lng, request.radius_km, limit=request.k)
+    else:
+        found = index.nearest(lat, lng, request.k)
+    return NearbyResponse(
+        center=LocationData(name=request.place or "", lat=lat, lng=lng),
+        results=[
+            NearbyResult(**location._asdict(), distance_km=distance_km)
+            for location, distance_km in found
+        ],
+    )
+
+
+@app.get("/weather-cache/stats", summary="Weather cache counters")
+async def get_weather_cache_stats():
+    """Hit/miss/eviction counters for the in-memory weather cache"""
+    return weather_cache.stats()
+
+
+@app.get("/weather-prefetch/stats", summary="Weather prefetch stats")
+async def get_weather_prefetch_stats():
+    """Prefetch jobs run or skipped by this worker, locations fetched and imported"""
+    return weather_prefetcher.stats()
+
+
+@app.get("/spatial-index/stats", summary="Per-user spatial index stats")
+async def get_spatial_index_stats():
+    """Indexes built, served and updated in place, and points held"""
+    from spatial_index import spatial_index
+
+    return spatial_index.stats()
+
+
+@app.get("/search-cache/stats", summary="SerpAPI search cache stats")
+async def get_search_cache_stats():
+    """Hits, misses, entries and bytes kept by the SerpAPI search cache"""
+    return await run_blocking(search_cache.stats)
+
+
+@app.get("/http-client/stats", summary="Upstream HTTP call stats")
+async def get_http_client_stats():
+    """Per-endpoint call counts, errors, retries and latency for Next.js calls"""
+    return http_stats()
+
+
+@app.get("/history/stats", summary="Prompt history compaction stats")
+async def get_history_stats():
+    """Prompt tokens before/after compaction and background summary counters"""
+    agent = await agent_loader.get()
+    return agent.history_compactor.stats()
+
+
+@app.get("/prompt/stats", summary="Prompt prefix cache-friendliness")
+async def get_prompt_stats():
+    """Prompt tokens per model call that repeat the thread's previous prefix"""
+    agent = await agent_loader.get()
+    return agent.prompt_assembler.stats()
+
+
+@app.get("/router/stats", summary="Intent fast path stats")
+async def get_router_stats():
+    """Turns answered without the model, per intent, and the model time saved"""
+    agent = await agent_loader.get()
+    return agent.intent_router.stats()
+
+
+@app.get("/sse/stats", summary="Chat stream framing stats")
+async def get_sse_stats():
+    """Tokens in, frames/heartbeats/bytes out of the chat stream writer"""
+    return sse_writer.stats()
+
 
-        traceback.print_exc()
-        return {"error": f"Failed to fetch weather: {str(e)}"}
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Graph node, tool, upstream and chat stream metrics of this worker"""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.get("/health", summary="Health check")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "Travel Planner AI API"}
+    """Health check endpoint; never waits for the agent"""
+    return {
+        "status": "healthy",
+        "service": "Travel Planner AI API",
+        "agent": agent_loader.state,
+    }
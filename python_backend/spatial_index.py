@@ -0,0 +1,348 @@
+"""
+Per-user spatial index over trip locations for "near me / near X" queries.
+
+Each user's locations are bucketed in a lat/lng grid of SPATIAL_INDEX_CELL_DEG
+degree cells. A radius query only looks at the cells overlapping the circle's
+bounding box and computes exact great-circle distances for those candidates
+with NumPy; k-nearest runs radius queries over a growing radius. Thousands of
+points answer in well under a millisecond.
+
+An index is built from the user's trips on first use and kept for
+SPATIAL_INDEX_TTL_SECONDS. create_trip and add_destination_to_trip add their
+locations to it in place; changes made elsewhere (the trip pages) are picked
+up when it expires.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from route_optimizer import EARTH_RADIUS_KM
+from gazetteer import gazetteer
+from geocode_cache import batch_geocoder
+
+load_dotenv()
+
+SPATIAL_INDEX_CELL_DEG = float(os.getenv("SPATIAL_INDEX_CELL_DEG", "1.0"))
+SPATIAL_INDEX_TTL_SECONDS = float(os.getenv("SPATIAL_INDEX_TTL_SECONDS", "300"))
+SPATIAL_INDEX_MAX_USERS = int(os.getenv("SPATIAL_INDEX_MAX_USERS", "1024"))
+
+_KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180
+# Farthest two points on Earth can be apart, in km
+_HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+class IndexedLocation(NamedTuple):
+    name: str
+    lat: float
+    lng: float
+    trip_id: Optional[str]
+    trip_title: Optional[str]
+
+
+class NearbyLocation(NamedTuple):
+    location: IndexedLocation
+    distance_km: float
+
+
+def _record(
+    location: dict, trip_id: Optional[str], trip_title: Optional[str]
+) -> Optional[IndexedLocation]:
+    """IndexedLocation for a trip location, or None without coordinates."""
+    # 0, 0 is what a failed geocode leaves behind
+    lat, lng = location.get("lat"), location.get("lng")
+    if lat is None or lng is None or (lat, lng) == (0, 0):
+        return None
+    # /api/ai/trips says "name", the create endpoint's response "locationTitle"
+    name = location.get("name") or location.get("locationTitle") or ""
+    return IndexedLocation(name, float(lat), float(lng), trip_id, trip_title)
+
+
+class UserSpatialIndex:
+    """Grid index over one user's trip locations.
+
+    Points are kept sorted by grid cell id (row * columns + column), so the
+    cells of one grid row that a query overlaps are a contiguous slice found
+    with a binary search.
+
+    Args:
+        cell_deg: Grid cell size in degrees
+    """
+
+    def __init__(self, cell_deg: float = SPATIAL_INDEX_CELL_DEG):
+        # Whole number of columns, so column ranges wrap at the antimeridian
+        self._columns = max(1, round(360 / cell_deg))
+        self.cell_deg = 360 / self._columns
+        self._locations: List[IndexedLocation] = []
+        # (cell ids, lat and lng in radians, index into _locations), sorted by
+        # cell id. Replaced as a whole on add, so queries read it without a lock
+        self._sorted = (
+            np.empty(0, dtype=np.int64),
+            np.empty(0),
+            np.empty(0),
+            np.empty(0, dtype=np.intp),
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _row(self, lat: float) -> int:
+        return min(
+            math.floor((lat + 90) / self.cell_deg), math.ceil(180 / self.cell_deg) - 1
+        )
+
+    def _column(self, lng: float) -> int:
+        return math.floor((lng + 180) / self.cell_deg) % self._columns
+
+    def add_many(
+        self,
+        locations: Iterable[dict],
+        trip_id: Optional[str] = None,
+        trip_title: Optional[str] = None,
+    ) -> int:
+        """Index locations ("name" or "locationTitle", "lat", "lng") of a trip.
+
+        Locations without coordinates are skipped.
+
+        Returns:
+            How many locations were added
+        """
+        records = (_record(loc, trip_id, trip_title) for loc in locations)
+        return self._insert([record for record in records if record])
+
+    def add_trips(self, trips: Iterable[dict]) -> int:
+        """Index every location of the given trips. Returns how many were added."""
+        records = (
+            _record(loc, trip.get("id"), trip.get("title"))
+            for trip in trips
+            for loc in trip.get("locations") or []
+        )
+        return self._insert([record for record in records if record])
+
+    def _insert(self, new: List[IndexedLocation]) -> int:
+        if not new:
+            return 0
+
+        cells = [
+            self._row(loc.lat) * self._columns + self._column(loc.lng) for loc in new
+        ]
+        with self._lock:
+            keys, lat, lng, ids = self._sorted
+            first_id = len(self._locations)
+            self._locations.extend(new)
+            keys = np.concatenate([keys, np.asarray(cells, dtype=np.int64)])
+            lat = np.concatenate([lat, np.radians([loc.lat for loc in new])])
+            lng = np.concatenate([lng, np.radians([loc.lng for loc in new])])
+            ids = np.concatenate([ids, np.arange(first_id, first_id + len(new))])
+            # Stable sort of an already sorted array plus a short tail is ~O(n)
+            order = np.argsort(keys, kind="stable")
+            self._sorted = (keys[order], lat[order], lng[order], ids[order])
+        return len(new)
+
+    def _cell_ranges(self, lat: float, lng: float, radius_km: float):
+        """Cell id ranges [start, end) covering the circle's bounding box."""
+        dlat = radius_km / _KM_PER_DEG
+        south, north = lat - dlat, lat + dlat
+        rows = np.arange(self._row(max(south, -90)), self._row(min(north, 90)) + 1)
+        if south > -90 and north < 90:
+            dlng = dlat / math.cos(math.radians(max(abs(south), abs(north))))
+            span = (
+                math.floor((lng + dlng + 180) / self.cell_deg)
+                - math.floor((lng - dlng + 180) / self.cell_deg)
+                + 1
+            )
+            if dlng < 180 and span < self._columns:
+                first = self._column(lng - dlng)
+                last = first + span  # Exclusive, may run past the antimeridian
+                starts = rows * self._columns + first
+                if last <= self._columns:
+                    return starts, starts + span
+                # Wrapped: [first, columns) and [0, last - columns) of each row
+                row_starts = rows * self._columns
+                return (
+                    np.concatenate([starts, row_starts]),
+                    np.concatenate(
+                        [row_starts + self._columns, row_starts + last - self._columns]
+                    ),
+                )
+        # The box covers every longitude (a pole or a very large radius)
+        return (
+            np.array([rows[0] * self._columns]),
+            np.array([(rows[-1] + 1) * self._columns]),
+        )
+
+    def within(
+        self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None
+    ) -> List[NearbyLocation]:
+        """Locations within radius_km of a point, closest first.
+
+        Args:
+            lat: Latitude of the point in degrees
+            lng: Longitude of the point in degrees
+            radius_km: Search radius in km
+            limit: Return at most this many
+
+        Returns:
+            NearbyLocation records sorted by distance
+        """
+        keys, all_lat, all_lng, ids = self._sorted
+        if not len(keys):
+            return []
+        low, high = self._cell_ranges(lat, lng, radius_km)
+        starts = np.searchsorted(keys, low)
+        lengths = np.searchsorted(keys, high) - starts
+        total = int(lengths.sum())
+        if not total:
+            return []
+        # Positions of every point in those slices, without a Python loop
+        ends = np.cumsum(lengths)
+        candidates = np.arange(total) + np.repeat(starts - (ends - lengths), lengths)
+
+        lat_rad, lng_rad = math.radians(lat), math.radians(lng)
+        cand_lat = all_lat[candidates]
+        a = (
+            np.sin((cand_lat - lat_rad) / 2) ** 2
+            + math.cos(lat_rad)
+            * np.cos(cand_lat)
+            * np.sin((all_lng[candidates] - lng_rad) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        inside = np.flatnonzero(distances <= radius_km)
+        inside = inside[np.argsort(distances[inside], kind="stable")][:limit]
+        return [
+            NearbyLocation(self._locations[index], km)
+            for index, km in zip(
+                ids[candidates[inside]].tolist(),
+                np.round(distances[inside], 1).tolist(),
+            )
+        ]
+
+    def nearest(self, lat: float, lng: float, k: int = 5) -> List[NearbyLocation]:
+        """The k locations closest to a point, closest first."""
+        if k <= 0 or not self._locations:
+            return []
+        # Grow the radius until it holds k locations; those are the k nearest
+        radius_km = self.cell_deg * _KM_PER_DEG
+        while True:
+            found = self.within(lat, lng, radius_km, limit=k)
+            if len(found) >= k or radius_km >= _HALF_CIRCUMFERENCE_KM:
+                return found
+            radius_km *= 4
+
+
+class SpatialIndexRegistry:
+    """UserSpatialIndex per user, built from their trips and kept for a TTL.
+
+    Args:
+        ttl: Seconds an index is used before it is rebuilt from fresh trips
+        max_users: LRU bound on the number of indexes kept
+        cell_deg: Grid cell size of new indexes
+    """
+
+    def __init__(
+        self,
+        ttl: float = SPATIAL_INDEX_TTL_SECONDS,
+        max_users: int = SPATIAL_INDEX_MAX_USERS,
+        cell_deg: float = SPATIAL_INDEX_CELL_DEG,
+    ):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.cell_deg = cell_deg
+        self._indexes: "OrderedDict[str, Tuple[float, UserSpatialIndex]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "builds": 0, "incremental_adds": 0}
+
+    def get(self, user_id: str) -> Optional[UserSpatialIndex]:
+        """The user's index, or None if it was never built or has expired."""
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self._indexes.move_to_end(user_id)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def build(self, user_id: str, trips: Iterable[dict]) -> UserSpatialIndex:
+        """Index all locations of the user's trips, replacing any older index."""
+        index = UserSpatialIndex(self.cell_deg)
+        index.add_trips(trips)
+        with self._lock:
+            self._indexes[user_id] = (time.monotonic(), index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            self._counters["builds"] += 1
+        return index
+
+    def get_or_build(
+        self, user_id: str, fetch_trips: Callable[[], Optional[List[dict]]]
+    ) -> Optional[UserSpatialIndex]:
+        """The user's index, building it from fetch_trips() when missing.
+
+        Returns:
+            The index, or None if the trips could not be fetched
+        """
+        index = self.get(user_id)
+        if index is None:
+            trips = fetch_trips()
+            if trips is None:
+                return None
+            index = self.build(user_id, trips)
+        return index
+
+    def add_locations(
+        self,
+        user_id: str,
+        locations: Iterable[dict],
+        trip_id: Optional[str] = None,
+        trip_title: Optional[str] = None,
+    ):
+        """Add new locations of a trip to the user's index, if it has one.
+
+        Without an index there is nothing to update: the next query builds
+        one from trips that already include these locations.
+        """
+        with self._lock:
+            entry = self._indexes.get(user_id)
+        if entry is None:
+            return
+        added = entry[1].add_many(locations, trip_id, trip_title)
+        with self._lock:
+            self._counters["incremental_adds"] += added
+
+    def invalidate(self, user_id: str):
+        """Drop the user's index so the next query rebuilds it."""
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def stats(self) -> dict:
+        """Counters plus indexes and points held, for /spatial-index/stats."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["users"] = len(self._indexes)
+            stats["points"] = sum(len(index) for _, index in self._indexes.values())
+        return stats
+
+
+def resolve_place(name: str) -> Optional[Tuple[float, float]]:
+    """Coordinates of a place name: offline gazetteer first, then the geocoder.
+
+    Returns:
+        (lat, lng), or None if the place could not be found
+    """
+    place = gazetteer.lookup(name)
+    if place is not None:
+        return place.lat, place.lng
+    # Nominatim (through the persistent geocode cache) for anything else
+    return batch_geocoder.geocode_many([name]).get(name)
+
+
+# Global registry instance
+spatial_index = SpatialIndexRegistry()
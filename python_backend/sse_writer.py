@@ -0,0 +1,236 @@
+"""
+Coalescing Server-Sent Events writer for token streams.
+
+Sending one `data:` frame per LLM token costs a JSON encode and a socket
+write per 1-4 characters. SSEWriter instead buffers tokens and flushes them
+as one frame when the coalescing window (SSE_COALESCE_MS) has passed since
+the last write or the buffer reaches SSE_MAX_FRAME_CHARS. The first token is
+always sent on its own and immediately, so time-to-first-token is unchanged.
+
+Frames keep the `{"ai_response": "..."}` shape, so clients need no change.
+While nothing arrives (tools running), an SSE comment (`: ping`) is sent
+every SSE_HEARTBEAT_SECONDS to keep proxies from closing the connection.
+
+Backpressure: tokens are read by a separate task. When the client reads
+slowly the socket write blocks, the buffer grows and frames get larger; once
+SSE_MAX_BUFFER_CHARS are waiting, reading pauses and the agent stream pauses
+with it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import AsyncIterator, List, Optional
+from dotenv import load_dotenv
+from metrics import (
+    CHAT_ACTIVE_STREAMS,
+    CHAT_FIRST_TOKEN_SECONDS,
+    CHAT_STREAM_SECONDS,
+    CHAT_STREAM_TOKENS,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "30"))
+SSE_MAX_FRAME_CHARS = int(os.getenv("SSE_MAX_FRAME_CHARS", "512"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "10"))
+SSE_MAX_BUFFER_CHARS = int(os.getenv("SSE_MAX_BUFFER_CHARS", "65536"))
+
+HEARTBEAT = b": ping\n\n"
+
+
+def sse_frame(text: str) -> bytes:
+    """One SSE data frame carrying a piece of the AI response."""
+    return f"data: {json.dumps({'ai_response': text})}\n\n".encode()
+
+
+class SSEWriter:
+    """Turns a token stream into coalesced SSE frames.
+
+    Args:
+        coalesce_ms: Longest a token waits for others to join its frame
+            (0 flushes whatever has arrived on every write)
+        max_frame_chars: Flush as soon as this much text is buffered
+        heartbeat_seconds: Idle time before a keep-alive comment (0 disables)
+        max_buffer_chars: Pause reading tokens beyond this much unsent text
+    """
+
+    def __init__(
+        self,
+        coalesce_ms: float = SSE_COALESCE_MS,
+        max_frame_chars: int = SSE_MAX_FRAME_CHARS,
+        heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS,
+        max_buffer_chars: int = SSE_MAX_BUFFER_CHARS,
+    ):
+        self.window = coalesce_ms / 1000
+        self.max_frame_chars = max_frame_chars
+        self.heartbeat = heartbeat_seconds
+        self.max_buffer_chars = max_buffer_chars
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.tokens = 0
+        self.frames = 0
+        self.heartbeats = 0
+        self.bytes = 0
+        self.backpressure_waits = 0
+
+    async def stream(
+        self, tokens: AsyncIterator[str], started: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """SSE frames for a token stream; errors end it with an error frame.
+
+        Args:
+            tokens: Text chunks to send
+            started: time.perf_counter() when the request arrived, for the
+                time-to-first-token metric (defaults to the first iteration)
+        """
+        loop = asyncio.get_running_loop()
+        buffer: List[str] = []
+        buffered = 0
+        done = False
+        error: Optional[BaseException] = None
+        changed = asyncio.Event()
+        room = asyncio.Event()
+        room.set()
+        counts = {"tokens": 0, "frames": 0, "heartbeats": 0, "bytes": 0, "waits": 0}
+
+        async def read_tokens():
+            nonlocal buffered, done, error
+            try:
+                async for token in tokens:
+                    if not token:
+                        continue
+                    buffer.append(token)
+                    buffered += len(token)
+                    counts["tokens"] += 1
+                    # Wake the writer only when it has something to decide:
+                    # a first token after idling or a full frame. Otherwise
+                    # it is already sleeping until the window closes.
+                    if len(buffer) == 1 or buffered >= self.max_frame_chars:
+                        changed.set()
+                    if buffered >= self.max_buffer_chars:
+                        counts["waits"] += 1
+                        room.clear()
+                        await room.wait()
+            except Exception as e:
+                error = e
+            finally:
+                done = True
+                changed.set()
+
+        start = loop.time()
+        started = time.perf_counter() if started is None else started
+        last_write = start
+        first_frame: Optional[float] = None
+        CHAT_ACTIVE_STREAMS.inc()
+        reader = asyncio.create_task(read_tokens())
+        try:
+            while True:
+                # Cleared before looking at the buffer: the reader only runs
+                # while this loop awaits, so no wake-up is lost
+                changed.clear()
+                now = loop.time()
+                if buffer:
+                    if (
+                        first_frame is None
+                        or done
+                        or buffered >= self.max_frame_chars
+                        or now >= last_write + self.window
+                    ):
+                        text = "".join(buffer)
+                        buffer.clear()
+                        buffered = 0
+                        room.set()
+                        frame = sse_frame(text)
+                        counts["frames"] += 1
+                        counts["bytes"] += len(frame)
+                        if first_frame is None:
+                            first_frame = time.perf_counter() - started
+                        yield frame
+                        last_write = loop.time()
+                        continue
+                    timeout = last_write + self.window - now
+                elif done:
+                    break
+                elif self.heartbeat:
+                    timeout = last_write + self.heartbeat - now
+                    if timeout <= 0:
+                        counts["heartbeats"] += 1
+                        counts["bytes"] += len(HEARTBEAT)
+                        yield HEARTBEAT
+                        last_write = loop.time()
+                        continue
+                else:
+                    timeout = None
+
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            if error is not None:
+                logger.error("Token stream failed", exc_info=error)
+                frame = sse_frame(f"Error: {error}")
+                counts["frames"] += 1
+                counts["bytes"] += len(frame)
+                yield frame
+        finally:
+            # Client gone or stream finished: stop reading the agent
+            reader.cancel()
+            self._record(counts)
+            seconds = time.perf_counter() - started
+            CHAT_ACTIVE_STREAMS.dec()
+            CHAT_STREAM_SECONDS.observe(seconds)
+            CHAT_STREAM_TOKENS.inc(amount=counts["tokens"])
+            if first_frame is not None:
+                CHAT_FIRST_TOKEN_SECONDS.observe(first_frame)
+            logger.info(
+                "Stream finished",
+                extra={
+                    "tokens": counts["tokens"],
+                    "frames": counts["frames"],
+                    "heartbeats": counts["heartbeats"],
+                    "bytes": counts["bytes"],
+                    "first_frame_ms": (
+                        round(first_frame * 1000, 1)
+                        if first_frame is not None
+                        else None
+                    ),
+                    "seconds": round(seconds, 3),
+                },
+            )
+            # Last: awaiting here can be interrupted by a cancelled request
+            await asyncio.gather(reader, return_exceptions=True)
+
+    def _record(self, counts: dict):
+        with self._lock:
+            self.streams += 1
+            self.tokens += counts["tokens"]
+            self.frames += counts["frames"]
+            self.heartbeats += counts["heartbeats"]
+            self.bytes += counts["bytes"]
+            self.backpressure_waits += counts["waits"]
+
+    def stats(self) -> dict:
+        """Totals over all streams: tokens in, frames and bytes out."""
+        with self._lock:
+            return {
+                "streams": self.streams,
+                "tokens": self.tokens,
+                "frames": self.frames,
+                "heartbeats": self.heartbeats,
+                "bytes": self.bytes,
+                "tokens_per_frame": (
+                    round(self.tokens / self.frames, 2) if self.frames else 0.0
+                ),
+                "backpressure_waits": self.backpressure_waits,
+            }
+
+
+# Shared writer used by /chat-trip
+sse_writer = SSEWriter()
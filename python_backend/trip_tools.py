@@ -1,10 +1,14 @@
+import logging
 import os
-import requests
 from langchain_core.tools import tool
 from typing import Optional, List, Dict
-from search_weather import search_weather
+from search_weather import search_trips_weather
+from route_optimizer import optimize_route
+from spatial_index import resolve_place, spatial_index
+from services.http_client import nextjs_request
+from services.trip_snapshot import invalidate_user_trips, load_user_trips
 from dotenv import load_dotenv
-from serpapi import GoogleSearch
+from search_cache import search_cache
 import json
 from datetime import datetime
 from trip_utils import (
@@ -16,9 +20,19 @@ from trip_utils import (
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Base URL for the Next.js API
 NEXTJS_API_BASE = os.getenv("NEXTJS_API_BASE", "http://localhost:3000")
 
+# Save a new trip's locations in the shortest visiting order (first kept)
+# instead of the order the user gave; when off, the order is only suggested
+ROUTE_OPTIMIZE_ON_CREATE = os.getenv("ROUTE_OPTIMIZE_ON_CREATE", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
 
 @tool
 def get_trip_weather(user_id: str, trip_title: Optional[str] = None) -> str:
@@ -30,22 +44,13 @@ def get_trip_weather(user_id: str, trip_title: Optional[str] = None) -> str:
         user_id: The ID of the user
         trip_title: Optional title of the trip to get weather for
     """
-    print(
-        f"========================= USING TOOL: Fetching weather for trip '{trip_title or 'all trips'}' =========================\n"
-    )
+    logger.info("Tool get_trip_weather", extra={"trip_title": trip_title})
 
     try:
-        response = requests.get(
-            f"{NEXTJS_API_BASE}/api/ai/trips",
-            params={"userId": user_id},
-            timeout=10,
-        )
-
-        if response.status_code != 200:
-            return f"Error fetching trips: {response.status_code}"
+        trips = load_user_trips(user_id)
 
-        data = response.json()
-        trips = data.get("trips", [])
+        if trips is None:
+            return "Error fetching trips"
 
         if not trips:
             return "You don't have any trips to check weather for."
@@ -63,47 +68,164 @@ def get_trip_weather(user_id: str, trip_title: Optional[str] = None) -> str:
 
             trips = [matching_trip]
 
-        # Get weather for all locations in the selected trips
+        # One lookup per distinct location, shared by every trip naming it
+        batch = search_trips_weather(
+            [
+                {"locations": [loc["name"] for loc in trip["locations"]]}
+                for trip in trips
+            ]
+        )
         result = ""
-        for trip in trips:
+        for trip, weather_data in zip(trips, batch.trips):
             if not trip["locations"]:
                 result += f"\n**{trip['title']}**: No locations added yet.\n"
                 continue
 
-            location_names = [loc["name"] for loc in trip["locations"]]
-            weather_data = search_weather(location_names)
-
-            if "error" in weather_data:
-                result += f"\n**{trip['title']}**: {weather_data['error']}\n"
+            if weather_data.error:
+                result += f"\n**{trip['title']}**: {weather_data.error}\n"
                 continue
 
             result += f"\n**{trip['title']}** ({trip['startDate'][:10]} to {trip['endDate'][:10]}):\n\n"
 
-            for i, loc_weather in enumerate(weather_data.get("locations", [])):
-                location_name = (
-                    location_names[i] if i < len(location_names) else "Unknown"
-                )
-                current = loc_weather.get("current", {})
+            for loc_weather in weather_data.locations:
+                current = loc_weather.current
 
-                result += f"📍 **{location_name}**\n"
-                result += f"   Current: {current.get('condition', 'N/A')}, {current.get('temperature_f', 'N/A')}°F ({current.get('temperature_c', 'N/A')}°C)\n"
-                result += f"   Humidity: {current.get('humidity', 'N/A')}, Wind: {current.get('wind', 'N/A')}\n"
+                result += f"📍 **{current.location}**\n"
+                result += f"   Current: {current.condition}, {current.temperature_f}°F ({current.temperature_c}°C)\n"
+                result += f"   Humidity: {current.humidity}, Wind: {current.wind}\n"
 
-                forecast = loc_weather.get("forecast", [])
+                forecast = loc_weather.forecast
                 if forecast:
                     result += "   Forecast:\n"
                     for day in forecast[:3]:  # Show 3-day forecast
-                        result += f"      - {day.get('day', 'N/A')}: {day.get('condition', 'N/A')}, "
-                        result += f"High: {day.get('high_f', 'N/A')}°F, Low: {day.get('low_f', 'N/A')}°F\n"
+                        result += f"      - {day.day}: {day.condition}, "
+                        result += f"High: {day.high_f}°F, Low: {day.low_f}°F\n"
                 result += "\n"
 
+            if weather_data.timed_out:
+                result += f"   Weather lookup timed out for: {', '.join(weather_data.timed_out)}\n"
+
         return result if result else "Could not fetch weather data."
 
     except Exception as e:
-        print(f"Error in get_trip_weather: {e}")
+        logger.exception("Tool get_trip_weather failed")
         return f"Error fetching weather: {str(e)}"
 
 
+@tool
+def optimize_trip_route(
+    user_id: str, trip_title: Optional[str] = None, round_trip: bool = False
+) -> str:
+    """Suggest the shortest order to visit a trip's locations in.
+    The first location stays first. If trip_title is not provided, uses the
+    user's most recent trip.
+
+    Args:
+        user_id: The ID of the user
+        trip_title: Optional title of the trip to optimize
+        round_trip: Whether the trip ends back at its first location
+    """
+    logger.info("Tool optimize_trip_route", extra={"trip_title": trip_title})
+
+    try:
+        trips = load_user_trips(user_id)
+
+        if trips is None:
+            return "Error fetching trips"
+
+        if not trips:
+            return "You don't have any trips to optimize."
+
+        trip = trips[0]
+        if trip_title:
+            trip = next(
+                (t for t in trips if trip_title.lower() in t["title"].lower()), None
+            )
+            if not trip:
+                return f"Could not find a trip with title matching '{trip_title}'"
+
+        locations = trip["locations"]
+        if len(locations) < 3:
+            return f"**{trip['title']}** has fewer than 3 locations, so the order can't get any shorter."
+
+        route = optimize_route(locations, keep_start=True, round_trip=round_trip)
+        if route["saved_km"] <= 0:
+            return f"**{trip['title']}** is already in the shortest order I can find ({route['total_km']} km)."
+
+        result = f"🗺️ Suggested order for **{trip['title']}**:\n\n"
+        for position, loc in enumerate(route["stops"], start=1):
+            result += f"{position}. {loc['name']}\n"
+        result += (
+            f"\nTotal: {route['total_km']} km instead of {route['original_km']} km "
+        )
+        result += f"(saves {route['saved_km']} km).\n"
+        if route["unplaced"]:
+            result += (
+                f"Kept at the end (no coordinates): {', '.join(route['unplaced'])}\n"
+            )
+        result += (
+            "\nYou can drag the locations into this order in your trip's itinerary."
+        )
+        return result
+
+    except Exception as e:
+        logger.exception("Tool optimize_trip_route failed")
+        return f"Error optimizing route: {str(e)}"
+
+
+@tool
+def find_nearby_locations(
+    user_id: str, place: str, radius_km: Optional[float] = None, limit: int = 5
+) -> str:
+    """Find the places in the user's trips that are near a place.
+    Use for questions like "which of my trips went near Lisbon" or "what have I
+    saved within 200 km of Rome".
+
+    Args:
+        user_id: The ID of the user
+        place: The place to search around (city, region, landmark)
+        radius_km: Optional search radius in km; without it, the closest ones
+        limit: Maximum number of locations to return
+    """
+    logger.info(
+        "Tool find_nearby_locations",
+        extra={"place": place, "radius_km": radius_km},
+    )
+
+    try:
+        coordinates = resolve_place(place)
+        if coordinates is None:
+            return f"Could not find a place called '{place}'"
+
+        index = spatial_index.get_or_build(user_id, lambda: load_user_trips(user_id))
+        if index is None:
+            return "Error fetching trips"
+        if not len(index):
+            return "None of your trips have locations with coordinates yet."
+
+        lat, lng = coordinates
+        if radius_km is not None:
+            found = index.within(lat, lng, radius_km, limit=limit)
+            if not found:
+                return f"None of your trip locations are within {radius_km:g} km of {place}."
+            result = (
+                f"📍 Your trip locations within {radius_km:g} km of **{place}**:\n\n"
+            )
+        else:
+            found = index.nearest(lat, lng, limit)
+            result = f"📍 Your trip locations closest to **{place}**:\n\n"
+
+        for location, distance_km in found:
+            result += (
+                f"  • {location.name} ({location.trip_title}) - {distance_km:g} km\n"
+            )
+        return result
+
+    except Exception as e:
+        logger.exception("Tool find_nearby_locations failed")
+        return f"Error finding nearby locations: {str(e)}"
+
+
 @tool
 def create_trip(
     user_id: str,
@@ -147,16 +269,17 @@ def create_trip(
         locations: JSON string of locations array. Format: [{"name": "New York", "lat": 40.7128, "lng": -74.0060}, {"name": "Boston", "lat": 42.3601, "lng": -71.0589}]
         summary: AI-generated personalized summary with itinerary suggestions, weather tips, and highlights (2-3 paragraphs)
     """
-    print(f"\n{'='*80}")
-    print(f"CREATE_TRIP TOOL CALLED")
-    print(f"User ID: {user_id}")
-    print(f"Title: {title}")
-    print(f"Start Date: {start_date}")
-    print(f"End Date: {end_date}")
-    print(f"Description: {description}")
-    print(f"Locations: {locations}")
-    print(f"Summary length: {len(summary)} chars")
-    print(f"{'='*80}")
+    logger.info(
+        "Tool create_trip",
+        extra={
+            "user_id": user_id,
+            "title": title,
+            "start_date": start_date,
+            "end_date": end_date,
+            "locations": locations,
+            "summary_chars": len(summary),
+        },
+    )
 
     try:
         # Parse locations if provided
@@ -164,11 +287,26 @@ def create_trip(
         if locations:
             try:
                 locations_list = json.loads(locations)
-                print(f"PARSED LOCATIONS: {len(locations_list)} locations")
             except json.JSONDecodeError as e:
-                print(f"JSON PARSE ERROR: {e}")
+                logger.warning("create_trip: invalid locations JSON: %s", e)
                 return "Error: locations must be valid JSON array"
 
+        # Stops are saved in list order; with 3+ the order changes the distance
+        route = None
+        if len(locations_list) >= 3:
+            try:
+                route = optimize_route(locations_list, keep_start=True)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("create_trip: could not optimize route: %s", e)
+        if route and route["saved_km"] <= 0:
+            route = None
+        if route and ROUTE_OPTIMIZE_ON_CREATE:
+            logger.info(
+                "create_trip: reordered locations",
+                extra={"saved_km": route["saved_km"]},
+            )
+            locations_list = route["stops"]
+
         # Validate dates
         try:
             from datetime import datetime
@@ -176,13 +314,12 @@ def create_trip(
             datetime.strptime(start_date, "%Y-%m-%d")
             datetime.strptime(end_date, "%Y-%m-%d")
         except ValueError as e:
-            print(f"DATE VALIDATION ERROR: {e}")
+            logger.warning("create_trip: invalid dates: %s", e)
             return f"Error: Invalid date format. Expected YYYY-MM-DD, got start_date='{start_date}', end_date='{end_date}'"
 
-        print(f"CALLING NEXT.JS API: {NEXTJS_API_BASE}/api/ai/trips/create")
-
-        response = requests.post(
-            f"{NEXTJS_API_BASE}/api/ai/trips/create",
+        response = nextjs_request(
+            "POST",
+            "/api/ai/trips/create",
             json={
                 "userId": user_id,
                 "title": title,
@@ -192,11 +329,11 @@ def create_trip(
                 "endDate": end_date,
                 "locations": locations_list,
             },
-            timeout=10,
         )
 
-        print(f"API RESPONSE STATUS: {response.status_code}")
-        print(f"API RESPONSE TEXT: {response.text[:200]}...")
+        logger.debug(
+            "create_trip response %s: %s", response.status_code, response.text[:200]
+        )
 
         if response.status_code == 200:
             data = response.json()
@@ -211,19 +348,26 @@ def create_trip(
                 for loc in trip["locations"]:
                     result += f"  • {loc['locationTitle']}\n"
 
+            if route and ROUTE_OPTIMIZE_ON_CREATE:
+                result += f"\nStops are ordered to shorten the route (saves {route['saved_km']} km).\n"
+            elif route:
+                suggested = " → ".join(stop.get("name", "") for stop in route["stops"])
+                result += f"\nTip: visiting them as {suggested} would save {route['saved_km']} km.\n"
+
             result += f"\nYou can view this trip in your dashboard!"
-            print(f"TRIP CREATED SUCCESSFULLY")
+            invalidate_user_trips(user_id)
+            spatial_index.add_locations(
+                user_id, trip.get("locations", []), trip.get("id"), trip.get("title")
+            )
+            logger.info("Trip created", extra={"trip_id": trip.get("id")})
             return result
         else:
             error_msg = f"Error creating trip: {response.status_code} - {response.text}"
-            print(f"TRIP CREATION FAILED: {error_msg}")
+            logger.warning("Trip creation failed: %s", error_msg)
             return error_msg
 
     except Exception as e:
-        print(f"CREATE_TRIP EXCEPTION: {e}")
-        import traceback
-
-        traceback.print_exc()
+        logger.exception("Tool create_trip failed")
         return f"Error creating trip: {str(e)}"
 
 
@@ -244,23 +388,17 @@ def add_destination_to_trip(
         lat: Latitude (optional, defaults to 0.0)
         lng: Longitude (optional, defaults to 0.0)
     """
-    print(
-        f"========================= USING TOOL: Adding destination '{destination_name}' to trip '{trip_title}' =========================\n"
+    logger.info(
+        "Tool add_destination_to_trip",
+        extra={"destination": destination_name, "trip_title": trip_title},
     )
 
     try:
-        # First, fetch the user's trips to find the matching trip
-        response = requests.get(
-            f"{NEXTJS_API_BASE}/api/ai/trips",
-            params={"userId": user_id},
-            timeout=10,
-        )
+        # First, find the matching trip in the user's trips
+        trips = load_user_trips(user_id)
 
-        if response.status_code != 200:
-            return f"Error fetching trips: {response.status_code}"
-
-        data = response.json()
-        trips = data.get("trips", [])
+        if trips is None:
+            return "Error fetching trips"
 
         if not trips:
             return "You don't have any trips to add destinations to."
@@ -276,23 +414,31 @@ def add_destination_to_trip(
             return f"Could not find a trip with title matching '{trip_title}'"
 
         # Add the destination to the trip
-        add_response = requests.post(
-            f"{NEXTJS_API_BASE}/api/trips/{matching_trip['id']}/locations",
+        add_response = nextjs_request(
+            "POST",
+            f"/api/trips/{matching_trip['id']}/locations",
+            endpoint="/api/trips/{id}/locations",
             json={
                 "locationTitle": destination_name,
                 "lat": lat,
                 "lng": lng,
             },
-            timeout=10,
         )
 
         if add_response.status_code == 200:
+            invalidate_user_trips(user_id)
+            spatial_index.add_locations(
+                user_id,
+                [{"name": destination_name, "lat": lat, "lng": lng}],
+                matching_trip["id"],
+                matching_trip["title"],
+            )
             return f"✅ Added '{destination_name}' to your trip '{matching_trip['title']}'!"
         else:
             return f"Error adding destination: {add_response.status_code} - {add_response.text}"
 
     except Exception as e:
-        print(f"Error in add_destination_to_trip: {e}")
+        logger.exception("Tool add_destination_to_trip failed")
         return f"Error adding destination: {str(e)}"
 
 
@@ -304,22 +450,13 @@ def get_trip_details(user_id: str, trip_title: Optional[str] = None) -> str:
         user_id: The ID of the user
         trip_title: Optional title of specific trip to get details for
     """
-    print(
-        f"========================= USING TOOL: Getting trip details for '{trip_title or 'all trips'}' =========================\n"
-    )
+    logger.info("Tool get_trip_details", extra={"trip_title": trip_title})
 
     try:
-        response = requests.get(
-            f"{NEXTJS_API_BASE}/api/ai/trips",
-            params={"userId": user_id},
-            timeout=10,
-        )
-
-        if response.status_code != 200:
-            return f"Error fetching trips: {response.status_code}"
+        trips = load_user_trips(user_id)
 
-        data = response.json()
-        trips = data.get("trips", [])
+        if trips is None:
+            return "Error fetching trips"
 
         if not trips:
             return "You don't have any trips yet."
@@ -353,7 +490,7 @@ def get_trip_details(user_id: str, trip_title: Optional[str] = None) -> str:
         return result
 
     except Exception as e:
-        print(f"Error in get_trip_details: {e}")
+        logger.exception("Tool get_trip_details failed")
         return f"Error fetching trip details: {str(e)}"
 
 
@@ -370,9 +507,7 @@ def get_llm_context(user_id: str) -> str:
     Args:
         user_id: The ID of the user requesting context information
     """
-    print(
-        f"========================= USING TOOL: Getting LLM context for user {user_id} =========================\n"
-    )
+    logger.info("Tool get_llm_context", extra={"user_id": user_id})
 
     try:
         context_info = {
@@ -383,6 +518,8 @@ def get_llm_context(user_id: str) -> str:
                 "create_trip - Create a new trip with destinations and dates",
                 "add_destination_to_trip - Add a destination to existing trip",
                 "get_trip_details - Get detailed trip information",
+                "optimize_trip_route - Suggest the shortest order to visit a trip's locations",
+                "find_nearby_locations - Find trip locations near a place",
                 "get_travel_recommendations - Get personalized travel recommendations",
                 "get_llm_context - Get current context and debugging info",
             ],
@@ -394,15 +531,9 @@ def get_llm_context(user_id: str) -> str:
 
         # Get user's trip information
         try:
-            response = requests.get(
-                f"{NEXTJS_API_BASE}/api/ai/trips",
-                params={"userId": user_id},
-                timeout=10,
-            )
+            trips = load_user_trips(user_id)
 
-            if response.status_code == 200:
-                data = response.json()
-                trips = data.get("trips", [])
+            if trips is not None:
                 context_info["user_trips"] = {
                     "total_trips": len(trips),
                     "trip_summaries": [
@@ -419,7 +550,7 @@ def get_llm_context(user_id: str) -> str:
                 }
             else:
                 context_info["user_trips"] = {
-                    "error": f"Failed to fetch trips: {response.status_code}",
+                    "error": "Failed to fetch trips",
                     "total_trips": 0,
                 }
         except Exception as e:
@@ -467,7 +598,7 @@ def get_llm_context(user_id: str) -> str:
         return result
 
     except Exception as e:
-        print(f"Error in get_llm_context: {e}")
+        logger.exception("Tool get_llm_context failed")
         return f"Error getting context: {str(e)}"
 
 
@@ -482,33 +613,25 @@ def get_travel_recommendations(
         destination: The destination to get recommendations for
         trip_type: Type of trip (adventure, cultural, relaxation, business, etc.)
     """
-    print(
-        f"========================= USING TOOL: Getting travel recommendations for {destination} ({trip_type}) =========================\n"
+    logger.info(
+        "Tool get_travel_recommendations",
+        extra={"destination": destination, "trip_type": trip_type},
     )
 
     try:
         # Get user's past trips for context
-        response = requests.get(
-            f"{NEXTJS_API_BASE}/api/ai/trips",
-            params={"userId": user_id},
-            timeout=10,
-        )
+        trips = load_user_trips(user_id)
 
         user_context = ""
-        if response.status_code == 200:
-            data = response.json()
-            trips = data.get("trips", [])
-            if trips:
-                user_context = f"User has {len(trips)} previous trip(s). "
-                recent_destinations = [
-                    loc["name"]
-                    for trip in trips[-3:]
-                    for loc in trip.get("locations", [])
-                ]
-                if recent_destinations:
-                    user_context += (
-                        f"Recent destinations: {', '.join(recent_destinations)}. "
-                    )
+        if trips:
+            user_context = f"User has {len(trips)} previous trip(s). "
+            recent_destinations = [
+                loc["name"] for trip in trips[-3:] for loc in trip.get("locations", [])
+            ]
+            if recent_destinations:
+                user_context += (
+                    f"Recent destinations: {', '.join(recent_destinations)}. "
+                )
 
         # Search for recommendations
         query = f"{trip_type} travel recommendations {destination}"
@@ -517,8 +640,7 @@ def get_travel_recommendations(
             "engine": "google",
             "api_key": os.getenv("SERPAPI_API_KEY"),
         }
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        results = search_cache.search("get_travel_recommendations", params)
 
         # Format recommendations
         result = f"🌍 **Travel Recommendations for {destination}**\n\n"
@@ -538,5 +660,5 @@ def get_travel_recommendations(
         return result
 
     except Exception as e:
-        print(f"Error in get_travel_recommendations: {e}")
+        logger.exception("Tool get_travel_recommendations failed")
         return f"Error getting recommendations: {str(e)}"
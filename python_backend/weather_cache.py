@@ -0,0 +1,216 @@
+"""
+In-memory weather cache in front of SerpAPI.
+
+Entries are keyed by normalized location name and carry their own TTL. After
+the TTL an entry is still served for a stale window while a single background
+refresh runs. The cache is LRU-bounded, and concurrent misses for the same key
+share one upstream request.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WEATHER_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "600"))
+WEATHER_CACHE_STALE_SECONDS = float(os.getenv("WEATHER_CACHE_STALE_SECONDS", "3600"))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "512"))
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a location name so "Paris, France " and "paris france" match."""
+    location = re.sub(r"[^\w\s]", " ", location.lower())
+    return " ".join(location.split())
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value, expires_at: float, stale_until: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class WeatherCache:
+    """TTL + LRU cache with stale-while-revalidate and request coalescing.
+
+    Args:
+        ttl: Seconds an entry is fresh
+        stale_ttl: Extra seconds a stale entry may be served while refreshing
+        max_entries: LRU size bound
+    """
+
+    def __init__(
+        self,
+        ttl: float = WEATHER_CACHE_TTL_SECONDS,
+        stale_ttl: float = WEATHER_CACHE_STALE_SECONDS,
+        max_entries: int = WEATHER_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="weather-refresh"
+        )
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    def get_or_fetch(
+        self,
+        location: str,
+        fetch: Callable[[str], Optional[dict]],
+        ttl: Optional[float] = None,
+    ) -> Optional[dict]:
+        """Return cached weather for a location, fetching it on a miss.
+
+        Args:
+            location: Location name as given by the caller
+            fetch: Function doing the upstream lookup for the location
+            ttl: Optional per-entry TTL overriding the cache default
+
+        Returns:
+            Weather entry (None results are returned but never cached)
+        """
+        key = normalize_location(location)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.expires_at:
+                    self._counters["hits"] += 1
+                    return entry.value
+                # Stale: answer now, refresh once in the background
+                self._counters["stale_hits"] += 1
+                if key not in self._inflight:
+                    self._counters["refreshes"] += 1
+                    self._inflight[key] = Future()
+                    self._refresher.submit(self._load, key, location, fetch, ttl)
+                return entry.value
+
+            future = self._inflight.get(key)
+            if future is None:
+                self._counters["misses"] += 1
+                self._inflight[key] = Future()
+            else:
+                self._counters["coalesced"] += 1
+
+        # Someone else is already fetching this key: wait for their result
+        if future is not None:
+            return future.result()
+        return self._load(key, location, fetch, ttl)
+
+    def refresh(
+        self,
+        location: str,
+        fetch: Callable[[str], Optional[dict]],
+        ttl: Optional[float] = None,
+    ) -> Optional[dict]:
+        """Fetch a location even over a stale or fresh entry, and store it.
+
+        Shares in-flight fetches with get_or_fetch: if the location is already
+        being fetched, waits for that result instead of asking upstream again.
+
+        Args:
+            location: Location name as given by the caller
+            fetch: Function doing the upstream lookup for the location
+            ttl: Optional per-entry TTL overriding the cache default
+
+        Returns:
+            Fetched weather entry (None results are never cached)
+        """
+        key = normalize_location(location)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                self._counters["refreshes"] += 1
+                self._inflight[key] = Future()
+            else:
+                self._counters["coalesced"] += 1
+
+        if future is not None:
+            return future.result()
+        return self._load(key, location, fetch, ttl)
+
+    def _load(self, key: str, location: str, fetch, ttl: Optional[float]):
+        """Run the upstream fetch and publish the result to waiting callers."""
+        future = self._inflight[key]
+        try:
+            value = fetch(location)
+        except Exception as e:
+            with self._lock:
+                self._counters["errors"] += 1
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if value is not None:
+                self._store(key, value, ttl)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: str, value, ttl: Optional[float]):
+        now = time.monotonic()
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = _Entry(value, now + ttl, now + ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def is_fresh(self, location: str) -> bool:
+        """Whether a location has an entry that is still within its TTL."""
+        with self._lock:
+            entry = self._entries.get(normalize_location(location))
+            return entry is not None and time.monotonic() < entry.expires_at
+
+    def put(self, location: str, value, ttl: Optional[float] = None):
+        """Store an entry fetched elsewhere (e.g. by another worker's prefetch)."""
+        with self._lock:
+            self._store(normalize_location(location), value, ttl)
+
+    def invalidate(self, location: Optional[str] = None):
+        """Drop one location, or everything when no location is given."""
+        with self._lock:
+            if location is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_location(location), None)
+
+    def stats(self) -> dict:
+        """Counters plus current size, for the /weather-cache/stats endpoint."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            round((stats["hits"] + stats["stale_hits"]) / lookups, 3)
+            if lookups
+            else 0.0
+        )
+        return stats
+
+
+# Global cache instance
+weather_cache = WeatherCache()
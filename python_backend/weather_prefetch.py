@@ -0,0 +1,408 @@
+"""
+Background prefetch of weather for upcoming trips.
+
+Users mostly open a trip shortly before it starts and then wait on live
+SerpAPI calls. Every WEATHER_PREFETCH_INTERVAL_SECONDS, WeatherPrefetcher
+pulls the trips of recently active users from /api/ai/trips and fetches the
+weather of trips starting within WEATHER_PREFETCH_HORIZON_DAYS into the
+weather cache.
+
+- Budget: prefetch lookups run one at a time and at most
+  WEATHER_PREFETCH_CALLS_PER_MINUTE, so interactive requests keep the
+  weather pool and the SerpAPI quota.
+- One job at a time across workers: a lease row in a shared SQLite file
+  (WEATHER_PREFETCH_DB_PATH) lets one worker run the job per interval. The
+  holder renews it while a paced job runs past the interval and releases it
+  when the job ends.
+- Other workers import what it fetched from the same file into their own
+  in-memory cache, so every worker is warm.
+- Users are those seen by /chat-trip or the trip weather endpoints within
+  WEATHER_PREFETCH_ACTIVE_DAYS (the Next.js API lists trips per user only).
+"""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from metrics import WEATHER_PREFETCH_LOCATIONS
+from models import LocationWeather
+from search_weather import refresh_location_weather
+from services import TripService, run_blocking
+from weather_cache import normalize_location, weather_cache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PREFETCH = os.getenv("WEATHER_PREFETCH", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+WEATHER_PREFETCH_DB_PATH = os.getenv(
+    "WEATHER_PREFETCH_DB_PATH",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "weather_prefetch.sqlite3"
+    ),
+)
+WEATHER_PREFETCH_INTERVAL_SECONDS = float(
+    os.getenv("WEATHER_PREFETCH_INTERVAL_SECONDS", "900")
+)
+WEATHER_PREFETCH_HORIZON_DAYS = int(os.getenv("WEATHER_PREFETCH_HORIZON_DAYS", "14"))
+WEATHER_PREFETCH_ACTIVE_DAYS = float(os.getenv("WEATHER_PREFETCH_ACTIVE_DAYS", "7"))
+WEATHER_PREFETCH_CALLS_PER_MINUTE = float(
+    os.getenv("WEATHER_PREFETCH_CALLS_PER_MINUTE", "30")
+)
+# How long prefetched weather stays fresh (outlives the interval on purpose)
+WEATHER_PREFETCH_TTL_SECONDS = float(os.getenv("WEATHER_PREFETCH_TTL_SECONDS", "1800"))
+
+_LEASE = "weather_prefetch"
+# Longest gap between lease renewals while a job runs
+_LEASE_RENEW_SECONDS = 30.0
+
+
+class RateBudget:
+    """Token bucket pacing background calls.
+
+    Args:
+        per_minute: Calls allowed per minute on average
+        burst: Calls allowed back to back after an idle period
+    """
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a call is allowed."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self.interval:
+                    self._tokens = min(
+                        self.burst,
+                        self._tokens + (now - self._updated) / self.interval,
+                    )
+                else:
+                    self._tokens = self.burst
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.interval)
+
+
+def upcoming_locations(
+    trips: List[dict], horizon_days: int, today: Optional[date] = None
+) -> List[str]:
+    """Location names of trips starting within the horizon (or under way)."""
+    today = today or date.today()
+    last_start = today + timedelta(days=horizon_days)
+    names = []
+    for trip in trips:
+        try:
+            start = date.fromisoformat(trip["startDate"][:10])
+            end = date.fromisoformat(trip["endDate"][:10])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if end >= today and start <= last_start:
+            names.extend(loc["name"] for loc in trip.get("locations", []))
+    return names
+
+
+class WeatherPrefetcher:
+    """Periodic, rate-limited weather prefetch shared by all workers.
+
+    Args:
+        path: Shared SQLite file (lease, active users, prefetched weather)
+        interval: Seconds between jobs, across all workers
+        horizon_days: Prefetch trips starting within this many days
+        calls_per_minute: SerpAPI budget of the job
+        enabled: Run at all (defaults to WEATHER_PREFETCH)
+    """
+
+    def __init__(
+        self,
+        path: str = WEATHER_PREFETCH_DB_PATH,
+        interval: float = WEATHER_PREFETCH_INTERVAL_SECONDS,
+        horizon_days: int = WEATHER_PREFETCH_HORIZON_DAYS,
+        calls_per_minute: float = WEATHER_PREFETCH_CALLS_PER_MINUTE,
+        enabled: Optional[bool] = None,
+    ):
+        self.path = path
+        self.interval = interval
+        self.horizon_days = horizon_days
+        self.budget = RateBudget(calls_per_minute)
+        self.enabled = WEATHER_PREFETCH if enabled is None else enabled
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.renew_every = min(_LEASE_RENEW_SECONDS, interval / 3)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._seen: Dict[str, float] = {}  # Users seen since the last flush
+        self._imported_until = 0.0  # fetched_at of the newest imported entry
+        self.jobs = 0
+        self.skipped_jobs = 0  # Another worker held the lease
+        self.fetched = 0
+        self.already_fresh = 0
+        self.failed = 0
+        self.imported = 0
+        self.last_job_seconds = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS active_users (
+                    user_id TEXT PRIMARY KEY,
+                    last_seen REAL NOT NULL
+                )""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS weather (
+                    key TEXT PRIMARY KEY,
+                    location TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )""")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def note_user(self, user_id: Optional[str]):
+        """Remember an active user; written to the shared file on the next tick."""
+        if user_id:
+            self._seen[user_id] = time.time()
+
+    def _flush_users(self, seen: Dict[str, float]):
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                """INSERT INTO active_users (user_id, last_seen) VALUES (?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                    last_seen = MAX(last_seen, excluded.last_seen)""",
+                seen.items(),
+            )
+            conn.execute(
+                "DELETE FROM active_users WHERE last_seen < ?",
+                (time.time() - WEATHER_PREFETCH_ACTIVE_DAYS * 86400,),
+            )
+            conn.commit()
+
+    def _active_users(self) -> List[str]:
+        with self._lock:
+            rows = self._connection().execute("SELECT user_id FROM active_users")
+            return [row[0] for row in rows.fetchall()]
+
+    def _acquire_lease(self) -> bool:
+        """Take the job for this interval unless another worker holds it."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                """INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET holder = excluded.holder,
+                    expires_at = excluded.expires_at
+                    WHERE leases.expires_at <= ?""",
+                (_LEASE, self.holder, now + self.interval, now),
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def _renew_lease(self) -> bool:
+        """Keep the lease for a running job a few renewals ahead, never shorter.
+
+        Returns:
+            False if another worker took the lease in the meantime
+        """
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE leases SET expires_at = MAX(expires_at, ?) "
+                "WHERE name = ? AND holder = ?",
+                (time.time() + 3 * self.renew_every, _LEASE, self.holder),
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def _release_lease(self, started: float):
+        """End the job: the lease runs to the end of its interval, or expires
+        now if the job outlasted it, so the next job starts on schedule."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE name = ? AND holder = ?",
+                (max(time.time(), started + self.interval), _LEASE, self.holder),
+            )
+            conn.commit()
+
+    async def _keep_lease(self):
+        """Renew the lease until cancelled (when the job ends)."""
+        while True:
+            await asyncio.sleep(self.renew_every)
+            if not await run_blocking(self._renew_lease):
+                logger.warning("Weather prefetch lease taken by another worker")
+                return
+
+    def _share(self, location: str, weather: LocationWeather):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO weather VALUES (?, ?, ?, ?)",
+                (
+                    normalize_location(location),
+                    location,
+                    json.dumps(dataclasses.asdict(weather)),
+                    time.time(),
+                ),
+            )
+            conn.execute(
+                "DELETE FROM weather WHERE fetched_at < ?",
+                (time.time() - WEATHER_PREFETCH_TTL_SECONDS,),
+            )
+            conn.commit()
+
+    def _import_shared(self) -> int:
+        """Load weather prefetched by any worker into this worker's cache."""
+        with self._lock:
+            rows = (
+                self._connection()
+                .execute(
+                    "SELECT location, payload, fetched_at FROM weather "
+                    "WHERE fetched_at > ? ORDER BY fetched_at",
+                    (self._imported_until,),
+                )
+                .fetchall()
+            )
+        now = time.time()
+        count = 0
+        for location, payload, fetched_at in rows:
+            self._imported_until = max(self._imported_until, fetched_at)
+            remaining = WEATHER_PREFETCH_TTL_SECONDS - (now - fetched_at)
+            if remaining > 0 and not weather_cache.is_fresh(location):
+                weather_cache.put(
+                    location,
+                    LocationWeather.from_dict(json.loads(payload)),
+                    ttl=remaining,
+                )
+                count += 1
+        self.imported += count
+        return count
+
+    async def run_job(self) -> int:
+        """Prefetch weather for the upcoming trips of active users.
+
+        Returns:
+            Number of locations fetched from SerpAPI
+        """
+        start = time.perf_counter()
+        locations: Dict[str, str] = {}
+        for user_id in await run_blocking(self._active_users):
+            trips = await TripService.afetch_trips(user_id)
+            for name in upcoming_locations(trips or [], self.horizon_days):
+                if name and name.strip():
+                    locations.setdefault(normalize_location(name), name.strip())
+
+        fetched = 0
+        for name in locations.values():
+            if weather_cache.is_fresh(name):
+                self.already_fresh += 1
+                WEATHER_PREFETCH_LOCATIONS.inc("fresh")
+                continue
+            await self.budget.acquire()
+            try:
+                weather = await run_blocking(
+                    refresh_location_weather, name, WEATHER_PREFETCH_TTL_SECONDS
+                )
+            except Exception as e:
+                logger.warning("Weather prefetch failed for %s: %s", name, e)
+                weather = None
+            if weather is None:
+                self.failed += 1
+                WEATHER_PREFETCH_LOCATIONS.inc("failed")
+                continue
+            await run_blocking(self._share, name, weather)
+            self.fetched += 1
+            fetched += 1
+            WEATHER_PREFETCH_LOCATIONS.inc("fetched")
+
+        self.jobs += 1
+        self.last_job_seconds = time.perf_counter() - start
+        logger.info(
+            "Weather prefetch done",
+            extra={
+                "locations": len(locations),
+                "fetched": fetched,
+                "seconds": round(self.last_job_seconds, 2),
+            },
+        )
+        return fetched
+
+    async def tick(self) -> bool:
+        """One scheduler step: record users, run the job if this worker holds
+        the lease, otherwise import what the job holder fetched.
+
+        Returns:
+            Whether this worker ran the job
+        """
+        seen, self._seen = self._seen, {}
+        await run_blocking(self._flush_users, seen)
+        started = time.time()
+        if await run_blocking(self._acquire_lease):
+            keeper = asyncio.ensure_future(self._keep_lease())
+            try:
+                await self.run_job()
+            finally:
+                keeper.cancel()
+                await run_blocking(self._release_lease, started)
+            return True
+        self.skipped_jobs += 1
+        await run_blocking(self._import_shared)
+        return False
+
+    async def run(self):
+        """Scheduler loop, started by the app's lifespan and cancelled on exit."""
+        if not self.enabled:
+            return
+        # Import often enough to pick up a job's results well within their TTL
+        period = min(self.interval, WEATHER_PREFETCH_TTL_SECONDS / 4)
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Weather prefetch tick failed")
+            await asyncio.sleep(period)
+
+    def stats(self) -> dict:
+        """Job, lookup and import counters of this worker."""
+        return {
+            "enabled": self.enabled,
+            "holder": self.holder,
+            "jobs": self.jobs,
+            "skipped_jobs": self.skipped_jobs,
+            "fetched": self.fetched,
+            "already_fresh": self.already_fresh,
+            "failed": self.failed,
+            "imported": self.imported,
+            "last_job_seconds": round(self.last_job_seconds, 2),
+        }
+
+
+# Global instance
+weather_prefetcher = WeatherPrefetcher()